@@ -3,9 +3,11 @@
 from .base_agent import BaseAgent
 from .github_agent import GitHubPRReviewAgent
 from .multi_protocol_agent import MultiProtocolAgent
+from .review_cache import ReviewCache
 
 __all__ = [
     "BaseAgent",
     "GitHubPRReviewAgent",
     "MultiProtocolAgent",
+    "ReviewCache",
 ]
@@ -1,28 +1,75 @@
 """GitHub PR Review Agent using MCP protocol."""
 
+import contextvars
 import os
-from typing import Optional
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 import dspy
 
+from ..protocols.mcp.catalog_cache import ToolCatalogCache
 from ..protocols.mcp.client import MCPClient, RealMCPClient
+from .review_cache import ReviewCache
 
 
 class GitHubPRReviewAgent(dspy.Module):
-    """Agent that reviews GitHub PRs using MCP protocol."""
+    """Agent that reviews GitHub PRs using MCP protocol.
 
-    def __init__(self, mcp_server_url: str, use_real_mcp: bool = False, github_token: Optional[str] = None):
+    The context a review needs is gathered by ``context_fetches``, a list of
+    ``(name, context request, MCP tool)`` entries whose request is formatted
+    with ``pr_url``. They run concurrently, each given at most
+    ``fetch_timeout`` seconds; a fetch that fails or runs late is left out of
+    the review and reported in its ``context_errors``.
+
+    File changes larger than ``chunk_tokens`` are split by file, and files by
+    hunk, into chunks that are analyzed in parallel, up to
+    ``max_chunk_concurrency`` at a time. Their analyses are merged in diff
+    order before the review is generated.
+
+    Reviews given the PR's ``head_sha`` are incremental: per-file analyses are
+    kept in ``review_cache``, and a review after a new push re-analyzes only
+    the files whose diff changed since the last reviewed SHA.
+    """
+
+    # "pr_details" and "file_changes" feed the analysis directly; any other
+    # fetches are appended to the PR context
+    CONTEXT_FETCHES: List[Tuple[str, str, str]] = [
+        ("pr_details", "Get PR details for {pr_url}", "github_search"),
+        ("file_changes", "Get file changes for {pr_url}", "file_reader"),
+    ]
+
+    def __init__(
+        self,
+        mcp_server_url: str,
+        use_real_mcp: bool = False,
+        github_token: Optional[str] = None,
+        catalog_cache: Optional[ToolCatalogCache] = None,
+        context_fetches: Optional[List[Tuple[str, str, str]]] = None,
+        fetch_timeout: float = 30.0,
+        chunk_tokens: int = 4000,
+        max_chunk_concurrency: int = 8,
+        review_cache: Optional[ReviewCache] = None,
+    ):
         super().__init__()
+        if chunk_tokens < 1 or max_chunk_concurrency < 1:
+            raise ValueError("chunk_tokens and max_chunk_concurrency must be at least 1")
+        self.context_fetches = list(context_fetches or self.CONTEXT_FETCHES)
+        self.fetch_timeout = fetch_timeout
+        self.chunk_tokens = chunk_tokens
+        self.max_chunk_concurrency = max_chunk_concurrency
+        self.review_cache = review_cache if review_cache is not None else ReviewCache()
 
         if use_real_mcp:
             # Real GitHub MCP server command
             github_mcp_command = ["npx", "-y", "@modelcontextprotocol/server-github"]
             if github_token:
                 os.environ["GITHUB_TOKEN"] = github_token
-            self.mcp_client = RealMCPClient(github_mcp_command)
+            self.mcp_client = RealMCPClient(github_mcp_command, catalog_cache=catalog_cache)
         else:
             # Mock MCP client for demo
-            self.mcp_client = MCPClient(mcp_server_url)
+            self.mcp_client = MCPClient(mcp_server_url, catalog_cache=catalog_cache)
 
         # DSPy modules for reasoning
         self.analyze_pr = dspy.ChainOfThought(
@@ -33,35 +80,260 @@ class GitHubPRReviewAgent(dspy.Module):
             "analysis: str, suggestions: list[str] -> review_comment: str, approval_status: str"
         )
 
-    def forward(self, pr_url: str, review_focus: str = "code_quality"):
-        """Review a GitHub PR."""
+    def forward(self, pr_url: str, review_focus: str = "code_quality", head_sha: Optional[str] = None):
+        """Review a GitHub PR, incrementally when its ``head_sha`` is given."""
         print(f"\n🔍 Reviewing PR: {pr_url}")
         print(f"📋 Focus: {review_focus}")
         print("-" * 50)
 
-        # Use protocol layer to get PR context
-        pr_context = self.mcp_client(context_request=f"Get PR details for {pr_url}", tool_name="github_search")
-
-        # Get file changes through MCP
-        file_changes = self.mcp_client(context_request=f"Get file changes for {pr_url}", tool_name="file_reader")
+        # Use protocol layer to get PR context and file changes at once
+        fetched, errors = self.fetch_context(pr_url)
+        contexts = {name: prediction.context_data for name, prediction in fetched.items()}
+        extra = [f"{name}:\n{text}" for name, text in contexts.items() if name not in ("pr_details", "file_changes")]
+        pr_context = "\n\n".join([contexts.get("pr_details", "")] + extra)
 
         # Analyze using DSPy reasoning
         print("🧠 Analyzing PR content...")
-        analysis = self.analyze_pr(pr_context=pr_context.context_data, file_changes=file_changes.context_data)
+        analysis = self.analyze_changes(pr_context, contexts.get("file_changes", ""), pr_url, head_sha)
 
         # Generate final review
         print("📝 Generating review...")
         review = self.generate_review(analysis=analysis.analysis, suggestions=analysis.suggestions)
 
         return dspy.Prediction(
+            pr_url=pr_url,
             review_comment=review.review_comment,
             approval_status=review.approval_status,
-            protocol_capabilities=pr_context.capabilities,
-            mcp_tools_used=["github_search", "file_reader"],
-            protocol_info=pr_context.protocol_info,
+            protocol_capabilities=self.mcp_client.get_capabilities(),
+            mcp_tools_used=[tool for name, _, tool in self.context_fetches if name in fetched],
+            protocol_info=next((prediction.protocol_info for prediction in fetched.values()), ""),
+            context_errors=errors,
+        )
+
+    def analyze_changes(
+        self, pr_context: str, file_changes: str, pr_url: Optional[str] = None, head_sha: Optional[str] = None
+    ) -> dspy.Prediction:
+        """Analyze file changes, mapping ``analyze_pr`` over chunks of a large diff in parallel.
+
+        Returns one prediction with the chunks' analyses joined in diff order
+        and their suggestions, without duplicates. Given the PR's ``pr_url``
+        and ``head_sha``, files are analyzed separately and cached in
+        ``review_cache``, and files whose diff has not changed since the PR's
+        last reviewed SHA reuse their cached analyses.
+        """
+        if pr_url is None or head_sha is None:
+            return _merge_analyses(self._analyze_chunks(pr_context, split_diff(file_changes, self.chunk_tokens)))
+
+        files: Dict[str, str] = {}
+        for section in filter(None, _split_before(file_changes, "diff --git ")):
+            # Sections sharing a path, such as text outside any file's diff, are analyzed and cached together
+            path = _diff_path(section)
+            files[path] = files.get(path, "") + section
+        files = files or {"": file_changes}
+        digests = {path: ReviewCache.digest(section) for path, section in files.items()}
+        last_sha, cached = self.review_cache.latest(pr_url)
+        analyses = {path: cached[path][1] for path in files if path in cached and cached[path][0] == digests[path]}
+        if analyses:
+            print(f"♻️ Reusing analyses of {len(analyses)} unchanged files from {last_sha}")
+
+        changed = [path for path in files if path not in analyses]
+        pieces = [(path, chunk) for path in changed for chunk in split_diff(files[path], self.chunk_tokens)]
+        results = self._analyze_chunks(pr_context, [chunk for _, chunk in pieces])
+        for path in changed:
+            analyses[path] = _merge_analyses([result for (p, _), result in zip(pieces, results) if p == path])
+
+        entries = {path: (digests[path], analyses[path]) for path in files}
+        self.review_cache.put(pr_url, head_sha, entries, reused=len(files) - len(changed))
+        return _merge_analyses([analyses[path] for path in files], labels=[path or "Other changes" for path in files])
+
+    def _analyze_chunks(self, pr_context: str, chunks: List[str]) -> List[dspy.Prediction]:
+        """Run ``analyze_pr`` on each chunk, in parallel when there are several."""
+        if len(chunks) <= 1:
+            return [self.analyze_pr(pr_context=pr_context, file_changes=chunk) for chunk in chunks]
+
+        print(f"🧩 Analyzing {len(chunks)} chunks of file changes in parallel")
+        pool = ThreadPoolExecutor(
+            max_workers=min(len(chunks), self.max_chunk_concurrency), thread_name_prefix="pr-analysis"
         )
+        try:
+            futures = [
+                pool.submit(contextvars.copy_context().run, self.analyze_pr, pr_context=pr_context, file_changes=chunk)
+                for chunk in chunks
+            ]
+            return [future.result() for future in futures]
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def review_many(
+        self, pr_urls: Iterable[str], review_focus: str = "code_quality", max_concurrency: int = 4
+    ) -> Iterator[dspy.Prediction]:
+        """Review many PRs, at most ``max_concurrency`` at a time, yielding each review as it completes.
+
+        All reviews share this agent's MCP session, which is connected once up
+        front. Results arrive in completion order and carry their ``pr_url``.
+        A review that fails, or every review when the session cannot connect,
+        yields a prediction with an ``error`` instead of ending the batch.
+        Closing the iterator early drops the reviews that have not started.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if not self.mcp_client.is_connected and not self.mcp_client.connect():
+            # Every review would otherwise try to connect again on its own
+            pr_urls = list(pr_urls)
+            print(f"❌ MCP connection failed; skipping {len(pr_urls)} PR reviews")
+            for pr_url in pr_urls:
+                yield dspy.Prediction(pr_url=pr_url, error="MCP connection failed")
+            return
+
+        pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="pr-review")
+        failed = 0
+        try:
+            futures = {
+                pool.submit(contextvars.copy_context().run, self, pr_url=pr_url, review_focus=review_focus): pr_url
+                for pr_url in pr_urls
+            }
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"❌ Review of {futures[future]} failed: {e}")
+                    yield dspy.Prediction(pr_url=futures[future], error=str(e) or type(e).__name__)
+            print(f"✅ Reviewed {len(futures) - failed} of {len(futures)} PRs")
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def fetch_context(self, pr_url: str) -> Tuple[Dict[str, dspy.Prediction], Dict[str, str]]:
+        """Run every context fetch for a PR concurrently.
+
+        Returns the protocol's prediction for each fetch that finished in time
+        by name, and an error message for each one that did not.
+        """
+        contexts: Dict[str, dspy.Prediction] = {}
+        errors: Dict[str, str] = {}
+        if not self.context_fetches:
+            return contexts, errors
+
+        # Connect once up front rather than racing to connect from every fetch
+        if not self.mcp_client.is_connected and not self.mcp_client.connect():
+            errors = {name: "MCP connection failed" for name, _, _ in self.context_fetches}
+            print(f"⚠️ Context fetches for {pr_url} skipped: MCP connection failed")
+            return contexts, errors
+
+        pool = ThreadPoolExecutor(max_workers=len(self.context_fetches), thread_name_prefix="pr-context")
+        try:
+            futures = {
+                name: pool.submit(
+                    # Each fetch sees the caller's dspy settings
+                    contextvars.copy_context().run,
+                    self.mcp_client,
+                    context_request=request.format(pr_url=pr_url),
+                    tool_name=tool,
+                )
+                for name, request, tool in self.context_fetches
+            }
+            deadline = time.monotonic() + self.fetch_timeout
+            for name, future in futures.items():
+                try:
+                    contexts[name] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+                except FutureTimeoutError:
+                    errors[name] = f"timed out after {self.fetch_timeout}s"
+                except Exception as e:
+                    errors[name] = str(e) or type(e).__name__
+        finally:
+            # Late fetches finish in the background; nothing waits for them
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        for name, error in errors.items():
+            print(f"⚠️ Context fetch {name} failed: {error}")
+        return contexts, errors
 
     def cleanup(self):
         """Clean up resources."""
         if self.mcp_client:
             self.mcp_client.disconnect()
+
+
+def _merge_analyses(analyses: List[dspy.Prediction], labels: Optional[List[str]] = None) -> dspy.Prediction:
+    """Join analyses under their labels, "Part i of n" by default, and collect their distinct suggestions."""
+    if len(analyses) == 1:
+        return analyses[0]
+    labels = labels or [f"Part {i} of {len(analyses)}" for i in range(1, len(analyses) + 1)]
+    suggestions: List[str] = []
+    for analysis in analyses:
+        suggestions.extend(s for s in analysis.suggestions or [] if s not in suggestions)
+    return dspy.Prediction(
+        analysis="\n\n".join(f"{label}:\n{analysis.analysis}" for label, analysis in zip(labels, analyses)),
+        suggestions=suggestions,
+    )
+
+
+def _diff_path(section: str) -> str:
+    """Return the new path of a ``git diff`` file section, or ``""`` for other text."""
+    first_line = section.split("\n", 1)[0]
+    if not first_line.startswith("diff --git ") or " b/" not in first_line:
+        return ""
+    return first_line.rsplit(" b/", 1)[1]
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the number of LM tokens in ``text``, at four characters a token."""
+    return (len(text) + 3) // 4
+
+
+def split_diff(diff: str, max_tokens: int) -> List[str]:
+    """Split a unified diff into chunks of at most about ``max_tokens`` tokens.
+
+    Whole files are packed together while they fit. A larger file is split
+    between hunks, each chunk repeating the file's header, and a single hunk
+    that is still too large is split between lines. Text that is not a
+    ``git diff`` is treated as one file. Always returns at least one chunk.
+    """
+    chunks: List[str] = []
+    current = ""
+    for section in _split_before(diff, "diff --git "):
+        if estimate_tokens(current + section) <= max_tokens:
+            current += section
+            continue
+        if current:
+            chunks.append(current)
+        if estimate_tokens(section) <= max_tokens:
+            current = section
+            continue
+
+        # Too large on its own: split it between hunks, repeating the file header
+        header, *hunks = _split_before(section, "@@")
+        if not hunks:
+            *full, current = _split_lines(section, max_tokens)
+            chunks.extend(full)
+            continue
+        budget = max(1, max_tokens - estimate_tokens(header))
+        current = header
+        for piece in (piece for hunk in hunks for piece in _split_lines(hunk, budget)):
+            if current != header and estimate_tokens(current + piece) > max_tokens:
+                chunks.append(current)
+                current = header
+            current += piece
+    if current or not chunks:
+        chunks.append(current)
+    return chunks
+
+
+def _split_before(text: str, prefix: str) -> List[str]:
+    """Split ``text`` before each line starting with ``prefix``; the first section is what precedes them all."""
+    sections = [""]
+    for line in text.splitlines(keepends=True):
+        if line.startswith(prefix):
+            sections.append("")
+        sections[-1] += line
+    return sections
+
+
+def _split_lines(text: str, max_tokens: int) -> List[str]:
+    """Split ``text`` between lines into pieces of at most ``max_tokens`` tokens where possible."""
+    pieces = [""]
+    for line in text.splitlines(keepends=True):
+        if pieces[-1] and estimate_tokens(pieces[-1] + line) > max_tokens:
+            pieces.append("")
+        pieces[-1] += line
+    return pieces
@@ -1,6 +1,9 @@
 """Multi-protocol agent supporting multiple communication protocols."""
 
-from typing import Any, Dict
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional, Tuple
 
 import dspy
 
@@ -8,11 +11,21 @@ from ..protocols.base import BaseProtocol, ProtocolType
 
 
 class MultiProtocolAgent(dspy.Module):
-    """Agent that can use multiple protocols simultaneously."""
+    """Agent that can use multiple protocols simultaneously.
 
-    def __init__(self, agent_id: str = "multi-agent"):
+    With ``use_all_protocols``, every protocol is queried concurrently and the
+    responses are synthesized as soon as ``quorum`` of them have arrived (all
+    of them by default) or ``protocol_timeout`` seconds have passed. Protocols
+    that fail or answer late are left out and reported in ``protocol_errors``.
+    """
+
+    def __init__(self, agent_id: str = "multi-agent", protocol_timeout: float = 30.0, quorum: Optional[int] = None):
         super().__init__()
+        if quorum is not None and quorum < 1:
+            raise ValueError("quorum must be at least 1")
         self.agent_id = agent_id
+        self.protocol_timeout = protocol_timeout
+        self.quorum = quorum
         self.protocols: Dict[ProtocolType, BaseProtocol] = {}
 
         # DSPy reasoning modules
@@ -37,24 +50,27 @@ class MultiProtocolAgent(dspy.Module):
         available_protocols = [p.value for p in self.protocols.keys()]
 
         if use_all_protocols:
-            # Use all available protocols
-            responses = []
-            protocols_used = []
-
-            for protocol_type, protocol in self.protocols.items():
-                print(f"📡 Using {protocol_type.value} protocol...")
-                response = protocol(context_request=request)
-                responses.append(response.context_data if hasattr(response, "context_data") else str(response))
-                protocols_used.append(protocol_type.value)
+            # Query all available protocols at once
+            responses, errors = self.query_all(request)
+            protocols_used = list(responses)
+            if not responses:
+                return dspy.Prediction(
+                    final_answer="No protocol responded",
+                    protocols_used=[],
+                    individual_responses=[],
+                    protocol_errors=errors,
+                    error="No protocol responded",
+                )
 
             # Synthesize responses
-            synthesis = self.synthesize_responses(responses=responses, protocols_used=protocols_used)
+            synthesis = self.synthesize_responses(responses=list(responses.values()), protocols_used=protocols_used)
 
             return dspy.Prediction(
                 final_answer=synthesis.final_answer,
                 confidence=synthesis.confidence,
                 protocols_used=protocols_used,
-                individual_responses=responses,
+                individual_responses=list(responses.values()),
+                protocol_errors=errors,
             )
 
         else:
@@ -85,6 +101,53 @@ class MultiProtocolAgent(dspy.Module):
                     final_answer="No suitable protocol found", protocol_used="none", error="Protocol routing failed"
                 )
 
+    def query_all(self, request: str) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """Send a request to every protocol concurrently and wait for a quorum or the deadline.
+
+        Returns the responses that arrived in time by protocol name, in the
+        order the protocols were added, and an error message for each
+        protocol that failed or was dropped.
+        """
+        responses: Dict[str, str] = {}
+        errors: Dict[str, str] = {}
+        if not self.protocols:
+            return responses, errors
+        quorum = min(self.quorum or len(self.protocols), len(self.protocols))
+
+        pool = ThreadPoolExecutor(max_workers=len(self.protocols), thread_name_prefix="protocol-fanout")
+        try:
+            pending = {}
+            for protocol_type, protocol in self.protocols.items():
+                print(f"📡 Using {protocol_type.value} protocol...")
+                # Each query sees the caller's dspy settings
+                future = pool.submit(contextvars.copy_context().run, protocol, context_request=request)
+                pending[future] = protocol_type.value
+
+            deadline = time.monotonic() + self.protocol_timeout
+            while pending and len(responses) < quorum:
+                done, _ = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    name = pending.pop(future)
+                    try:
+                        response = future.result()
+                    except Exception as e:
+                        errors[name] = str(e) or type(e).__name__
+                        continue
+                    responses[name] = response.context_data if hasattr(response, "context_data") else str(response)
+
+            late = "dropped after quorum" if len(responses) >= quorum else f"timed out after {self.protocol_timeout}s"
+            errors.update((name, late) for name in pending.values())
+        finally:
+            # Late responders finish in the background; nothing waits for them
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        for name, error in errors.items():
+            print(f"⚠️ {name} protocol left out: {error}")
+        order = [protocol_type.value for protocol_type in self.protocols]
+        return {name: responses[name] for name in order if name in responses}, errors
+
     def get_all_capabilities(self) -> Dict[str, Any]:
         """Get capabilities from all protocols."""
         capabilities = {}
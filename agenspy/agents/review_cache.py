@@ -0,0 +1,61 @@
+"""In-memory cache of per-file PR analyses for incremental re-reviews."""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import dspy
+
+# A file's path mapped to a digest of its diff and the analysis of that diff
+FileAnalyses = Dict[str, Tuple[str, dspy.Prediction]]
+
+
+class ReviewCache:
+    """Per-file analyses of the last reviewed head commit of each PR.
+
+    Entries are keyed by PR URL and head commit SHA. When a PR is reviewed
+    again at a new SHA, files whose diff digest matches the cached one are
+    unchanged since the last review and their analyses can be reused. Only the
+    latest SHA of each PR is kept, and the least recently reviewed PRs are
+    evicted past ``max_prs``.
+    """
+
+    def __init__(self, max_prs: int = 256):
+        self.max_prs = max_prs
+        self.reused = 0
+        self.analyzed = 0
+        self._entries: "OrderedDict[str, Tuple[str, FileAnalyses]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def digest(diff: str) -> str:
+        """Fingerprint a file's diff."""
+        return hashlib.sha256(diff.encode("utf-8")).hexdigest()
+
+    def latest(self, pr_url: str) -> Tuple[Optional[str], FileAnalyses]:
+        """Return the last reviewed head SHA of a PR and its file analyses, or ``(None, {})``."""
+        with self._lock:
+            entry = self._entries.get(pr_url)
+            if entry is None:
+                return None, {}
+            self._entries.move_to_end(pr_url)
+            return entry[0], dict(entry[1])
+
+    def put(self, pr_url: str, head_sha: str, files: FileAnalyses, reused: int = 0) -> None:
+        """Store the file analyses of a PR at ``head_sha``, ``reused`` of which came from the cache."""
+        with self._lock:
+            self._entries[pr_url] = (head_sha, dict(files))
+            self._entries.move_to_end(pr_url)
+            self.reused += reused
+            self.analyzed += len(files) - reused
+            while len(self._entries) > self.max_prs:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached analyses."""
+        with self._lock:
+            self._entries.clear()
@@ -7,6 +7,7 @@ import dspy
 
 from ...agents.github_agent import GitHubPRReviewAgent
 from ...agents.multi_protocol_agent import MultiProtocolAgent
+from ...protocols.mcp.catalog_cache import ToolCatalogCache
 from ...protocols.mcp.client import MCPClient
 
 
@@ -56,8 +57,9 @@ def list_agents(ctx, type):
 @click.option("--mcp-server", default="mcp://github-server:8080", help="MCP server URL")
 @click.option("--github-token", envvar="GITHUB_TOKEN", help="GitHub token")
 @click.option("--real-mcp", is_flag=True, help="Use real MCP server")
+@click.option("--tool-cache/--no-tool-cache", default=True, help="Reuse MCP tool catalogs cached on disk")
 @click.pass_context
-def run_agent(ctx, task, agent, mcp_server, github_token, real_mcp):
+def run_agent(ctx, task, agent, mcp_server, github_token, real_mcp, tool_cache):
     """Run an agent with a specific task."""
     verbose = ctx.obj.get("verbose", False)
 
@@ -86,10 +88,14 @@ def run_agent(ctx, task, agent, mcp_server, github_token, real_mcp):
 
     dspy.configure(lm=lm)
 
+    catalog_cache = ToolCatalogCache() if tool_cache else None
+
     # Create and run agent
     try:
         if agent == "github-pr-review":
-            agent_instance = GitHubPRReviewAgent(mcp_server, use_real_mcp=real_mcp, github_token=github_token)
+            agent_instance = GitHubPRReviewAgent(
+                mcp_server, use_real_mcp=real_mcp, github_token=github_token, catalog_cache=catalog_cache
+            )
 
             # Extract PR URL from task if present
             pr_url = extract_pr_url(task)
@@ -103,7 +109,7 @@ def run_agent(ctx, task, agent, mcp_server, github_token, real_mcp):
 
         elif agent == "multi-protocol":
             agent_instance = MultiProtocolAgent("cli-agent")
-            mcp_client = MCPClient(mcp_server)
+            mcp_client = MCPClient(mcp_server, catalog_cache=catalog_cache)
             agent_instance.add_protocol(mcp_client)
 
             result = agent_instance(task)
@@ -2,10 +2,12 @@
 
 import threading
 import time
+import urllib.request
 
 import click
 
 from ...servers.mcp_python_server import GitHubMCPServer
+from ...servers.metrics import summarize_metrics
 from ...utils.server_manager import server_manager
 
 
@@ -62,14 +64,17 @@ def list_servers(running):
 @click.option("--port", "-p", default=8080, help="Server port")
 @click.option("--github-token", envvar="GITHUB_TOKEN", help="GitHub token for GitHub MCP server")
 @click.option("--background", "-b", is_flag=True, help="Run server in background")
+@click.option("--unix-socket", help="Also listen on this Unix socket path for co-located clients")
 @click.pass_context
-def run_server(ctx, server_type, server_name, port, github_token, background):
+def run_server(ctx, server_type, server_name, port, github_token, background, unix_socket):
     """Run a protocol server."""
     verbose = ctx.obj.get("verbose", False)
 
     if verbose:
         click.echo(f"🚀 Starting {server_type} server: {server_name}")
         click.echo(f"📡 Port: {port}")
+        if unix_socket:
+            click.echo(f"🔌 Unix socket: {unix_socket}")
 
     try:
         if server_type == "mcp":
@@ -79,6 +84,7 @@ def run_server(ctx, server_type, server_name, port, github_token, background):
 
                     def start_github_server():
                         server = GitHubMCPServer(github_token, port)
+                        server.unix_socket = unix_socket
                         server.start()
 
                     thread = threading.Thread(target=start_github_server, daemon=True)
@@ -93,6 +99,7 @@ def run_server(ctx, server_type, server_name, port, github_token, background):
                         click.echo("\n🛑 Stopping server...")
                 else:
                     server = GitHubMCPServer(github_token, port)
+                    server.unix_socket = unix_socket
                     click.echo(f"🚀 Starting GitHub MCP server on port {port}...")
                     server.start()
 
@@ -103,7 +110,7 @@ def run_server(ctx, server_type, server_name, port, github_token, background):
                     def start_python_server():
                         from ...servers.mcp_python_server import PythonMCPServer
 
-                        server = PythonMCPServer("python-mcp-server", port)
+                        server = PythonMCPServer("python-mcp-server", port, unix_socket=unix_socket)
                         server.start()
 
                     thread = threading.Thread(target=start_python_server, daemon=True)
@@ -112,7 +119,7 @@ def run_server(ctx, server_type, server_name, port, github_token, background):
                 else:
                     from ...servers.mcp_python_server import PythonMCPServer
 
-                    server = PythonMCPServer("python-mcp-server", port)
+                    server = PythonMCPServer("python-mcp-server", port, unix_socket=unix_socket)
                     click.echo(f"🚀 Starting Python MCP server on port {port}...")
                     server.start()
             else:
@@ -146,7 +153,10 @@ def stop_server(ctx, server_name):
 
 @server_group.command("status")
 @click.argument("server_name")
-def server_status(server_name):
+@click.option("--metrics", "show_metrics", is_flag=True, help="Show request metrics from the server's /metrics route")
+@click.option("--host", default="localhost", help="Server host, for --metrics")
+@click.option("--port", "-p", default=8080, help="Server port, for --metrics")
+def server_status(server_name, show_metrics, host, port):
     """Get server status."""
     status = server_manager.get_server_status(server_name)
 
@@ -157,6 +167,33 @@ def server_status(server_name):
     else:
         click.echo(f"⚪ {server_name}: Not found")
 
+    if show_metrics:
+        _show_metrics(f"http://{host}:{port}/metrics")
+
+
+def _show_metrics(url):
+    """Print per-method and per-tool figures from a server's /metrics page."""
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            summary = summarize_metrics(response.read().decode("utf-8"))
+    except OSError as e:
+        click.echo(f"❌ Could not fetch metrics from {url}: {e}")
+        return
+
+    for family, title in (("method", "📊 Requests"), ("tool", "🔧 Tools")):
+        click.echo()
+        click.echo(f"{title}:")
+        entries = sorted(summary.get(family, {}).items(), key=lambda item: -item[1]["mean_seconds"] * item[1]["calls"])
+        if not entries:
+            click.echo("   (none yet)")
+        for name, entry in entries:
+            p95 = entry["p95_seconds"]
+            p95_text = "-" if p95 is None else f"≤{p95 * 1000:g}ms"
+            click.echo(
+                f"   {name:<24} calls {int(entry['calls']):>7}  errors {int(entry['errors']):>5}  "
+                f"in flight {int(entry['in_flight']):>3}  mean {entry['mean_seconds'] * 1000:8.1f}ms  p95 {p95_text}"
+            )
+
 
 @server_group.command("logs")
 @click.argument("server_name")
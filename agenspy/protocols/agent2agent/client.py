@@ -64,3 +64,11 @@ class Agent2AgentClient(BaseProtocol):
         print("👋 [MOCK] Disconnecting from Agent2Agent network")
         self._connected = False
         return True
+
+    async def aconnect(self) -> bool:
+        """Mock implementation of async connection; nothing blocks, so no thread is used."""
+        return self.connect()
+
+    async def adisconnect(self) -> bool:
+        """Mock implementation of async disconnection."""
+        return self.disconnect()
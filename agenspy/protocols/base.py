@@ -1,5 +1,6 @@
 """Base protocol interface for Agenspy."""
 
+import asyncio
 from abc import abstractmethod
 from enum import Enum
 from typing import Any, Dict, List
@@ -31,6 +32,11 @@ class BaseProtocol(dspy.Module):
         self._connected = False
         self._capabilities = {}
 
+    @property
+    def is_connected(self) -> bool:
+        """Whether the protocol connection is established."""
+        return self._connected
+
     @abstractmethod
     def connect(self) -> bool:
         """Establish protocol connection."""
@@ -62,6 +68,28 @@ class BaseProtocol(dspy.Module):
         """Handle protocol-specific requests."""
         pass
 
+    # Async API. The defaults below run the sync implementation in a worker
+    # thread so every protocol can be awaited; subclasses that can do I/O on
+    # the event loop override them with native coroutines.
+
+    async def aconnect(self) -> bool:
+        """Establish protocol connection without blocking the event loop."""
+        return await asyncio.to_thread(self.connect)
+
+    async def adisconnect(self) -> None:
+        """Close protocol connection without blocking the event loop."""
+        await asyncio.to_thread(self.disconnect)
+
+    async def aforward(self, **kwargs):
+        """Async DSPy module forward method, used by ``await protocol.acall(...)``."""
+        if not self._connected:
+            await self.aconnect()
+        return await self._ahandle_request(**kwargs)
+
+    async def _ahandle_request(self, **kwargs) -> dspy.Prediction:
+        """Handle protocol-specific requests asynchronously."""
+        return await asyncio.to_thread(self._handle_request, **kwargs)
+
     def get_protocol_info(self) -> Dict[str, Any]:
         """Get protocol metadata and status."""
         return {
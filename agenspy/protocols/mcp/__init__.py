@@ -1,11 +1,32 @@
 """MCP protocol implementation."""
 
+from .catalog_cache import ToolCatalogCache
 from .client import MCPClient, RealMCPClient
+from .codec import get_codec
+from .inprocess import InProcessMCPSession, InProcessTransport
+from .result_cache import ToolResultCache
 from .session import BackgroundMCPServer, MockMCPSession
+from .shm import SharedRingBuffer
+from .transport import SERVER_OVERLOADED, MCPError, StreamTransport, ToolStream
+from .unix import UnixMCPSession
+from .websocket import WebSocketMCPSession, WebSocketTransport
 
 __all__ = [
     "MCPClient",
     "RealMCPClient",
     "MockMCPSession",
     "BackgroundMCPServer",
+    "MCPError",
+    "SERVER_OVERLOADED",
+    "StreamTransport",
+    "ToolStream",
+    "InProcessMCPSession",
+    "InProcessTransport",
+    "UnixMCPSession",
+    "WebSocketMCPSession",
+    "WebSocketTransport",
+    "ToolCatalogCache",
+    "ToolResultCache",
+    "SharedRingBuffer",
+    "get_codec",
 ]
@@ -0,0 +1,77 @@
+"""On-disk cache of discovered MCP tool catalogs."""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def default_cache_dir() -> str:
+    """Return the catalog cache directory, honouring ``AGENSPY_CACHE_DIR``."""
+    base = os.environ.get("AGENSPY_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "agenspy")
+    return os.path.join(base, "tool_catalogs")
+
+
+class ToolCatalogCache:
+    """Persist tool catalogs between runs so short-lived clients can skip discovery.
+
+    Entries are keyed by the server URL or command. Each entry remembers the
+    version the server reported at ``initialize``; a lookup with a different
+    version is a miss, so revalidating costs nothing beyond the handshake the
+    client performs anyway. Clients call :meth:`invalidate` when the server
+    announces that its tool list changed.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir or default_cache_dir()
+
+    def get(self, server: str, version: str) -> Optional[Dict[str, Any]]:
+        """Return the cached catalog for ``server`` if it was stored for ``version``."""
+        try:
+            with open(self._path(server), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get("server") != server or entry.get("version") != version:
+            return None
+        return entry.get("tools")
+
+    def put(self, server: str, version: str, tools: Dict[str, Any]) -> None:
+        """Store the catalog for ``server`` at ``version``, replacing any older entry."""
+        entry = {"server": server, "version": version, "cached_at": time.time(), "tools": tools}
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write to a temp file and rename so concurrent runs never read a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(entry, f)
+                os.replace(tmp_path, self._path(server))
+            except BaseException:
+                # Leave no stray temp file behind a failed write
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not cache tool catalog for {server}: {e}")
+
+    def invalidate(self, server: str) -> None:
+        """Drop the cached catalog for ``server``."""
+        try:
+            os.remove(self._path(server))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not invalidate tool catalog for {server}: {e}")
+
+    def _path(self, server: str) -> str:
+        digest = hashlib.sha256(server.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
@@ -1,31 +1,72 @@
 """MCP Client implementation for Agenspy."""
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
 
 import dspy
 
 from ..base import BaseProtocol, ProtocolType
+from .catalog_cache import ToolCatalogCache
+from .inprocess import InProcessMCPSession
+from .result_cache import ToolResultCache
+from .session import MockMCPSession, TransportMCPSession
+from .transport import MCPError, ToolStream
+from .unix import UnixMCPSession
+from .websocket import WEBSOCKET_SCHEMES, WebSocketMCPSession
 
 
 class MCPClient(BaseProtocol):
-    """Model Context Protocol client implementation."""
-
-    def __init__(self, server_url: str, timeout: int = 30, **kwargs):
+    """Model Context Protocol client implementation.
+
+    ``mcp://``, ``mcps://``, ``ws://`` and ``wss://`` URLs connect to a
+    ``PythonMCPServer`` over a persistent WebSocket session, and
+    ``unix:///path`` URLs over its Unix domain socket, optionally receiving
+    large results through a shared memory ring buffer of
+    ``shared_memory_size`` bytes. Passing ``server``
+    binds the client to a ``PythonMCPServer`` instance in this process
+    instead, and ``server_url`` is then only a label. Other URLs, and
+    unreachable servers when ``mock_fallback`` is set, use the built-in mock
+    session so demos run offline.
+    """
+
+    def __init__(
+        self,
+        server_url: str,
+        timeout: int = 30,
+        catalog_cache: Optional[ToolCatalogCache] = None,
+        result_cache: Optional[ToolResultCache] = None,
+        encodings: Optional[List[str]] = None,
+        mock_fallback: bool = True,
+        server: Any = None,
+        shared_memory_size: Optional[int] = None,
+        **kwargs,
+    ):
         protocol_config = {"type": ProtocolType.MCP, "server_url": server_url, "timeout": timeout}
         super().__init__(protocol_config, **kwargs)
         self.server_url = server_url
         self.timeout = timeout
+        self.catalog_cache = catalog_cache
+        self.result_cache = result_cache
+        self.encodings = encodings
+        self.mock_fallback = mock_fallback
+        self.server = server
+        self.shared_memory_size = shared_memory_size
         self.session = None
-        self.available_tools = {}
+        # Catalog of sessions that do not keep their own, such as the mock session
+        self._tools: Dict[str, Any] = {}
+
+    @property
+    def available_tools(self) -> Dict[str, Any]:
+        """The session's current tool catalog, which follows refreshes after the server's tool list changes."""
+        if isinstance(self.session, TransportMCPSession):
+            return self.session.tools
+        return self._tools
 
     def connect(self) -> bool:
         """Establish MCP connection."""
         try:
             print(f"🔌 Connecting to MCP server: {self.server_url}")
-            # For demo purposes, using mock session
-            from .session import MockMCPSession
-
-            self.session = MockMCPSession(self.server_url)
+            self.session = self._open_session()
             self._discover_tools()
             self._connected = True
             print(f"✅ MCP Connected! Available tools: {list(self.available_tools.keys())}")
@@ -58,11 +99,60 @@ class MCPClient(BaseProtocol):
         # In a real implementation, this would discover MCP servers
         return [self.server_url]
 
+    def _open_session(self):
+        if self.server is not None:
+            session = InProcessMCPSession(self.server, request_timeout=self.timeout)
+            session.connect()
+            return session
+
+        # Results are cached by this client, so sessions only share the catalog cache
+        scheme = urlsplit(self.server_url).scheme
+        if scheme == "unix":
+            session = UnixMCPSession(
+                self.server_url,
+                request_timeout=self.timeout,
+                catalog_cache=self.catalog_cache,
+                shared_memory_size=self.shared_memory_size,
+            )
+        elif scheme in WEBSOCKET_SCHEMES:
+            session = WebSocketMCPSession(
+                self.server_url,
+                request_timeout=self.timeout,
+                catalog_cache=self.catalog_cache,
+                encodings=self.encodings,
+            )
+        else:
+            return MockMCPSession(self.server_url)
+
+        try:
+            session.connect()
+            return session
+        except Exception as e:
+            if not self.mock_fallback:
+                raise
+            print(f"⚠️ MCP server {self.server_url} unreachable ({e}), using mock session")
+            return MockMCPSession(self.server_url)
+
     def _discover_tools(self):
-        """Discover available MCP tools."""
-        if self.session:
-            self.available_tools = self.session.list_tools()
-            print(f"🔍 Discovered {len(self.available_tools)} MCP tools")
+        """Discover available MCP tools, reusing the catalog cache when the server version matches."""
+        if not self.session:
+            return
+        if isinstance(self.session, TransportMCPSession):
+            # Remote sessions load their catalog, through the same cache, while connecting
+            return
+
+        version = getattr(self.session, "catalog_version", None)
+        if self.catalog_cache and version:
+            cached = self.catalog_cache.get(self.server_url, version)
+            if cached is not None:
+                self._tools = cached
+                print(f"📦 Loaded {len(self.available_tools)} MCP tools from catalog cache")
+                return
+
+        self._tools = self.session.list_tools()
+        print(f"🔍 Discovered {len(self.available_tools)} MCP tools")
+        if self.catalog_cache and version:
+            self.catalog_cache.put(self.server_url, version, self.available_tools)
 
     def _handle_request(self, **kwargs) -> dspy.Prediction:
         """Handle MCP-specific requests."""
@@ -81,6 +171,102 @@ class MCPClient(BaseProtocol):
             print(f"🔧 Executing MCP tool: {tool_name}")
             tool_result = self._execute_tool(tool_name, tool_args)
 
+        return self._prediction(context_data, tool_result)
+
+    async def _ahandle_request(self, **kwargs) -> dspy.Prediction:
+        """Handle MCP-specific requests without blocking the event loop."""
+        context_request = kwargs.get("context_request", "")
+        tool_name = kwargs.get("tool_name", "")
+        tool_args = kwargs.get("tool_args", {})
+
+        print(f"📡 MCP Request - Context: {context_request[:50]}...")
+
+        context_data = await self._aget_context(context_request)
+
+        tool_result = ""
+        if tool_name and tool_name in self.available_tools:
+            print(f"🔧 Executing MCP tool: {tool_name}")
+            tool_result = await self._aexecute_tool(tool_name, tool_args)
+
+        return self._prediction(context_data, tool_result)
+
+    def call_tool(self, tool_name: str, args: Optional[Dict[str, Any]] = None, **shaping) -> str:
+        """Execute a discovered MCP tool and return its result.
+
+        A ``PythonMCPServer`` also accepts ``fields`` (dotted paths to keep),
+        and ``cursor`` and ``limit`` for paginated tools, and trims the result
+        before sending it.
+        """
+        if not self._connected:
+            self.connect()
+        return self._execute_tool(tool_name, args or {}, **shaping)
+
+    async def acall_tool(self, tool_name: str, args: Optional[Dict[str, Any]] = None, **shaping) -> str:
+        """Execute a discovered MCP tool without blocking the event loop."""
+        if not self._connected:
+            await self.aconnect()
+        return await self._aexecute_tool(tool_name, args or {}, **shaping)
+
+    def stream_tool(self, tool_name: str, args: Optional[Dict[str, Any]] = None) -> ToolStream:
+        """Execute a discovered MCP tool and iterate over its result as it is produced.
+
+        The returned stream works with ``for`` and ``async for``. Handlers on a
+        ``PythonMCPServer`` that are async generators send each chunk as it is
+        yielded; other tools produce their whole result as a single chunk.
+        Failures raise :class:`MCPError` from the iteration.
+        """
+        if not self._connected:
+            self.connect()
+        return self.session.stream_tool(tool_name, args or {})
+
+    def execute_tools(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Execute many tools in one round trip.
+
+        Returns one ``{"tool", "result"}`` or ``{"tool", "error"}`` dict per
+        ``(tool_name, args)`` call, in call order; a failing call does not
+        affect the others.
+        """
+        if not self._connected:
+            self.connect()
+        results, pending = self._plan_calls(calls)
+        if pending and self.session:
+            outcomes = self.session.execute_tools([(name, args) for _, name, args, _ in pending])
+            self._merge_outcomes(results, pending, outcomes)
+        return results
+
+    async def aexecute_tools(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Execute many tools in one round trip without blocking the event loop."""
+        if not self._connected:
+            await self.aconnect()
+        results, pending = self._plan_calls(calls)
+        if pending and self.session:
+            outcomes = await self.session.aexecute_tools([(name, args) for _, name, args, _ in pending])
+            self._merge_outcomes(results, pending, outcomes)
+        return results
+
+    def _plan_calls(self, calls: List[Tuple[str, Dict[str, Any]]]):
+        """Answer unknown and cached calls locally; return the rest as (index, name, args, ttl)."""
+        results: List[Optional[Dict[str, Any]]] = [None] * len(calls)
+        pending = []
+        for index, (name, args) in enumerate(calls):
+            if name not in self.available_tools:
+                results[index] = {"tool": name, "error": f"Tool {name} not available"}
+                continue
+            ttl = self._result_ttl(name)
+            cached = self.result_cache.get(name, args) if ttl else None
+            if cached is not None:
+                results[index] = {"tool": name, "result": cached}
+            else:
+                pending.append((index, name, args, ttl))
+        return results, pending
+
+    def _merge_outcomes(self, results, pending, outcomes: List[Dict[str, Any]]):
+        for (index, name, args, ttl), outcome in zip(pending, outcomes):
+            if ttl and "error" not in outcome:
+                self.result_cache.put(name, args, outcome["result"], ttl)
+            results[index] = outcome
+
+    def _prediction(self, context_data: str, tool_result: str) -> dspy.Prediction:
         return dspy.Prediction(
             context_data=context_data,
             tool_result=tool_result,
@@ -94,29 +280,86 @@ class MCPClient(BaseProtocol):
             return self.session.get_context(request)
         return ""
 
-    def _execute_tool(self, tool_name: str, args: Dict[str, Any]) -> str:
-        """Execute MCP tool."""
-        if self.session and tool_name in self.available_tools:
-            return self.session.execute_tool(tool_name, args)
+    async def _aget_context(self, request: str) -> str:
+        if self.session:
+            return await self.session.aget_context(request)
         return ""
 
+    def _execute_tool(self, tool_name: str, args: Dict[str, Any], **shaping) -> str:
+        """Execute MCP tool, serving cacheable tools from the result cache when possible."""
+        if not (self.session and tool_name in self.available_tools):
+            return ""
+
+        ttl = self._result_ttl(tool_name)
+        key = {"arguments": args, **shaping} if shaping else args
+        if ttl:
+            cached = self.result_cache.get(tool_name, key)
+            if cached is not None:
+                return cached
+
+        try:
+            result = self.session.call_tool(tool_name, args, **shaping)
+        except (MCPError, TimeoutError) as e:
+            return f"Error executing {tool_name}: {e}"
+        if ttl:
+            self.result_cache.put(tool_name, key, result, ttl)
+        return result
+
+    async def _aexecute_tool(self, tool_name: str, args: Dict[str, Any], **shaping) -> str:
+        if not (self.session and tool_name in self.available_tools):
+            return ""
+
+        ttl = self._result_ttl(tool_name)
+        key = {"arguments": args, **shaping} if shaping else args
+        if ttl:
+            cached = self.result_cache.get(tool_name, key)
+            if cached is not None:
+                return cached
+
+        try:
+            result = await self.session.acall_tool(tool_name, args, **shaping)
+        except (MCPError, TimeoutError) as e:
+            return f"Error executing {tool_name}: {e}"
+        if ttl:
+            self.result_cache.put(tool_name, key, result, ttl)
+        return result
+
+    def _result_ttl(self, tool_name: str) -> Optional[float]:
+        if self.result_cache is None:
+            return None
+        return self.result_cache.ttl_for(tool_name, self.available_tools.get(tool_name))
+
 
 class RealMCPClient(BaseProtocol):
     """Real MCP Client with background server management."""
 
-    def __init__(self, server_command: List[str], **kwargs):
+    def __init__(
+        self,
+        server_command: List[str],
+        catalog_cache: Optional[ToolCatalogCache] = None,
+        result_cache: Optional[ToolResultCache] = None,
+        **kwargs,
+    ):
         protocol_config = {"type": ProtocolType.MCP, "server_command": server_command, "real_server": True}
         super().__init__(protocol_config, **kwargs)
         self.server_command = server_command
+        self.catalog_cache = catalog_cache
+        self.result_cache = result_cache
         self.mcp_server = None
-        self.available_tools = {}
+
+    @property
+    def available_tools(self) -> Dict[str, Any]:
+        """The server session's current tool catalog, which follows refreshes after its tool list changes."""
+        return self.mcp_server.tools if self.mcp_server else {}
 
     def connect(self) -> bool:
         """Establish real MCP connection with background server."""
         try:
             from .session import BackgroundMCPServer
 
-            self.mcp_server = BackgroundMCPServer(self.server_command)
+            self.mcp_server = BackgroundMCPServer(
+                self.server_command, catalog_cache=self.catalog_cache, result_cache=self.result_cache
+            )
 
             if not self.mcp_server.start_server():
                 return False
@@ -124,7 +367,6 @@ class RealMCPClient(BaseProtocol):
             if not self.mcp_server.connect_client():
                 return False
 
-            self.available_tools = self.mcp_server.tools
             self._connected = True
 
             print(f"✅ Real MCP Connected! Available tools: {list(self.available_tools.keys())}")
@@ -178,6 +420,74 @@ class RealMCPClient(BaseProtocol):
             print(f"🔧 Executing real MCP tool: {tool_name}")
             tool_result = self.mcp_server.execute_tool(tool_name, tool_args)
 
+        return self._prediction(context_data, tool_result)
+
+    async def _ahandle_request(self, **kwargs) -> dspy.Prediction:
+        """Handle real MCP requests without blocking the event loop."""
+        context_request = kwargs.get("context_request", "")
+        tool_name = kwargs.get("tool_name", "")
+        tool_args = kwargs.get("tool_args", {})
+
+        print(f"📡 Real MCP Request - Context: {context_request[:50]}...")
+
+        if not self.mcp_server:
+            return dspy.Prediction(
+                context_data="No active MCP server", tool_result="", capabilities=self.get_capabilities()
+            )
+
+        context_data = await self.mcp_server.aget_context(context_request)
+
+        tool_result = ""
+        if tool_name and tool_name in self.available_tools:
+            print(f"🔧 Executing real MCP tool: {tool_name}")
+            tool_result = await self.mcp_server.aexecute_tool(tool_name, tool_args)
+
+        return self._prediction(context_data, tool_result)
+
+    def call_tool(self, tool_name: str, args: Optional[Dict[str, Any]] = None) -> str:
+        """Execute a tool on the background server and return its result."""
+        if not self._connected:
+            self.connect()
+        if not self.mcp_server:
+            return ""
+        return self.mcp_server.execute_tool(tool_name, args or {})
+
+    async def acall_tool(self, tool_name: str, args: Optional[Dict[str, Any]] = None) -> str:
+        """Execute a tool on the background server without blocking the event loop."""
+        if not self._connected:
+            await self.aconnect()
+        if not self.mcp_server:
+            return ""
+        return await self.mcp_server.aexecute_tool(tool_name, args or {})
+
+    def stream_tool(self, tool_name: str, args: Optional[Dict[str, Any]] = None) -> ToolStream:
+        """Execute a tool on the background server and iterate over its result.
+
+        Standard MCP servers answer in one piece, so the result arrives as a single chunk.
+        """
+        if not self._connected:
+            self.connect()
+        if not self.mcp_server:
+            raise MCPError("No active MCP server")
+        return self.mcp_server.stream_tool(tool_name, args or {})
+
+    def execute_tools(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Execute many tools in one round trip, returning per-call results or errors in order."""
+        if not self._connected:
+            self.connect()
+        if not self.mcp_server:
+            return [{"tool": name, "error": "No active MCP server"} for name, _ in calls]
+        return self.mcp_server.execute_tools(calls)
+
+    async def aexecute_tools(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Execute many tools in one round trip without blocking the event loop."""
+        if not self._connected:
+            await self.aconnect()
+        if not self.mcp_server:
+            return [{"tool": name, "error": "No active MCP server"} for name, _ in calls]
+        return await self.mcp_server.aexecute_tools(calls)
+
+    def _prediction(self, context_data: str, tool_result: str) -> dspy.Prediction:
         return dspy.Prediction(
             context_data=context_data,
             tool_result=tool_result,
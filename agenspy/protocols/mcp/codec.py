@@ -0,0 +1,177 @@
+"""Message codecs for MCP framing: JSON text and negotiated binary encodings."""
+
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Type, Union
+
+logger = logging.getLogger(__name__)
+
+Buffer = Union[str, bytes, bytearray, memoryview]
+
+
+class JSONCodec:
+    """Standard library JSON codec, always available."""
+
+    name = "json"
+    # Binary codecs produce bytes only and are sent as binary WebSocket frames
+    binary = False
+
+    def dumps(self, obj: Any) -> str:
+        """Encode ``obj`` as a JSON string."""
+        return json.dumps(obj)
+
+    def dumpb(self, obj: Any) -> bytes:
+        """Encode ``obj`` as UTF-8 JSON bytes."""
+        return json.dumps(obj).encode("utf-8")
+
+    def loads(self, data: Buffer) -> Any:
+        """Decode JSON from a string or bytes-like object."""
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """Codec backed by ``orjson``, several times faster on large payloads.
+
+    Values ``orjson`` cannot encode (such as integers beyond 64 bits) fall
+    back to the standard library so behaviour never depends on which codec
+    was picked.
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+        self._options = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj: Any) -> str:
+        return self.dumpb(obj).decode("utf-8")
+
+    def dumpb(self, obj: Any) -> bytes:
+        try:
+            return self._orjson.dumps(obj, option=self._options)
+        except TypeError:
+            return super().dumpb(obj)
+
+    def loads(self, data: Buffer) -> Any:
+        return self._orjson.loads(data)
+
+
+class MsgpackCodec(JSONCodec):
+    """MessagePack codec, used only when negotiated at ``initialize``."""
+
+    name = "msgpack"
+    binary = True
+
+    def __init__(self):
+        import msgpack
+
+        self._msgpack = msgpack
+
+    def dumps(self, obj: Any) -> str:
+        raise TypeError("msgpack is a binary codec; use dumpb")
+
+    def dumpb(self, obj: Any) -> bytes:
+        return self._msgpack.packb(obj, use_bin_type=True)
+
+    def loads(self, data: Buffer) -> Any:
+        return self._msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+class CborCodec(JSONCodec):
+    """CBOR codec, used only when negotiated at ``initialize``."""
+
+    name = "cbor"
+    binary = True
+
+    def __init__(self):
+        import cbor2
+
+        self._cbor2 = cbor2
+
+    def dumps(self, obj: Any) -> str:
+        raise TypeError("cbor is a binary codec; use dumpb")
+
+    def dumpb(self, obj: Any) -> bytes:
+        return self._cbor2.dumps(obj)
+
+    def loads(self, data: Buffer) -> Any:
+        return self._cbor2.loads(bytes(data))
+
+
+CODECS: Dict[str, Type[JSONCodec]] = {
+    "json": JSONCodec,
+    "orjson": OrjsonCodec,
+    "msgpack": MsgpackCodec,
+    "cbor": CborCodec,
+}
+
+# Fastest first; "auto" picks the first one that imports
+PREFERRED_CODECS = ["orjson", "json"]
+
+# Binary encodings in the order a client offers them at initialize
+BINARY_CODECS = ["msgpack", "cbor"]
+
+_instances: Dict[str, JSONCodec] = {}
+
+
+def get_codec(name: Optional[str] = None) -> JSONCodec:
+    """Return a shared codec instance.
+
+    ``name`` defaults to the ``AGENSPY_JSON_CODEC`` environment variable, then
+    to ``"auto"``, which uses the fastest installed encoder. Asking for a codec
+    whose package is not installed falls back to the standard library, except
+    for binary codecs, which raise :class:`ImportError` instead.
+    """
+    name = name or os.environ.get("AGENSPY_JSON_CODEC") or "auto"
+    if name in _instances:
+        return _instances[name]
+
+    if name == "auto":
+        candidates = PREFERRED_CODECS
+    elif name in BINARY_CODECS:
+        # A binary codec standing in as text would break the framing
+        candidates = [name]
+    elif name in CODECS:
+        candidates = [name, "json"]
+    else:
+        raise ValueError(f"Unknown codec {name!r}; expected one of {sorted(CODECS)} or 'auto'")
+
+    for candidate in candidates:
+        try:
+            codec = CODECS[candidate]()
+            break
+        except ImportError:
+            if candidate == name and name not in BINARY_CODECS:
+                logger.warning(f"JSON codec {name} is not installed, falling back to the standard library")
+    else:
+        raise ImportError(f"The package for codec {name} is not installed")
+    _instances[name] = codec
+    return codec
+
+
+def available_binary_codecs() -> List[str]:
+    """Names of the binary codecs whose packages are installed, in preference order."""
+    available = []
+    for name in BINARY_CODECS:
+        try:
+            get_codec(name)
+        except ImportError:
+            continue
+        available.append(name)
+    return available
+
+
+def negotiate_encoding(offered: Optional[List[str]], supported: List[str]) -> str:
+    """Pick the first encoding in the client's ``offered`` list that the server ``supported``.
+
+    Falls back to ``"json"``, which both sides always understand.
+    """
+    for name in offered or []:
+        if name in supported:
+            return name
+    return "json"
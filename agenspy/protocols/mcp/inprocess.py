@@ -0,0 +1,129 @@
+"""In-process MCP transport for a ``PythonMCPServer`` running in the same interpreter."""
+
+import asyncio
+import itertools
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional, Tuple
+
+from .codec import get_codec
+from .result_cache import ToolResultCache
+from .session import PythonServerSession
+from .transport import MCPError, ToolStream
+
+
+class InProcessTransport:
+    """Hand requests straight to a ``PythonMCPServer`` without sockets or serialization.
+
+    Requests keep their protocol shape: they carry ids, go through
+    ``process_request`` with the server's admission control and worker pools,
+    and error responses raise :class:`MCPError` as on any other transport.
+    Arguments and results are passed by reference, so neither side may mutate
+    them afterwards. The server's coroutines run on a private event loop
+    thread, so sync and async callers alike can use the transport. That is
+    also why a server bound in process should not be served over a network
+    transport at the same time.
+    """
+
+    def __init__(self, server: Any, name: str = "inproc"):
+        self.server = server
+        self.name = name
+        # Only used to flatten non-text tool results for the client API
+        self.codec = get_codec()
+        self._ids = itertools.count(1)
+        self._closed = False
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name=f"{name}-inproc", daemon=True)
+        self._thread.start()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def send_request(self, method: str, params: Optional[Dict[str, Any]] = None) -> Future:
+        """Dispatch a request and return a future resolved with its result."""
+        return self._submit(method, params)
+
+    def send_batch(self, calls: List[Tuple[str, Optional[Dict[str, Any]]]]) -> List[Future]:
+        """Dispatch several requests at once; the server runs them concurrently either way."""
+        return [self.send_request(method, params) for method, params in calls]
+
+    def request(self, method: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Any:
+        """Dispatch a request and block until its result is ready."""
+        future = self.send_request(method, params)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # Unlike a remote call, the handler really is cancelled
+            future.cancel()
+            raise TimeoutError(f"MCP request {method} timed out after {timeout}s")
+
+    async def arequest(
+        self, method: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None
+    ) -> Any:
+        """Dispatch a request and await its result without tying up a thread."""
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(self.send_request(method, params)), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"MCP request {method} timed out after {timeout}s")
+
+    def stream_request(
+        self, method: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None
+    ) -> ToolStream:
+        """Dispatch a request whose handler hands each chunk straight to the returned stream."""
+        stream = ToolStream(timeout)
+        future = self._submit(method, params, stream)
+        stream.follow(future, on_close=future.cancel)
+        return stream
+
+    def close(self) -> None:
+        """Stop the loop thread; the server itself keeps running."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            asyncio.run_coroutine_threadsafe(self._cancel_all(), self._loop).result(timeout=5)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        if not self._thread.is_alive():
+            self._loop.close()
+
+    async def _cancel_all(self) -> None:
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _submit(self, method: str, params: Optional[Dict[str, Any]], stream: Optional[ToolStream] = None) -> Future:
+        if self._closed:
+            raise MCPError(f"Transport {self.name} is closed")
+        message = {"id": next(self._ids), "method": method, "params": params if params is not None else {}}
+        return asyncio.run_coroutine_threadsafe(self._dispatch(message, stream), self._loop)
+
+    async def _dispatch(self, message: Dict[str, Any], stream: Optional[ToolStream] = None) -> Any:
+        emit = None
+        if stream is not None:
+
+            async def emit(request_id: Any, chunk: Any) -> None:
+                stream.put(chunk)
+
+        response = await self.server.process_request(message, emit=emit)
+        if response.get("error") is not None:
+            raise MCPError.from_response(response)
+        return response.get("result")
+
+
+class InProcessMCPSession(PythonServerSession):
+    """Session bound directly to a ``PythonMCPServer`` instance in this process."""
+
+    def __init__(self, server: Any, request_timeout: float = 30.0, result_cache: Optional[ToolResultCache] = None):
+        super().__init__(f"inproc://{server.name}", request_timeout, result_cache=result_cache)
+        self.server = server
+        self.transport: Optional[InProcessTransport] = None
+
+    def connect(self) -> None:
+        self.transport = InProcessTransport(self.server, name=self.server_url)
+        self._load_tools(self._request("initialize", self._initialize_params()))
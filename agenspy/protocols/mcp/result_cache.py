@@ -0,0 +1,120 @@
+"""In-memory cache for MCP tool results."""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class ToolResultCache:
+    """LRU cache of tool results keyed by tool name and canonicalized arguments.
+
+    Only tools with a TTL are cached. A tool's TTL comes from ``policies``
+    first (``None`` or ``0`` there opts a tool out), then from the
+    ``cache_ttl`` the tool declares in its catalog entry, then from
+    ``default_ttl``. The cache is bounded both by entry count and by the total
+    size of the cached results; the least recently used entries are evicted
+    first.
+    """
+
+    def __init__(
+        self,
+        policies: Optional[Dict[str, Optional[float]]] = None,
+        default_ttl: Optional[float] = None,
+        max_entries: int = 1024,
+        max_bytes: int = 32 * 1024 * 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.policies = dict(policies or {})
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        """Total size of the cached results."""
+        return self._bytes
+
+    def ttl_for(self, tool_name: str, tool_info: Optional[Dict[str, Any]] = None) -> Optional[float]:
+        """Return how long results of ``tool_name`` may be cached, or ``None`` if they may not."""
+        if tool_name in self.policies:
+            ttl = self.policies[tool_name]
+        elif isinstance(tool_info, dict) and tool_info.get("cache_ttl"):
+            ttl = tool_info["cache_ttl"]
+        else:
+            ttl = self.default_ttl
+        return ttl if ttl and ttl > 0 else None
+
+    @staticmethod
+    def make_key(tool_name: str, args: Optional[Dict[str, Any]]) -> str:
+        """Build a key that is identical for equal arguments regardless of their order."""
+        canonical = json.dumps(args or {}, sort_keys=True, separators=(",", ":"), default=str)
+        return f"{tool_name}\x00{canonical}"
+
+    def get(self, tool_name: str, args: Optional[Dict[str, Any]]) -> Optional[Any]:
+        """Return the cached result, or ``None`` on a miss or an expired entry."""
+        key = self.make_key(tool_name, args)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value, size = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self._bytes -= size
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, tool_name: str, args: Optional[Dict[str, Any]], value: Any, ttl: float) -> None:
+        """Store a result for ``ttl`` seconds, evicting least recently used entries to stay in bounds."""
+        key = self.make_key(tool_name, args)
+        size = _size_of(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (self._clock() + ttl, value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def invalidate(self, tool_name: Optional[str] = None) -> None:
+        """Drop cached results for one tool, or for every tool."""
+        with self._lock:
+            if tool_name is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            prefix = f"{tool_name}\x00"
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                self._bytes -= self._entries.pop(key)[2]
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get hit/miss counters and current occupancy."""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._bytes}
+
+
+def _size_of(value: Any) -> int:
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    return len(json.dumps(value, default=str).encode("utf-8"))
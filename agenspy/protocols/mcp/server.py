@@ -1,5 +1,6 @@
 """MCP Server implementation for Agenspy."""
 
+import inspect
 from typing import Any, Callable, Dict, List, Optional
 
 import dspy
@@ -61,6 +62,19 @@ class MCPServer(BaseProtocol):
         self.tools[name] = {"description": description, "handler": handler, "parameters": parameters or {}}
         print(f"📝 Registered MCP tool: {name}")
 
+    def call_tool(self, tool_name: str, args: Optional[Dict[str, Any]] = None) -> Any:
+        """Invoke a registered tool handler directly."""
+        if tool_name not in self.tools:
+            raise ValueError(f"Tool {tool_name} not found")
+        return self.tools[tool_name]["handler"](**(args or {}))
+
+    async def acall_tool(self, tool_name: str, args: Optional[Dict[str, Any]] = None) -> Any:
+        """Invoke a registered tool handler, awaiting it if it is a coroutine function."""
+        result = self.call_tool(tool_name, args)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
     def register_context_provider(self, provider: Callable):
         """Register a context provider."""
         self.context_providers.append(provider)
@@ -105,6 +119,10 @@ class MCPServer(BaseProtocol):
                 error=f"Unknown request type: {request_type}", protocol_info="MCP server error response"
             )
 
+    async def _ahandle_request(self, **kwargs) -> dspy.Prediction:
+        """Handle server requests; these only read local state, so no thread is needed."""
+        return self._handle_request(**kwargs)
+
 
 class MockMCPServerInstance:
     """Mock MCP server instance for demonstration."""
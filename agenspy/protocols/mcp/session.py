@@ -1,8 +1,53 @@
 """MCP Session management for Agenspy."""
 
+import asyncio
 import subprocess
-import time
-from typing import Any, Dict, List
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Future, wait
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .catalog_cache import ToolCatalogCache
+from .result_cache import ToolResultCache
+from .transport import MCPError, StreamTransport, ToolStream, content_to_text
+
+MCP_PROTOCOL_VERSION = "2024-11-05"
+CLIENT_INFO = {"name": "agenspy", "version": "0.0.1"}
+
+
+def shaping_params(
+    fields: Optional[List[str]] = None, cursor: Optional[str] = None, limit: Optional[int] = None
+) -> Dict[str, Any]:
+    """Build the projection and pagination parameters ``PythonMCPServer`` accepts on ``call_tool``."""
+    params: Dict[str, Any] = {}
+    if fields is not None:
+        params["fields"] = list(fields)
+    if cursor is not None:
+        params["cursor"] = cursor
+    if limit is not None:
+        params["limit"] = limit
+    return params
+
+
+def catalog_version(init_result: Dict[str, Any]) -> Optional[str]:
+    """Derive the tool catalog cache version from an ``initialize`` result.
+
+    This is the server's reported version, refined by a catalog fingerprint
+    when the server advertises one (``PythonMCPServer`` does).
+    """
+    server_info = init_result.get("serverInfo") or init_result.get("server_info") or {}
+    version = server_info.get("version")
+    if not version:
+        return None
+    fingerprint = init_result.get("catalog_version")
+    return f"{version}+{fingerprint}" if fingerprint else str(version)
+
+
+def _failed_future(error: Exception) -> Future:
+    future: Future = Future()
+    future.set_exception(error)
+    return future
 
 
 class MockMCPSession:
@@ -10,6 +55,8 @@ class MockMCPSession:
 
     def __init__(self, server_url: str):
         self.server_url = server_url
+        self.server_info = {"name": "mock-mcp-server", "version": "0.0.1"}
+        self.catalog_version = self.server_info["version"]
         self.tools = {
             "github_search": {"description": "Search GitHub repositories and PRs", "parameters": ["query", "type"]},
             "file_reader": {"description": "Read file contents from repository", "parameters": ["file_path", "repo"]},
@@ -52,40 +99,462 @@ class MockMCPSession:
             return "Code quality: Good. Security: 2 minor issues found (hardcoded secrets)"
         return f"Executed {tool_name} with args: {args}"
 
+    def call_tool(self, tool_name: str, args: Dict[str, Any], **shaping) -> str:
+        return self.execute_tool(tool_name, args)
+
+    def stream_tool(self, tool_name: str, args: Dict[str, Any]) -> ToolStream:
+        return ToolStream.of([self.execute_tool(tool_name, args)])
+
+    def execute_tools(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        return [{"tool": name, "result": self.execute_tool(name, args)} for name, args in calls]
+
+    async def aget_context(self, request: str) -> str:
+        return self.get_context(request)
+
+    async def aexecute_tool(self, tool_name: str, args: Dict[str, Any]) -> str:
+        return self.execute_tool(tool_name, args)
+
+    async def acall_tool(self, tool_name: str, args: Dict[str, Any], **shaping) -> str:
+        return self.execute_tool(tool_name, args)
+
+    async def aexecute_tools(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        return self.execute_tools(calls)
+
     def close(self):
         pass
 
 
-class BackgroundMCPServer:
-    """Manages MCP server as a background process."""
+class TransportMCPSession(ABC):
+    """Tool-level MCP session over a request/response transport.
+
+    Subclasses open ``transport`` (anything with ``send_request``,
+    ``send_batch``, ``request`` and ``arequest``) and provide
+    ``server_key``. Tool discovery, result caching and batched calls are
+    shared. ``LIST_TOOLS_METHOD`` and ``CALL_TOOL_METHOD`` name the methods
+    of the server's dialect.
+    """
+
+    LIST_TOOLS_METHOD = "tools/list"
+    CALL_TOOL_METHOD = "tools/call"
+
+    def __init__(
+        self,
+        request_timeout: float = 30.0,
+        catalog_cache: Optional[ToolCatalogCache] = None,
+        result_cache: Optional[ToolResultCache] = None,
+        batch_requests: bool = False,
+    ):
+        self.request_timeout = request_timeout
+        self.transport: Any = None
+        self.server_info: Dict[str, Any] = {}
+        self.instructions = ""
+        self.tools = {}
+        self.catalog_cache = catalog_cache
+        self.catalog_version: Optional[str] = None
+        self.result_cache = result_cache
+        self.batch_requests = batch_requests
+        self._tools_stale = False
+
+    @property
+    @abstractmethod
+    def server_key(self) -> str:
+        """Identify this server in the tool catalog cache."""
+
+    def list_tools(self) -> Dict[str, Any]:
+        """Fetch the full tool catalog, following pagination cursors."""
+        tools = {}
+        cursor = None
+        while True:
+            result = self._request(self.LIST_TOOLS_METHOD, {"cursor": cursor} if cursor else {})
+            for tool in result.get("tools", []):
+                tools[tool["name"]] = self._tool_info(tool)
+                if tool.get("cache_ttl"):
+                    tools[tool["name"]]["cache_ttl"] = tool["cache_ttl"]
+            cursor = result.get("nextCursor")
+            if not cursor:
+                return tools
+
+    def call_tool(
+        self,
+        tool_name: str,
+        args: Dict[str, Any],
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> str:
+        """Execute a tool and return its result as text, raising :class:`MCPError` if it fails.
+
+        ``fields``, ``cursor`` and ``limit`` ask the server to project and page
+        the result before sending it; only ``PythonMCPServer`` supports them.
+        """
+        self._check_tool(tool_name)
+        params, key = self._call_params(tool_name, args, shaping_params(fields, cursor, limit))
+
+        ttl, cached = self._cached_result(tool_name, key)
+        if cached is not None:
+            return cached
+
+        result = self._request(self.CALL_TOOL_METHOD, params)
+        return self._store_result(tool_name, key, ttl, result)
+
+    async def acall_tool(
+        self,
+        tool_name: str,
+        args: Dict[str, Any],
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> str:
+        """Execute a tool without blocking the event loop, raising :class:`MCPError` if it fails."""
+        if self._tools_stale:
+            await asyncio.to_thread(self._refresh_tools)
+        if tool_name not in self.tools:
+            raise MCPError(f"Tool {tool_name} not available")
+        params, key = self._call_params(tool_name, args, shaping_params(fields, cursor, limit))
+
+        ttl, cached = self._cached_result(tool_name, key)
+        if cached is not None:
+            return cached
+
+        result = await self._arequest(self.CALL_TOOL_METHOD, params)
+        return self._store_result(tool_name, key, ttl, result)
+
+    def stream_tool(self, tool_name: str, args: Dict[str, Any]) -> ToolStream:
+        """Execute a tool and iterate over its result as it is produced.
+
+        Standard MCP answers ``tools/call`` in one piece, so the whole result
+        arrives as a single text chunk. Streams bypass the result cache.
+        """
+        self._check_tool(tool_name)
+        stream = ToolStream(self.request_timeout)
+        future = self.transport.send_request(self.CALL_TOOL_METHOD, {"name": tool_name, "arguments": args})
+
+        def deliver(done: Future):
+            try:
+                stream.put(self._result_text(done.result()))
+            except Exception as e:
+                stream.finish(error=e)
+            else:
+                stream.finish()
+
+        future.add_done_callback(deliver)
+        return stream
+
+    def execute_tool(self, tool_name: str, args: Dict[str, Any]) -> str:
+        """Execute tool via MCP server."""
+        if self._tools_stale:
+            self._refresh_tools()
+        if tool_name not in self.tools:
+            return f"Tool {tool_name} not available"
+        try:
+            return self.call_tool(tool_name, args)
+        except (MCPError, TimeoutError) as e:
+            return f"Error executing {tool_name}: {e}"
+
+    async def aexecute_tool(self, tool_name: str, args: Dict[str, Any]) -> str:
+        """Execute tool via MCP server without blocking the event loop."""
+        if self._tools_stale:
+            await asyncio.to_thread(self._refresh_tools)
+        if tool_name not in self.tools:
+            return f"Tool {tool_name} not available"
+        try:
+            return await self.acall_tool(tool_name, args)
+        except (MCPError, TimeoutError) as e:
+            return f"Error executing {tool_name}: {e}"
+
+    def execute_tools(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Execute several tools in one round trip.
+
+        Returns one ``{"tool", "result"}`` or ``{"tool", "error"}`` dict per
+        call, in call order. With ``batch_requests`` the calls go out as a
+        single JSON-RPC batch; otherwise they are pipelined back to back, since
+        not every server accepts batch arrays.
+        """
+        if self._tools_stale:
+            self._refresh_tools()
+        results, pending = self._plan_calls(calls)
+        if not pending:
+            return results
+
+        futures = self._send_calls(pending)
+        done, _ = wait(futures, timeout=self.request_timeout)
+        for (index, name, args, ttl), future in zip(pending, futures):
+            results[index] = self._call_outcome(name, args, ttl, future, future in done)
+        return results
+
+    async def aexecute_tools(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Execute several tools in one round trip without blocking the event loop."""
+        if self._tools_stale:
+            await asyncio.to_thread(self._refresh_tools)
+        results, pending = self._plan_calls(calls)
+        if not pending:
+            return results
+
+        futures = self._send_calls(pending)
+        waiters = [asyncio.wrap_future(future) for future in futures]
+        await asyncio.wait(waiters, timeout=self.request_timeout)
+        for (index, name, args, ttl), future in zip(pending, futures):
+            results[index] = self._call_outcome(name, args, ttl, future, future.done())
+        return results
+
+    def get_context(self, request: str) -> str:
+        """Get context from MCP server."""
+        # MCP has no free-form context request; the closest thing the server
+        # offers is the instructions it returned from initialize.
+        if self.instructions:
+            return f"Context retrieved via MCP: {request}\n{self.instructions}"
+        return f"Context retrieved via MCP: {request}"
+
+    async def aget_context(self, request: str) -> str:
+        return self.get_context(request)
+
+    def _check_tool(self, tool_name: str):
+        if self._tools_stale:
+            self._refresh_tools()
+        if tool_name not in self.tools:
+            raise MCPError(f"Tool {tool_name} not available")
+
+    def _load_tools(self, init_result: Dict[str, Any]):
+        """Record the ``initialize`` result and load the catalog from the cache or the server."""
+        self.server_info = init_result.get("serverInfo") or init_result.get("server_info") or {}
+        self.instructions = init_result.get("instructions", "")
+        self.catalog_version = catalog_version(init_result)
+
+        cached = None
+        if self.catalog_cache and self.catalog_version:
+            cached = self.catalog_cache.get(self.server_key, self.catalog_version)
+        if cached is not None:
+            self.tools = cached
+            print(f"📦 Loaded {len(self.tools)} MCP tools from catalog cache")
+        else:
+            self._refresh_tools()
+
+    def _tool_info(self, tool: Dict[str, Any]) -> Dict[str, Any]:
+        return {"description": tool.get("description", ""), "parameters": tool.get("inputSchema", {})}
+
+    def _result_text(self, result: Any) -> str:
+        return content_to_text(result)
+
+    def _request(self, method: str, params: Dict[str, Any]) -> Any:
+        if self.transport is None:
+            raise MCPError("MCP server is not running")
+        return self.transport.request(method, params, timeout=self.request_timeout)
+
+    async def _arequest(self, method: str, params: Dict[str, Any]) -> Any:
+        if self.transport is None:
+            raise MCPError("MCP server is not running")
+        return await self.transport.arequest(method, params, timeout=self.request_timeout)
+
+    def _call_params(
+        self, tool_name: str, args: Dict[str, Any], shaping: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Return the ``call_tool`` params and the arguments to key the result cache on."""
+        if shaping:
+            raise MCPError(f"Projection and pagination are not supported by {self.server_key}")
+        return {"name": tool_name, "arguments": args}, args
+
+    def _cached_result(self, tool_name: str, args: Dict[str, Any]) -> Tuple[Optional[float], Optional[str]]:
+        """Return the tool's cache TTL and, if there is one, any cached result."""
+        if self.result_cache is None:
+            return None, None
+        ttl = self.result_cache.ttl_for(tool_name, self.tools.get(tool_name))
+        return ttl, self.result_cache.get(tool_name, args) if ttl else None
+
+    def _store_result(self, tool_name: str, args: Dict[str, Any], ttl: Optional[float], result: Any) -> str:
+        text = self._result_text(result)
+        if ttl and not (isinstance(result, dict) and result.get("isError")):
+            self.result_cache.put(tool_name, args, text, ttl)
+        return text
+
+    def _plan_calls(self, calls: List[Tuple[str, Dict[str, Any]]]):
+        """Answer unknown and cached calls locally; return the rest as (index, name, args, ttl)."""
+        results: List[Optional[Dict[str, Any]]] = [None] * len(calls)
+        pending = []
+        for index, (name, args) in enumerate(calls):
+            if name not in self.tools:
+                results[index] = {"tool": name, "error": f"Tool {name} not available"}
+                continue
+            ttl, cached = self._cached_result(name, args)
+            if cached is not None:
+                results[index] = {"tool": name, "result": cached}
+            else:
+                pending.append((index, name, args, ttl))
+        return results, pending
+
+    def _send_calls(self, pending) -> List[Future]:
+        """Send the calls and return a future per call; calls that cannot be sent get a failed future."""
+        requests = [(self.CALL_TOOL_METHOD, {"name": name, "arguments": args}) for _, name, args, _ in pending]
+        try:
+            if self.transport is None:
+                raise MCPError("MCP server is not running")
+            if self.batch_requests:
+                return self.transport.send_batch(requests)
+        except MCPError as e:
+            return [_failed_future(e) for _ in requests]
+
+        futures = []
+        for method, params in requests:
+            try:
+                futures.append(self.transport.send_request(method, params))
+            except MCPError as e:
+                futures.append(_failed_future(e))
+        return futures
+
+    def _call_outcome(self, name, args, ttl, future: Future, finished: bool) -> Dict[str, Any]:
+        if not finished:
+            # Cancelling drops the call from the transport's pending requests
+            future.cancel()
+            return {"tool": name, "error": f"Timed out after {self.request_timeout}s"}
+        try:
+            return {"tool": name, "result": self._store_result(name, args, ttl, future.result())}
+        except MCPError as e:
+            return {"tool": name, "error": str(e)}
+
+    def _refresh_tools(self):
+        """Rediscover the tool catalog and store it in the catalog cache."""
+        self._tools_stale = False
+        self.tools = self.list_tools()
+        if self.catalog_cache and self.catalog_version:
+            self.catalog_cache.put(self.server_key, self.catalog_version, self.tools)
+
+    def _on_tools_changed(self, params: Dict[str, Any]):
+        # Runs on the transport's reader thread, which must not block on a
+        # request of its own, so the catalog is refetched on the next call.
+        self._tools_stale = True
+        if self.catalog_cache:
+            self.catalog_cache.invalidate(self.server_key)
+
+
+class PythonServerSession(TransportMCPSession):
+    """Base for sessions with a ``PythonMCPServer``, which has its own method names and result shape."""
+
+    LIST_TOOLS_METHOD = "list_tools"
+    CALL_TOOL_METHOD = "call_tool"
+
+    def __init__(self, server_url: str, request_timeout: float = 30.0, **kwargs):
+        super().__init__(request_timeout, **kwargs)
+        self.server_url = server_url
+
+    @property
+    def server_key(self) -> str:
+        return self.server_url
+
+    @abstractmethod
+    def connect(self) -> None:
+        """Open the connection, run ``initialize`` and load the tool catalog."""
+
+    def close(self) -> None:
+        if self.transport:
+            self.transport.close()
+
+    def stream_tool(self, tool_name: str, args: Dict[str, Any]) -> ToolStream:
+        """Execute a tool and iterate over the chunks its handler yields, as the server sends them.
+
+        Chunks keep the type the handler yielded. A handler that is not an
+        async generator produces its whole result as one chunk.
+        """
+        self._check_tool(tool_name)
+        return self.transport.stream_request(
+            self.CALL_TOOL_METHOD, {"name": tool_name, "arguments": args, "stream": True}, timeout=self.request_timeout
+        )
+
+    def _initialize_params(self) -> Dict[str, Any]:
+        return {"protocolVersion": MCP_PROTOCOL_VERSION, "capabilities": {}, "clientInfo": CLIENT_INFO}
+
+    def _call_params(
+        self, tool_name: str, args: Dict[str, Any], shaping: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        if not shaping:
+            return {"name": tool_name, "arguments": args}, args
+        # Differently shaped results of the same call are cached apart
+        return {"name": tool_name, "arguments": args, **shaping}, {"arguments": args, **shaping}
 
-    def __init__(self, server_command: List[str]):
+    def _tool_info(self, tool: Dict[str, Any]) -> Dict[str, Any]:
+        return {"description": tool.get("description", ""), "parameters": tool.get("parameters", {})}
+
+    def _result_text(self, result: Any) -> str:
+        content = result.get("content") if isinstance(result, dict) else result
+        if isinstance(content, str):
+            return content
+        return self.transport.codec.dumps(content)
+
+
+class BackgroundMCPServer(TransportMCPSession):
+    """Manages MCP server as a background process.
+
+    The server speaks newline-delimited JSON-RPC over its stdin/stdout. All
+    calls share one :class:`StreamTransport`, so tool calls issued from
+    different threads are pipelined on the same subprocess.
+    """
+
+    def __init__(
+        self,
+        server_command: List[str],
+        request_timeout: float = 30.0,
+        startup_timeout: float = 10.0,
+        ready_marker: Optional[str] = None,
+        handshake: bool = True,
+        catalog_cache: Optional[ToolCatalogCache] = None,
+        result_cache: Optional[ToolResultCache] = None,
+        batch_requests: bool = False,
+    ):
+        super().__init__(request_timeout, catalog_cache, result_cache, batch_requests)
         self.server_command = server_command
+        self.startup_timeout = startup_timeout
+        self.ready_marker = ready_marker
+        self.handshake = handshake
         self.process = None
-        self.tools = {}
+        self.transport: Optional[StreamTransport] = None
+        self.stderr_tail: Deque[str] = deque(maxlen=50)
+        self._ready = threading.Event()
+        self._init_future: Optional[Future] = None
 
     def start_server(self):
-        """Start MCP server in background."""
+        """Start MCP server in background.
+
+        Startup finishes as soon as the server answers the ``initialize``
+        handshake or prints ``ready_marker`` on stdout or stderr, and fails as
+        soon as the process exits. ``startup_timeout`` bounds the wait. With
+        neither a handshake nor a marker, a process still alive at the
+        deadline is considered started.
+        """
         try:
             print(f"🚀 Starting MCP server in background: {' '.join(self.server_command)}")
 
+            self._ready.clear()
             self.process = subprocess.Popen(
                 self.server_command,
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                text=True,
-                bufsize=0,
             )
+            self.transport = StreamTransport(self.process.stdout, self.process.stdin, name=self.server_command[0])
+            self.transport.on_text(self._check_ready_marker)
+            self.transport.on_notification("notifications/tools/list_changed", self._on_tools_changed)
+            # Only read once the handlers are in place, so an early ready marker is not missed
+            self.transport.start()
+            threading.Thread(target=self._drain_stderr, name="mcp-stderr", daemon=True).start()
 
-            time.sleep(3)
+            if self.handshake:
+                self._init_future = self.transport.send_request("initialize", self._initialize_params())
+                self._init_future.add_done_callback(lambda _: self._ready.set())
+            else:
+                threading.Thread(target=self._watch_exit, name="mcp-exit-watch", daemon=True).start()
 
-            if self.process.poll() is None:
+            signalled = self._ready.wait(self.startup_timeout)
+
+            if self._startup_failed():
+                print("❌ MCP server failed to start")
+            elif signalled or not (self.handshake or self.ready_marker):
                 print("✅ MCP server started successfully")
                 return True
             else:
-                print("❌ MCP server failed to start")
-                return False
+                print(f"❌ MCP server not ready after {self.startup_timeout}s")
+
+            for line in self.stderr_tail:
+                print(f"   {line}")
+            self.stop_server()
+            return False
 
         except Exception as e:
             print(f"❌ Failed to start MCP server: {e}")
@@ -94,12 +563,12 @@ class BackgroundMCPServer:
     def connect_client(self):
         """Connect to the running MCP server."""
         try:
-            self.tools = {
-                "search_repositories": {"description": "Search GitHub repositories"},
-                "get_file_contents": {"description": "Get file contents from repository"},
-                "list_issues": {"description": "List repository issues"},
-                "get_repository": {"description": "Get repository information"},
-            }
+            if self._init_future is not None:
+                result = self._init_future.result(timeout=self.request_timeout)
+            else:
+                result = self._request("initialize", self._initialize_params())
+            self.transport.notify("notifications/initialized")
+            self._load_tools(result)
 
             print(f"🔗 Connected to MCP server with {len(self.tools)} tools")
             return True
@@ -108,26 +577,15 @@ class BackgroundMCPServer:
             print(f"❌ Failed to connect to MCP server: {e}")
             return False
 
-    def execute_tool(self, tool_name: str, args: Dict[str, Any]) -> str:
-        """Execute tool via MCP server."""
-        if tool_name not in self.tools:
-            return f"Tool {tool_name} not available"
-
-        if tool_name == "search_repositories":
-            return f"Found repositories matching: {args.get('query', 'N/A')}"
-        elif tool_name == "get_file_contents":
-            return f"File contents from {args.get('repo', 'unknown')}/{args.get('path', 'unknown')}"
-        elif tool_name == "get_repository":
-            return f"Repository info for: {args.get('url', 'unknown')}"
-        else:
-            return f"Executed {tool_name} with args: {args}"
-
-    def get_context(self, request: str) -> str:
-        """Get context from MCP server."""
-        return f"Context retrieved via MCP: {request}"
+    @property
+    def server_key(self) -> str:
+        """Identify this server in the tool catalog cache."""
+        return " ".join(self.server_command)
 
     def stop_server(self):
         """Stop the background MCP server."""
+        if self.transport:
+            self.transport.close()
         if self.process:
             try:
                 self.process.terminate()
@@ -138,3 +596,28 @@ class BackgroundMCPServer:
                 print("🛑 MCP server force killed")
             except Exception as e:
                 print(f"⚠️ Error stopping server: {e}")
+
+    def _initialize_params(self) -> Dict[str, Any]:
+        return {"protocolVersion": MCP_PROTOCOL_VERSION, "capabilities": {}, "clientInfo": CLIENT_INFO}
+
+    def _startup_failed(self) -> bool:
+        if self.process.poll() is not None:
+            return True
+        return bool(self._init_future and self._init_future.done() and self._init_future.exception())
+
+    def _check_ready_marker(self, line: str):
+        if self.ready_marker and self.ready_marker in line:
+            self._ready.set()
+
+    def _watch_exit(self):
+        """Wake up the startup wait if the process exits before it is ready."""
+        self.process.wait()
+        self._ready.set()
+
+    def _drain_stderr(self):
+        """Keep the stderr pipe from filling up and remember its last lines."""
+        for raw in iter(self.process.stderr.readline, b""):
+            line = raw.decode("utf-8", errors="replace").rstrip()
+            if line:
+                self.stderr_tail.append(line)
+                self._check_ready_marker(line)
@@ -0,0 +1,102 @@
+"""Shared-memory ring buffer for passing large MCP payloads between co-located processes."""
+
+import fnmatch
+import mmap
+import os
+import struct
+import tempfile
+from typing import Any, Callable, Optional, Tuple
+
+# head (bytes ever written by the producer) and tail (bytes released by the consumer)
+_HEADER = struct.Struct("<QQ")
+_TAIL = struct.Struct("<Q")
+
+# Name of every buffer file made by SharedRingBuffer.create
+RING_PATTERN = "agenspy-*.ring"
+
+
+def default_shm_dir() -> str:
+    """Directory for ring buffer files: ``/dev/shm`` where it exists, else the temp directory."""
+    return "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+def is_ring_buffer_path(path: str) -> bool:
+    """Whether ``path``, with symlinks resolved, names a ring buffer file in :func:`default_shm_dir`."""
+    resolved = os.path.realpath(path)
+    return os.path.dirname(resolved) == os.path.realpath(default_shm_dir()) and fnmatch.fnmatch(
+        os.path.basename(resolved), RING_PATTERN
+    )
+
+
+class SharedRingBuffer:
+    """Single-producer, single-consumer ring buffer in a memory-mapped file.
+
+    The producer appends a payload with :meth:`write` and sends the returned
+    ``(offset, length)`` over its control channel; the consumer hands them to
+    :meth:`consume` in the order they arrive, which frees the space. Offsets
+    are monotonic byte counters. A payload never wraps around the end of the
+    buffer; the producer skips to the start instead. When a payload does not
+    fit in the free space, :meth:`write` returns ``None`` and the producer sends
+    it inline.
+    """
+
+    def __init__(self, path: str, size: int, fd: Optional[int] = None):
+        self.path = path
+        self.size = size
+        created = fd is not None
+        if fd is None:
+            fd = os.open(path, os.O_RDWR)
+        try:
+            if created:
+                os.ftruncate(fd, _HEADER.size + size)
+            elif os.fstat(fd).st_size != _HEADER.size + size:
+                raise ValueError(f"Shared buffer {path} is not {size} bytes")
+            self._map = mmap.mmap(fd, _HEADER.size + size)
+        finally:
+            os.close(fd)
+        self._head = _HEADER.unpack_from(self._map)[0]
+
+    @classmethod
+    def create(cls, size: int, directory: Optional[str] = None) -> "SharedRingBuffer":
+        """Create a new buffer file readable only by the current user."""
+        fd, path = tempfile.mkstemp(prefix="agenspy-", suffix=".ring", dir=directory or default_shm_dir())
+        return cls(path, size, fd=fd)
+
+    def write(self, data: bytes) -> Optional[Tuple[int, int]]:
+        """Copy ``data`` into the buffer and return its ``(offset, length)``, or ``None`` if it does not fit."""
+        length = len(data)
+        position = self._head % self.size
+        start = self._head + (self.size - position if position + length > self.size else 0)
+        if start + length - self._tail() > self.size:
+            return None
+
+        begin = _HEADER.size + start % self.size
+        self._map[begin : begin + length] = data
+        self._head = start + length
+        struct.pack_into("<Q", self._map, 0, self._head)
+        return start, length
+
+    def consume(self, offset: int, length: int, parse: Callable[[memoryview], Any]) -> Any:
+        """Parse a payload in place, then release it and everything written before it."""
+        begin = _HEADER.size + offset % self.size
+        with memoryview(self._map) as buffer, buffer[begin : begin + length] as view:
+            value = parse(view)
+        _TAIL.pack_into(self._map, 8, offset + length)
+        return value
+
+    def close(self) -> None:
+        try:
+            self._map.close()
+        except BufferError:
+            # A reader is still parsing a payload; the mapping goes when it finishes
+            pass
+
+    def unlink(self) -> None:
+        """Remove the file; processes that have it mapped keep using it."""
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _tail(self) -> int:
+        return _TAIL.unpack_from(self._map, 8)[0]
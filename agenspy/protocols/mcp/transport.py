@@ -0,0 +1,437 @@
+"""JSON-RPC transports for MCP sessions."""
+
+import asyncio
+import functools
+import itertools
+import json
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import IO, Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from .codec import JSONCodec, get_codec
+
+logger = logging.getLogger(__name__)
+
+# JSON-RPC server error code of calls rejected by PythonMCPServer's admission
+# control; the error data holds ``retry_after``
+SERVER_OVERLOADED = -32000
+
+
+class MCPError(Exception):
+    """Error reported by an MCP server or raised by a transport."""
+
+    def __init__(self, message: str, code: Optional[int] = None, data: Any = None):
+        super().__init__(message)
+        self.code = code
+        self.data = data
+
+    @property
+    def retry_after(self) -> Optional[float]:
+        """Seconds the server asked the client to wait before retrying, if it is overloaded."""
+        return self.data.get("retry_after") if isinstance(self.data, dict) else None
+
+    @classmethod
+    def from_response(cls, response: Dict[str, Any]) -> "MCPError":
+        """Build an error from a response carrying a JSON-RPC error object or a plain error string."""
+        error = response["error"]
+        if isinstance(error, dict):
+            return cls(str(error.get("message", error)), error.get("code"), error.get("data"))
+        # PythonMCPServer reports errors as strings with optional code and data siblings
+        return cls(str(error), response.get("code"), response.get("data"))
+
+
+_CHUNK = object()
+_END = object()
+
+
+class ToolStream:
+    """Chunks of a streamed tool result, for ``for`` and ``async for`` alike.
+
+    Chunks are yielded as they arrive. Iteration stops when the final result
+    arrives, which is then kept in ``result``; if the call failed, iteration
+    raises its :class:`MCPError` instead. ``timeout`` bounds the wait for each
+    chunk rather than for the whole stream.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+        self.result: Any = None
+        self._items: Deque[Tuple[Any, ...]] = deque()
+        self._cond = threading.Condition()
+        self._wakers: List[Callable[[], None]] = []
+        self._on_close: Optional[Callable[[], Any]] = None
+
+    @classmethod
+    def of(cls, chunks: Iterable[Any], result: Any = None) -> "ToolStream":
+        """Build an already finished stream, for results that cannot be streamed."""
+        stream = cls()
+        for chunk in chunks:
+            stream.put(chunk)
+        stream.finish(result)
+        return stream
+
+    def put(self, chunk: Any) -> None:
+        self._push((_CHUNK, chunk))
+
+    def finish(self, result: Any = None, error: Optional[Exception] = None) -> None:
+        self._push((_END, result, error))
+
+    def follow(self, future: Future, on_close: Optional[Callable[[], Any]] = None) -> None:
+        """Finish the stream when ``future``, the request's final response, completes."""
+        self._on_close = on_close
+        future.add_done_callback(self._finish_from)
+
+    def close(self) -> None:
+        """Stop listening; chunks that arrive later are dropped."""
+        if self._on_close is not None:
+            self._on_close()
+        self.finish(error=MCPError("Stream closed"))
+
+    def __iter__(self) -> "ToolStream":
+        return self
+
+    def __next__(self) -> Any:
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, self.timeout):
+                raise TimeoutError(f"No stream chunk within {self.timeout}s")
+            item = self._items.popleft()
+        return self._unpack(item)
+
+    def __aiter__(self) -> "ToolStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._items:
+                    item = self._items.popleft()
+                    break
+                waiter = loop.create_future()
+                self._wakers.append(functools.partial(_wake, loop, waiter))
+            try:
+                await asyncio.wait_for(waiter, self.timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"No stream chunk within {self.timeout}s")
+        try:
+            return self._unpack(item)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    def _unpack(self, item: Tuple[Any, ...]) -> Any:
+        if item[0] is _CHUNK:
+            return item[1]
+        with self._cond:
+            # Stay finished for any later next() call
+            self._items.appendleft(item)
+        _, self.result, error = item
+        if error is not None:
+            raise error
+        raise StopIteration
+
+    def _push(self, item: Tuple[Any, ...]) -> None:
+        with self._cond:
+            if self._items and self._items[-1][0] is _END:
+                return
+            self._items.append(item)
+            self._cond.notify_all()
+            wakers, self._wakers = self._wakers, []
+        for wake in wakers:
+            wake()
+
+    def _finish_from(self, future: Future) -> None:
+        if future.cancelled():
+            self.finish(error=MCPError("Request cancelled"))
+        elif future.exception() is not None:
+            self.finish(error=future.exception())
+        else:
+            self.finish(future.result())
+
+
+def _wake(loop: asyncio.AbstractEventLoop, waiter: asyncio.Future) -> None:
+    try:
+        loop.call_soon_threadsafe(lambda: waiter.done() or waiter.set_result(None))
+    except RuntimeError:
+        # The waiting loop has already closed
+        pass
+
+
+class StreamTransport:
+    """Newline-delimited JSON-RPC transport over a pair of byte streams.
+
+    Each message is written as a single line. Responses are matched to their
+    callers by request id, so any number of threads can have calls in flight
+    on the same stream at once. A background thread owns the read side and
+    resolves pending futures as responses arrive, in whatever order the server
+    sends them. It runs from :meth:`start`, so handlers registered before then
+    see every message.
+    """
+
+    def __init__(self, reader: IO[bytes], writer: IO[bytes], name: str = "mcp", codec: Optional[JSONCodec] = None):
+        self.name = name
+        self.codec = codec or get_codec()
+        self._reader = reader
+        self._writer = writer
+        self._write_lock = threading.Lock()
+        self._pending: Dict[int, Future] = {}
+        self._streams: Dict[int, ToolStream] = {}
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._notification_handlers: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {}
+        self._text_handlers: List[Callable[[str], None]] = []
+        self._closed = threading.Event()
+        # A SharedRingBuffer the server writes large messages into, if one was negotiated
+        self.shared_buffer = None
+        self._reader_thread = threading.Thread(target=self._read_loop, name=f"{name}-reader", daemon=True)
+
+    def start(self) -> None:
+        """Start reading; register ``on_text`` and ``on_notification`` handlers first."""
+        self._reader_thread.start()
+
+    @property
+    def closed(self) -> bool:
+        """Whether the read side has reached end of stream or the transport was closed."""
+        return self._closed.is_set()
+
+    def send_request(self, method: str, params: Optional[Dict[str, Any]] = None) -> Future:
+        """Send a request and return a future resolved with its result."""
+        return self._send(method, params)[1]
+
+    def request(self, method: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Any:
+        """Send a request and block until its result arrives."""
+        request_id, future = self._send(method, params)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            self._forget(request_id)
+            self.notify("notifications/cancelled", {"requestId": request_id, "reason": "timeout"})
+            raise TimeoutError(f"MCP request {method} timed out after {timeout}s")
+
+    def send_batch(self, calls: List[Tuple[str, Optional[Dict[str, Any]]]]) -> List[Future]:
+        """Send several requests as one JSON-RPC batch and return a future per request, in order."""
+        if self.closed:
+            raise MCPError(f"Transport {self.name} is closed")
+
+        messages = []
+        futures: List[Future] = []
+        with self._pending_lock:
+            for method, params in calls:
+                request_id = next(self._ids)
+                future: Future = Future()
+                self._pending[request_id] = future
+                future.add_done_callback(functools.partial(_forget_cancelled, self._forget, request_id))
+                futures.append(future)
+                message: Dict[str, Any] = {"jsonrpc": "2.0", "id": request_id, "method": method}
+                if params is not None:
+                    message["params"] = params
+                messages.append(message)
+
+        try:
+            self._write(messages)
+        except (OSError, ValueError) as e:
+            for message, future in zip(messages, futures):
+                self._forget(message["id"])
+                _resolve(future, error=MCPError(f"Failed to send batch: {e}"))
+        return futures
+
+    async def arequest(
+        self, method: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None
+    ) -> Any:
+        """Send a request and await its result without tying up a thread."""
+        request_id, future = self._send(method, params)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            self._forget(request_id)
+            self.notify("notifications/cancelled", {"requestId": request_id, "reason": "timeout"})
+            raise TimeoutError(f"MCP request {method} timed out after {timeout}s")
+
+    def stream_request(
+        self, method: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None
+    ) -> ToolStream:
+        """Send a request whose response arrives as ``chunk`` messages ahead of its result."""
+        stream = ToolStream(timeout)
+        request_id, future = self._send(method, params, stream)
+        stream.follow(future, on_close=lambda: self._forget(request_id))
+        return stream
+
+    def notify(self, method: str, params: Optional[Dict[str, Any]] = None) -> None:
+        """Send a notification, which has no response."""
+        message: Dict[str, Any] = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        try:
+            self._write(message)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Dropped {method} notification on {self.name}: {e}")
+
+    def on_notification(self, method: str, handler: Callable[[Dict[str, Any]], None]) -> None:
+        """Register a handler called with the params of each matching server notification."""
+        self._notification_handlers.setdefault(method, []).append(handler)
+
+    def on_text(self, handler: Callable[[str], None]) -> None:
+        """Register a handler called with each non-JSON line the server writes."""
+        self._text_handlers.append(handler)
+
+    def close(self) -> None:
+        """Close the write side and fail any calls still in flight."""
+        self._closed.set()
+        with self._write_lock:
+            try:
+                self._writer.close()
+            except (OSError, ValueError):
+                pass
+        self._fail_pending(MCPError(f"Transport {self.name} closed"))
+
+    def _send(
+        self, method: str, params: Optional[Dict[str, Any]], stream: Optional[ToolStream] = None
+    ) -> Tuple[int, Future]:
+        if self.closed:
+            raise MCPError(f"Transport {self.name} is closed")
+
+        request_id = next(self._ids)
+        future: Future = Future()
+        with self._pending_lock:
+            self._pending[request_id] = future
+            if stream is not None:
+                self._streams[request_id] = stream
+        future.add_done_callback(functools.partial(_forget_cancelled, self._forget, request_id))
+
+        message: Dict[str, Any] = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        if params is not None:
+            message["params"] = params
+        try:
+            self._write(message)
+        except (OSError, ValueError) as e:
+            self._forget(request_id)
+            _resolve(future, error=MCPError(f"Failed to send {method}: {e}"))
+        return request_id, future
+
+    def _write(self, message: Any) -> None:
+        data = self.codec.dumpb(message) + b"\n"
+        with self._write_lock:
+            self._writer.write(data)
+            self._writer.flush()
+
+    def _forget(self, request_id: int) -> Optional[Future]:
+        with self._pending_lock:
+            self._streams.pop(request_id, None)
+            return self._pending.pop(request_id, None)
+
+    def _fail_pending(self, error: Exception) -> None:
+        with self._pending_lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+            self._streams.clear()
+        for future in pending:
+            _resolve(future, error=error)
+
+    def _read_loop(self) -> None:
+        try:
+            for raw in iter(self._reader.readline, b""):
+                line = raw.strip()
+                if not line:
+                    continue
+                try:
+                    message = self.codec.loads(line)
+                    if self.shared_buffer is not None and isinstance(message, dict) and "shm" in message:
+                        message = self.shared_buffer.consume(*message["shm"], self.codec.loads)
+                except ValueError:
+                    self._handle_text(line.decode("utf-8", errors="replace"))
+                    continue
+
+                for item in message if isinstance(message, list) else [message]:
+                    if isinstance(item, dict):
+                        self._dispatch(item)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Reader for {self.name} stopped: {e}")
+        finally:
+            self._closed.set()
+            self._fail_pending(MCPError(f"Connection to {self.name} closed"))
+
+    def _handle_text(self, line: str) -> None:
+        """Handle a line that is not JSON, such as a log line printed by the server."""
+        logger.debug(f"[{self.name}] {line}")
+        for handler in self._text_handlers:
+            handler(line)
+
+    def _dispatch(self, message: Dict[str, Any]) -> None:
+        if "method" in message:
+            if "id" in message:
+                self._handle_server_request(message)
+            else:
+                self._handle_notification(message)
+            return
+        if "chunk" in message:
+            stream = self._streams.get(message.get("id"))
+            if stream is not None:
+                stream.put(message["chunk"])
+            return
+
+        future = self._forget(message.get("id"))
+        if future is None:
+            logger.debug(f"Dropping response for unknown request id {message.get('id')} on {self.name}")
+            return
+        if message.get("error") is not None:
+            _resolve(future, error=MCPError.from_response(message))
+        else:
+            _resolve(future, result=message.get("result"))
+
+    def _handle_notification(self, message: Dict[str, Any]) -> None:
+        for handler in self._notification_handlers.get(message["method"], []):
+            try:
+                handler(message.get("params") or {})
+            except Exception as e:
+                logger.warning(f"Notification handler for {message['method']} failed: {e}")
+
+    def _handle_server_request(self, message: Dict[str, Any]) -> None:
+        if message["method"] == "ping":
+            response: Dict[str, Any] = {"jsonrpc": "2.0", "id": message["id"], "result": {}}
+        else:
+            response = {
+                "jsonrpc": "2.0",
+                "id": message["id"],
+                "error": {"code": -32601, "message": f"Method not found: {message['method']}"},
+            }
+        try:
+            self._write(response)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Failed to answer {message['method']} on {self.name}: {e}")
+
+
+def _forget_cancelled(forget: Callable[[Any], Any], request_id: Any, future: Future) -> None:
+    """Drop a request from a transport's pending map once its caller cancels the future."""
+    if future.cancelled():
+        forget(request_id)
+
+
+def _resolve(future: Future, result: Any = None, error: Optional[Exception] = None) -> None:
+    """Complete a future unless its caller already gave up on it."""
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+def content_to_text(result: Any) -> str:
+    """Flatten a ``tools/call`` result into the plain string the clients return."""
+    if isinstance(result, dict) and "content" in result:
+        content = result["content"]
+        if isinstance(content, list):
+            parts = []
+            for item in content:
+                if isinstance(item, dict) and item.get("type") == "text":
+                    parts.append(item.get("text", ""))
+                else:
+                    parts.append(json.dumps(item))
+            return "\n".join(parts)
+        result = content
+    if isinstance(result, str):
+        return result
+    return json.dumps(result)
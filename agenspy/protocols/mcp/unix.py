@@ -0,0 +1,98 @@
+"""Unix domain socket session for co-located ``PythonMCPServer`` instances."""
+
+import socket
+from typing import Optional
+from urllib.parse import urlsplit
+
+from .catalog_cache import ToolCatalogCache
+from .result_cache import ToolResultCache
+from .session import PythonServerSession
+from .shm import SharedRingBuffer
+from .transport import StreamTransport
+
+
+def unix_socket_path(server_url: str) -> str:
+    """Return the socket path of a ``unix:///path/to/socket`` URL."""
+    parts = urlsplit(server_url)
+    if parts.scheme != "unix" or not parts.path:
+        raise ValueError(f"Not a Unix socket MCP URL: {server_url}")
+    return parts.path
+
+
+class UnixMCPSession(PythonServerSession):
+    """Session with a ``PythonMCPServer`` on the same host over its Unix socket.
+
+    Messages are newline-delimited JSON on a :class:`StreamTransport`, so
+    calls from every thread are pipelined on one connection without TCP or
+    WebSocket framing. :meth:`execute_tools` sends its calls as one batch.
+
+    With ``shared_memory_size`` set, the session also offers the server a
+    shared ring buffer of that many bytes. Large responses then arrive through
+    shared memory, and only their offset and length cross the socket.
+    """
+
+    def __init__(
+        self,
+        server_url: str,
+        request_timeout: float = 30.0,
+        catalog_cache: Optional[ToolCatalogCache] = None,
+        result_cache: Optional[ToolResultCache] = None,
+        shared_memory_size: Optional[int] = None,
+    ):
+        super().__init__(
+            server_url, request_timeout, catalog_cache=catalog_cache, result_cache=result_cache, batch_requests=True
+        )
+        self.path = unix_socket_path(server_url)
+        self.shared_memory_size = shared_memory_size
+        self.shared_buffer: Optional[SharedRingBuffer] = None
+        self.transport: Optional[StreamTransport] = None
+        self._socket: Optional[socket.socket] = None
+
+    def connect(self) -> None:
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._socket.settimeout(self.request_timeout)
+            self._socket.connect(self.path)
+            self._socket.settimeout(None)
+        except OSError:
+            self._socket.close()
+            raise
+        self.transport = StreamTransport(self._socket.makefile("rb"), self._socket.makefile("wb"), name=self.path)
+        self.transport.start()
+        try:
+            self._handshake()
+        except BaseException:
+            # Release the socket, reader thread and buffer of a handshake that failed
+            self.close()
+            raise
+
+    def _handshake(self) -> None:
+        params = self._initialize_params()
+        if self.shared_memory_size:
+            self.shared_buffer = SharedRingBuffer.create(self.shared_memory_size)
+            self.transport.shared_buffer = self.shared_buffer
+            params["shared_memory"] = {"path": self.shared_buffer.path, "size": self.shared_memory_size}
+        try:
+            result = self._request("initialize", params)
+        finally:
+            if self.shared_buffer is not None:
+                # Both sides have it mapped by now; nothing is left behind if either exits
+                self.shared_buffer.unlink()
+
+        if self.shared_buffer is not None and not result.get("shared_memory"):
+            self.transport.shared_buffer = None
+            self.shared_buffer.close()
+            self.shared_buffer = None
+        self._load_tools(result)
+
+    def close(self) -> None:
+        super().close()
+        if self._socket is not None:
+            try:
+                # Wakes the transport's reader thread, which is blocked on the socket
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._socket.close()
+        if self.shared_buffer is not None:
+            self.shared_buffer.close()
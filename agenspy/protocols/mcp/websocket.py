@@ -0,0 +1,381 @@
+"""WebSocket transport and session for MCP servers such as ``PythonMCPServer``."""
+
+import asyncio
+import functools
+import itertools
+import logging
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from .catalog_cache import ToolCatalogCache
+from .codec import JSONCodec, get_codec
+from .result_cache import ToolResultCache
+from .session import PythonServerSession, catalog_version
+from .transport import MCPError, ToolStream, _forget_cancelled, _resolve
+
+logger = logging.getLogger(__name__)
+
+WEBSOCKET_SCHEMES = {"mcp": "ws", "mcps": "wss", "ws": "ws", "wss": "wss"}
+
+
+def websocket_url(server_url: str) -> str:
+    """Map an ``mcp://host:port`` style URL to the server's WebSocket endpoint.
+
+    ``mcp`` and ``mcps`` become ``ws`` and ``wss``; a URL without a path gets
+    the ``/mcp`` path that ``PythonMCPServer`` serves.
+    """
+    parts = urlsplit(server_url)
+    if parts.scheme not in WEBSOCKET_SCHEMES:
+        raise ValueError(f"Not a WebSocket MCP URL: {server_url}")
+    path = parts.path if parts.path not in ("", "/") else "/mcp"
+    return urlunsplit((WEBSOCKET_SCHEMES[parts.scheme], parts.netloc, path, parts.query, ""))
+
+
+class WebSocketTransport:
+    """Request/response transport over one persistent WebSocket connection.
+
+    A background thread runs an event loop that owns the socket. Requests made
+    from any thread or event loop are sent straight away and matched to their
+    responses by id, so any number can be in flight at once. The connection
+    sends keep-alive pings every ``ping_interval`` seconds. If it drops, the
+    transport reconnects with exponential backoff and repeats the
+    ``initialize`` exchange. Requests in flight when the connection dropped
+    fail with :class:`MCPError`, since they may or may not have run; requests
+    made while reconnecting wait for the new connection.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        initialize_params: Dict[str, Any],
+        name: str = "mcp",
+        codec: Optional[JSONCodec] = None,
+        ping_interval: Optional[float] = 20.0,
+        ping_timeout: Optional[float] = 20.0,
+        open_timeout: float = 10.0,
+        reconnect: bool = True,
+        max_reconnect_delay: float = 30.0,
+        on_reconnect: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        self.url = url
+        self.name = name
+        self.codec = codec or get_codec()
+        self.initialize_params = initialize_params
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.open_timeout = open_timeout
+        self.reconnect = reconnect
+        self.max_reconnect_delay = max_reconnect_delay
+        self.on_reconnect = on_reconnect
+        self.init_result: Dict[str, Any] = {}
+        self.reconnects = 0
+        self._binary_codec: Optional[JSONCodec] = None
+        self._websocket = None
+        self._pending: Dict[int, Future] = {}
+        self._streams: Dict[int, ToolStream] = {}
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._closed = threading.Event()
+        self._closing = False
+        self._loop = asyncio.new_event_loop()
+        self._connected: Optional[asyncio.Event] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._thread = threading.Thread(target=self._loop.run_forever, name=f"{name}-websocket", daemon=True)
+
+    @property
+    def closed(self) -> bool:
+        """Whether the transport was closed or gave up reconnecting."""
+        return self._closed.is_set()
+
+    @property
+    def encoding(self) -> str:
+        """The encoding negotiated at ``initialize``."""
+        return self._binary_codec.name if self._binary_codec else "json"
+
+    def connect(self) -> Dict[str, Any]:
+        """Open the connection and run ``initialize``, returning its result."""
+        self._thread.start()
+        try:
+            return asyncio.run_coroutine_threadsafe(self._start(), self._loop).result(timeout=self.open_timeout * 2)
+        except BaseException:
+            self.close()
+            raise
+
+    def send_request(self, method: str, params: Optional[Dict[str, Any]] = None) -> Future:
+        """Send a request and return a future resolved with its result."""
+        return self._send(method, params)[1]
+
+    def request(self, method: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Any:
+        """Send a request and block until its result arrives."""
+        request_id, future = self._send(method, params)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            self._forget(request_id)
+            raise TimeoutError(f"MCP request {method} timed out after {timeout}s")
+
+    async def arequest(
+        self, method: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None
+    ) -> Any:
+        """Send a request and await its result without tying up a thread."""
+        request_id, future = self._send(method, params)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            self._forget(request_id)
+            raise TimeoutError(f"MCP request {method} timed out after {timeout}s")
+
+    def stream_request(
+        self, method: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None
+    ) -> ToolStream:
+        """Send a request whose response arrives as ``chunk`` frames ahead of its result."""
+        stream = ToolStream(timeout)
+        message, future = self._register(method, params, stream)
+        stream.follow(future, on_close=lambda: self._forget(message["id"]))
+        self._submit(message, [future])
+        return stream
+
+    def send_batch(self, calls: List[Tuple[str, Optional[Dict[str, Any]]]]) -> List[Future]:
+        """Send several requests in one frame and return a future per request, in order."""
+        if not calls:
+            return []
+        messages, futures = zip(*(self._register(method, params) for method, params in calls))
+        self._submit(list(messages), list(futures))
+        return list(futures)
+
+    def close(self) -> None:
+        """Close the connection, stop the loop thread and fail any calls still in flight."""
+        if self._closing:
+            return
+        self._closing = True
+        self._closed.set()
+        if self._thread.is_alive():
+            try:
+                asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=5)
+            except Exception as e:
+                logger.debug(f"Unclean shutdown of {self.name}: {e}")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+        if not self._thread.is_alive():
+            self._loop.close()
+        self._fail_pending(MCPError(f"Transport {self.name} closed"))
+
+    def _register(
+        self, method: str, params: Optional[Dict[str, Any]], stream: Optional[ToolStream] = None
+    ) -> Tuple[Dict[str, Any], Future]:
+        if self.closed:
+            raise MCPError(f"Transport {self.name} is closed")
+        request_id = next(self._ids)
+        future: Future = Future()
+        with self._pending_lock:
+            self._pending[request_id] = future
+            if stream is not None:
+                self._streams[request_id] = stream
+        future.add_done_callback(functools.partial(_forget_cancelled, self._forget, request_id))
+        message: Dict[str, Any] = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        if params is not None:
+            message["params"] = params
+        return message, future
+
+    def _send(self, method: str, params: Optional[Dict[str, Any]]) -> Tuple[int, Future]:
+        message, future = self._register(method, params)
+        self._submit(message, [future])
+        return message["id"], future
+
+    def _submit(self, payload: Any, futures: List[Future]) -> None:
+        try:
+            asyncio.run_coroutine_threadsafe(self._write(payload, futures), self._loop)
+        except RuntimeError as e:
+            for future in futures:
+                _resolve(future, error=MCPError(f"Transport {self.name} is closed: {e}"))
+
+    def _forget(self, request_id: Any) -> Optional[Future]:
+        with self._pending_lock:
+            self._streams.pop(request_id, None)
+            return self._pending.pop(request_id, None)
+
+    def _fail_pending(self, error: Exception) -> None:
+        with self._pending_lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+            self._streams.clear()
+        for future in pending:
+            _resolve(future, error=error)
+
+    async def _start(self) -> Dict[str, Any]:
+        self._connected = asyncio.Event()
+        await self._open()
+        self._runner = asyncio.create_task(self._run())
+        return self.init_result
+
+    async def _open(self) -> None:
+        """Connect and run ``initialize`` before any queued request goes out."""
+        from websockets.asyncio.client import connect
+
+        self._binary_codec = None
+        websocket = await connect(
+            self.url,
+            open_timeout=self.open_timeout,
+            ping_interval=self.ping_interval,
+            ping_timeout=self.ping_timeout,
+            max_size=None,
+        )
+        try:
+            message, future = self._register("initialize", self.initialize_params)
+            await websocket.send(self.codec.dumps(message))
+            while not future.done():
+                self._dispatch_frame(await asyncio.wait_for(websocket.recv(), self.open_timeout))
+            self.init_result = future.result() or {}
+        except BaseException:
+            await websocket.close()
+            raise
+
+        encoding = self.init_result.get("encoding")
+        if encoding and encoding != "json":
+            self._binary_codec = get_codec(encoding)
+        self._websocket = websocket
+        self._connected.set()
+
+    async def _run(self) -> None:
+        """Read frames until the connection drops, then reconnect unless closed."""
+        from websockets.exceptions import ConnectionClosed, InvalidHandshake
+
+        delay = 0.5
+        while True:
+            try:
+                async for frame in self._websocket:
+                    self._dispatch_frame(frame)
+            except ConnectionClosed:
+                pass
+            self._connected.clear()
+            self._fail_pending(MCPError(f"Connection to {self.name} lost"))
+            if self._closing or not self.reconnect:
+                break
+
+            while not self._closing:
+                logger.info(f"Reconnecting to {self.url} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                try:
+                    await self._open()
+                except (OSError, InvalidHandshake, ConnectionClosed, MCPError, asyncio.TimeoutError) as e:
+                    logger.warning(f"Reconnect to {self.url} failed: {e}")
+                    delay = min(delay * 2, self.max_reconnect_delay)
+                    continue
+                delay = 0.5
+                self.reconnects += 1
+                if self.on_reconnect:
+                    try:
+                        self.on_reconnect(self.init_result)
+                    except Exception as e:
+                        logger.warning(f"Reconnect handler for {self.name} failed: {e}")
+                break
+        self._closed.set()
+        self._fail_pending(MCPError(f"Connection to {self.name} closed"))
+
+    async def _write(self, payload: Any, futures: List[Future]) -> None:
+        try:
+            await self._connected.wait()
+            if all(future.done() for future in futures):
+                return
+            if self._binary_codec:
+                await self._websocket.send(self._binary_codec.dumpb(payload))
+            else:
+                await self._websocket.send(self.codec.dumps(payload))
+        except Exception as e:
+            for future in futures:
+                _resolve(future, error=MCPError(f"Failed to send to {self.name}: {e}"))
+
+    async def _shutdown(self) -> None:
+        if self._runner:
+            self._runner.cancel()
+        if self._websocket is not None:
+            await self._websocket.close()
+        for task in asyncio.all_tasks():
+            if task is not asyncio.current_task():
+                task.cancel()
+
+    def _dispatch_frame(self, frame: Any) -> None:
+        try:
+            if isinstance(frame, (bytes, bytearray)):
+                message = (self._binary_codec or self.codec).loads(frame)
+            else:
+                message = self.codec.loads(frame)
+        except ValueError as e:
+            logger.warning(f"Dropping undecodable frame from {self.name}: {e}")
+            return
+
+        for item in message if isinstance(message, list) else [message]:
+            if isinstance(item, dict):
+                self._dispatch(item)
+
+    def _dispatch(self, message: Dict[str, Any]) -> None:
+        if "chunk" in message:
+            stream = self._streams.get(message.get("id"))
+            if stream is not None:
+                stream.put(message["chunk"])
+            return
+
+        future = self._forget(message.get("id"))
+        if future is None:
+            if message.get("error") is not None:
+                logger.warning(f"Error from {self.name}: {message['error']}")
+            else:
+                logger.debug(f"Dropping response for unknown request id {message.get('id')} on {self.name}")
+            return
+        if message.get("error") is not None:
+            _resolve(future, error=MCPError.from_response(message))
+        else:
+            _resolve(future, result=message.get("result"))
+
+
+class WebSocketMCPSession(PythonServerSession):
+    """Session with a remote ``PythonMCPServer`` over its ``/mcp`` WebSocket.
+
+    Tool calls from every thread share one connection and are pipelined on
+    it; :meth:`execute_tools` sends its calls as a single batch frame.
+    ``encodings`` lists binary encodings to offer at ``initialize`` in order
+    of preference, such as ``["msgpack"]``; by default messages stay JSON text.
+    """
+
+    def __init__(
+        self,
+        server_url: str,
+        request_timeout: float = 30.0,
+        catalog_cache: Optional[ToolCatalogCache] = None,
+        result_cache: Optional[ToolResultCache] = None,
+        encodings: Optional[List[str]] = None,
+        **transport_options,
+    ):
+        super().__init__(
+            server_url, request_timeout, catalog_cache=catalog_cache, result_cache=result_cache, batch_requests=True
+        )
+        self.encodings = list(encodings or [])
+        self.transport_options = transport_options
+        self.transport: Optional[WebSocketTransport] = None
+
+    def connect(self) -> None:
+        self.transport = WebSocketTransport(
+            websocket_url(self.server_url),
+            self._initialize_params(),
+            name=self.server_url,
+            on_reconnect=self._on_reconnect,
+            **self.transport_options,
+        )
+        self._load_tools(self.transport.connect())
+
+    def _initialize_params(self) -> Dict[str, Any]:
+        params = super()._initialize_params()
+        if self.encodings:
+            params["encodings"] = self.encodings
+        return params
+
+    def _on_reconnect(self, init_result: Dict[str, Any]):
+        # Runs on the transport's loop thread, so a changed catalog is
+        # refetched on the next call rather than here.
+        version = catalog_version(init_result)
+        if version != self.catalog_version:
+            self._on_tools_changed({})
+            self.catalog_version = version
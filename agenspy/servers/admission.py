@@ -0,0 +1,103 @@
+"""Admission control for MCP servers."""
+
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional
+
+
+class ServerOverloaded(Exception):
+    """Raised when a request is turned away because the server is at capacity."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bound the requests running at once and the queue waiting for a slot.
+
+    Up to ``max_concurrent`` requests run at a time. Beyond that, up to
+    ``max_queued`` requests wait in FIFO order for at most ``queue_timeout``
+    seconds. Anything past the queue, or still waiting at the timeout, is
+    rejected immediately with :class:`ServerOverloaded` so callers can back
+    off instead of piling more work onto the server.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        max_queued: int = 100,
+        queue_timeout: float = 5.0,
+        retry_after: float = 1.0,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.active = 0
+        self.rejected = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        """Number of requests waiting for a slot."""
+        return len(self._waiters)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a slot for the duration of the ``async with`` block."""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self) -> None:
+        """Take a slot, waiting in the queue if needed, or raise :class:`ServerOverloaded`."""
+        if self.max_concurrent is None or (self.active < self.max_concurrent and not self._waiters):
+            self.active += 1
+            return
+
+        if len(self._waiters) >= self.max_queued:
+            self.rejected += 1
+            raise ServerOverloaded(
+                f"Server overloaded ({self.active} running, {len(self._waiters)} queued)", self.retry_after
+            )
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # release() hands its slot straight to the waiter, so active is not incremented here
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up; pass it on
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected += 1
+                raise ServerOverloaded(
+                    f"Server overloaded: no slot free within {self.queue_timeout}s", self.retry_after
+                )
+            raise
+
+    def release(self) -> None:
+        """Return a slot, handing it to the oldest waiter if there is one."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get current occupancy and rejection counters."""
+        return {
+            "active": self.active,
+            "queued": len(self._waiters),
+            "rejected": self.rejected,
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+        }
@@ -0,0 +1,56 @@
+"""Request coalescing (singleflight) for MCP servers."""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class CallCoalescer:
+    """Share one run of a call between identical calls that overlap in time.
+
+    The first call for a key starts the work; calls for the same key that
+    arrive while it runs wait for that run and get the same result or
+    exception. Nothing is kept once the run finishes, so this is not a cache:
+    a later call starts a fresh run. If every waiter is cancelled, the run is
+    cancelled too.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._flights: Dict[str, _Flight] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def in_flight(self, key: str) -> bool:
+        """Whether a call for ``key`` would join a run instead of starting one."""
+        return key in self._flights
+
+    async def run(self, key: str, work: Callable[[], Awaitable[Any]]) -> Any:
+        """Await ``work()``, or the run already in flight for ``key``."""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight(asyncio.ensure_future(work()))
+            flight.task.add_done_callback(lambda _: self._land(key, flight))
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1:
+                flight.task.cancel()
+                self._land(key, flight)
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _land(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
@@ -7,7 +7,12 @@ from .mcp_python_server import PythonMCPServer
 
 
 class GitHubMCPServer(PythonMCPServer):
-    """GitHub-specific MCP server with GitHub API integration."""
+    """GitHub-specific MCP server with GitHub API integration.
+
+    The listing tools (``list_issues``, ``list_pull_requests`` and
+    ``get_commit_history``) can be paged with ``cursor`` and ``limit``, and
+    their items trimmed with ``fields``, e.g. ``["number", "title", "user.login"]``.
+    """
 
     def __init__(self, github_token: Optional[str] = None, port: int = 8080):
         super().__init__("github-mcp-server", port)
@@ -122,6 +127,8 @@ class GitHubMCPServer(PythonMCPServer):
             "Get detailed repository information",
             {"owner": "string", "repo": "string"},
             get_repository,
+            cache_ttl=300,
+            coalesce=True,
         )
 
         self.register_tool(
@@ -129,6 +136,8 @@ class GitHubMCPServer(PythonMCPServer):
             "Get file contents from repository",
             {"owner": "string", "repo": "string", "path": "string", "ref": "string"},
             get_file_contents,
+            cache_ttl=60,
+            coalesce=True,
         )
 
         self.register_tool(
@@ -136,6 +145,7 @@ class GitHubMCPServer(PythonMCPServer):
             "List repository issues",
             {"owner": "string", "repo": "string", "state": "string", "limit": "integer"},
             list_issues,
+            page_key="issues",
         )
 
         self.register_tool(
@@ -143,6 +153,7 @@ class GitHubMCPServer(PythonMCPServer):
             "List repository pull requests",
             {"owner": "string", "repo": "string", "state": "string", "limit": "integer"},
             list_pull_requests,
+            page_key="pull_requests",
         )
 
         self.register_tool(
@@ -150,4 +161,5 @@ class GitHubMCPServer(PythonMCPServer):
             "Get commit history for repository",
             {"owner": "string", "repo": "string", "limit": "integer", "branch": "string"},
             get_commit_history,
+            page_key="commits",
         )
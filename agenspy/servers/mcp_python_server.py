@@ -1,13 +1,30 @@
 """Python-based MCP server implementation."""
 
-import json
+import asyncio
+import functools
+import hashlib
+import inspect
 import logging
-from typing import Any, Callable, Dict, List, Optional
+import os
+import pickle
+import stat
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Union
 
 import uvicorn
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 
+from ..protocols.mcp.codec import JSONCodec, available_binary_codecs, get_codec, negotiate_encoding
+from ..protocols.mcp.result_cache import ToolResultCache
+from ..protocols.mcp.shm import SharedRingBuffer, default_shm_dir, is_ring_buffer_path
+from ..protocols.mcp.transport import SERVER_OVERLOADED
+from .admission import AdmissionController, ServerOverloaded
+from .coalescing import CallCoalescer
+from .metrics import ServerMetrics
+from .shaping import project, shape_result
+
 logger = logging.getLogger(__name__)
 
 
@@ -18,6 +35,24 @@ class MCPTool(BaseModel):
     description: str
     parameters: Dict[str, Any]
     handler: Optional[Callable] = None
+    cache_ttl: Optional[float] = None
+    executor: Optional[str] = None
+    page_key: Optional[str] = None
+    coalesce: bool = False
+
+
+class PreEncoded(dict):
+    """A response payload that carries its own JSON encoding.
+
+    Static payloads such as the tool listing are encoded once and reused;
+    :meth:`PythonMCPServer.encode_response` splices ``encoded`` into the
+    response instead of serializing the dict again. Instances are shared
+    between requests and must not be mutated.
+    """
+
+    def __init__(self, payload: Dict[str, Any], codec: Optional[JSONCodec] = None):
+        super().__init__(payload)
+        self.encoded = (codec or get_codec()).dumps(payload)
 
 
 class MCPRequest(BaseModel):
@@ -39,10 +74,54 @@ class MCPResponse(BaseModel):
 class PythonMCPServer:
     """Python implementation of MCP server."""
 
-    def __init__(self, name: str = "python-mcp-server", port: int = 8080):
+    METHODS = ("initialize", "list_tools", "call_tool")
+
+    def __init__(
+        self,
+        name: str = "python-mcp-server",
+        port: int = 8080,
+        max_in_flight_per_connection: int = 32,
+        max_thread_workers: Optional[int] = None,
+        max_process_workers: Optional[int] = None,
+        max_concurrent_requests: Optional[int] = None,
+        max_queued_requests: int = 100,
+        queue_timeout: float = 5.0,
+        codec: Optional[str] = None,
+        encodings: Optional[List[str]] = None,
+        unix_socket: Optional[str] = None,
+        max_message_size: int = 64 * 1024 * 1024,
+        shared_memory_threshold: int = 64 * 1024,
+    ):
         self.name = name
         self.port = port
+        # Optional Unix domain socket served next to the WebSocket endpoint,
+        # for co-located clients; messages are newline-delimited JSON
+        self.unix_socket = unix_socket
+        self.max_message_size = max_message_size
+        # Responses at least this large go through a client's shared ring buffer, if it set one up
+        self.shared_memory_threshold = shared_memory_threshold
+        # orjson when installed, else the standard library; see get_codec
+        self.codec = get_codec(codec)
+        # Binary encodings a client may pick at initialize; JSON text is always accepted
+        self.encodings = available_binary_codecs() if encodings is None else list(encodings)
+        for encoding in self.encodings:
+            get_codec(encoding)
+        self.max_in_flight_per_connection = max_in_flight_per_connection
+        self.max_thread_workers = max_thread_workers
+        self.max_process_workers = max_process_workers
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        # Server-wide cap on running tool calls; when it and its queue are
+        # full, calls fail fast with a SERVER_OVERLOADED error carrying retry_after
+        self.admission = AdmissionController(max_concurrent_requests, max_queued_requests, queue_timeout)
+        # Identical concurrent calls of tools registered with coalesce=True share one handler run
+        self.coalescer = CallCoalescer()
+        # Per-method and per-tool counters and latency histograms, served on /metrics
+        self.metrics = ServerMetrics()
         self.tools: Dict[str, MCPTool] = {}
+        self._list_tools_payload: Optional[PreEncoded] = None
+        self._initialize_payload: Optional[PreEncoded] = None
+        self._catalog_version = ""
         self.app = FastAPI(title=f"MCP Server - {name}")
         self.active_connections: List[WebSocket] = []
 
@@ -51,24 +130,161 @@ class PythonMCPServer:
         async def websocket_endpoint(websocket: WebSocket):
             await self.handle_websocket(websocket)
 
-    def register_tool(self, name: str, description: str, parameters: Dict[str, Any], handler: Callable):
-        """Register a new tool with the MCP server."""
-        tool = MCPTool(name=name, description=description, parameters=parameters, handler=handler)
+        @self.app.get("/metrics", response_class=PlainTextResponse)
+        async def metrics_endpoint():
+            return self.render_metrics()
+
+    def register_tool(
+        self,
+        name: str,
+        description: str,
+        parameters: Dict[str, Any],
+        handler: Callable,
+        cache_ttl: Optional[float] = None,
+        executor: Optional[str] = None,
+        page_key: Optional[str] = None,
+        coalesce: bool = False,
+    ):
+        """Register a new tool with the MCP server.
+
+        ``cache_ttl`` declares the tool's results cacheable by clients for that
+        many seconds; it is advertised in the tool listing.
+
+        Coroutine handlers run on the event loop. Plain functions run in a
+        bounded thread pool by default (``executor="thread"``) so blocking
+        calls do not stall other requests; CPU-bound handlers can use
+        ``executor="process"`` to run in a process pool, in which case the
+        handler and its arguments must be picklable.
+
+        Async generator handlers stream their result: clients that ask for a
+        stream get each yielded chunk as its own message, and other clients get
+        the chunks joined into one string, or as a list if any is not a string.
+
+        ``page_key`` names the list in the tool's result that callers may page
+        through with ``cursor`` and ``limit``; ``fields`` projections then
+        apply to its items. See :func:`~agenspy.servers.shaping.shape_result`.
+
+        With ``coalesce=True``, calls with identical arguments that arrive
+        while one is running wait for it and share its result instead of
+        running the handler again. Only use it for tools whose result depends
+        on nothing but their arguments. Waiting calls do not take an admission
+        slot.
+        """
+        if executor not in (None, "thread", "process"):
+            raise ValueError(f"Unknown executor {executor!r}; expected 'thread' or 'process'")
+        if executor and (inspect.iscoroutinefunction(handler) or inspect.isasyncgenfunction(handler)):
+            raise ValueError(f"Tool {name} has an async handler, which always runs on the event loop")
+        if executor == "process":
+            try:
+                pickle.dumps(handler)
+            except Exception as e:
+                raise ValueError(f"Tool {name} handler cannot run in a process pool: {e}")
+
+        tool = MCPTool(
+            name=name,
+            description=description,
+            parameters=parameters,
+            handler=handler,
+            cache_ttl=cache_ttl,
+            executor=executor,
+            page_key=page_key,
+            coalesce=coalesce,
+        )
         self.tools[name] = tool
+        self._invalidate_catalog()
         logger.info(f"Registered tool: {name}")
 
+    @property
+    def catalog_version(self) -> str:
+        """Fingerprint of the public tool definitions, so clients can tell when a cached catalog is stale."""
+        self._tools_listing()
+        return self._catalog_version
+
+    def _invalidate_catalog(self):
+        """Drop the precomputed listing and initialize payloads after the registry changes."""
+        self._list_tools_payload = None
+        self._initialize_payload = None
+
+    def _tools_listing(self) -> PreEncoded:
+        if self._list_tools_payload is None:
+            payload = PreEncoded({"tools": [self._tool_entry(tool) for tool in self.tools.values()]}, self.codec)
+            self._catalog_version = hashlib.sha256(payload.encoded.encode("utf-8")).hexdigest()[:16]
+            self._list_tools_payload = payload
+        return self._list_tools_payload
+
+    def encode_response(self, response: Union[Dict[str, Any], List[Dict[str, Any]]]) -> str:
+        """Serialize a response, reusing the encoding of precomputed payloads."""
+        if isinstance(response, list):
+            return "[" + ",".join(self.encode_response(item) for item in response) + "]"
+        result = response.get("result")
+        if isinstance(result, PreEncoded) and response.keys() <= {"result", "id"}:
+            return '{"result":' + result.encoded + ',"id":' + self.codec.dumps(response.get("id")) + "}"
+        return self.codec.dumps(response)
+
     async def handle_websocket(self, websocket: WebSocket):
-        """Handle WebSocket connections for MCP protocol."""
+        """Handle WebSocket connections for MCP protocol.
+
+        Each request is processed in its own task, so a slow tool does not hold
+        up the requests behind it; responses are sent as they complete and
+        clients match them up by ``id``. Once ``max_in_flight_per_connection``
+        requests are running, the connection stops reading until one finishes.
+
+        Text frames carry JSON. After a client negotiates a binary encoding at
+        ``initialize`` it may also send binary frames in that encoding, and each
+        response goes back in the framing its request arrived in.
+        """
         await websocket.accept()
         self.active_connections.append(websocket)
 
+        send_lock = asyncio.Lock()
+        slots = asyncio.Semaphore(self.max_in_flight_per_connection)
+        in_flight: Set[asyncio.Task] = set()
+        binary_codec: Optional[JSONCodec] = None
+
+        async def send(response, codec: JSONCodec):
+            async with send_lock:
+                if codec.binary:
+                    await websocket.send_bytes(codec.dumpb(response))
+                else:
+                    await websocket.send_text(self.encode_response(response))
+
+        async def respond(request, codec: JSONCodec):
+            nonlocal binary_codec
+
+            async def emit(request_id, chunk):
+                await send({"id": request_id, "chunk": chunk}, codec)
+
+            try:
+                response = await self.process_request(request, emit=emit)
+                encoding = self._negotiated_encoding(request, response)
+                if encoding is not None:
+                    binary_codec = get_codec(encoding)
+                await send(response, codec)
+            except Exception as e:
+                logger.error(f"Failed to answer request on WebSocket: {e}")
+            finally:
+                slots.release()
+
         try:
             while True:
-                data = await websocket.receive_text()
-                request = json.loads(data)
-
-                response = await self.process_request(request)
-                await websocket.send_text(json.dumps(response))
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(message.get("code", 1000))
+                if message.get("bytes") is not None:
+                    if binary_codec is None:
+                        error = {"error": "Binary frames require an encoding negotiated at initialize", "id": None}
+                        async with send_lock:
+                            await websocket.send_text(self.encode_response(error))
+                        continue
+                    codec, data = binary_codec, message["bytes"]
+                else:
+                    codec, data = self.codec, message["text"]
+                request = codec.loads(data)
+
+                await slots.acquire()
+                task = asyncio.create_task(respond(request, codec))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
 
         except WebSocketDisconnect:
             self.active_connections.remove(websocket)
@@ -77,64 +293,380 @@ class PythonMCPServer:
             logger.error(f"WebSocket error: {e}")
             if websocket in self.active_connections:
                 self.active_connections.remove(websocket)
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+    async def start_unix_server(self, path: Optional[str] = None) -> asyncio.AbstractServer:
+        """Listen on a Unix domain socket, replacing a stale socket file left by an earlier run."""
+        path = path or self.unix_socket
+        if path is None:
+            raise ValueError("No Unix socket path configured")
+        try:
+            if stat.S_ISSOCK(os.stat(path).st_mode):
+                os.unlink(path)
+        except FileNotFoundError:
+            pass
+        return await asyncio.start_unix_server(self.handle_stream, path, limit=self.max_message_size)
+
+    async def handle_stream(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Handle a stream connection, such as one on the Unix socket.
+
+        Requests and responses are JSON, one message per line. As on the
+        WebSocket, requests on a connection run concurrently up to
+        ``max_in_flight_per_connection`` and are answered as they complete.
+
+        A co-located client may pass a ``shared_memory`` ring buffer (path and
+        size) at ``initialize``. Responses of at least
+        ``shared_memory_threshold`` bytes are then written into the buffer, and
+        only an ``{"shm": [offset, length]}`` line goes over the socket.
+        """
+        send_lock = asyncio.Lock()
+        slots = asyncio.Semaphore(self.max_in_flight_per_connection)
+        in_flight: Set[asyncio.Task] = set()
+        ring: Optional[SharedRingBuffer] = None
+
+        async def send(response):
+            data = self.encode_response(response).encode("utf-8")
+            async with send_lock:
+                # Written under the lock so buffer order matches socket order
+                if ring is not None and len(data) >= self.shared_memory_threshold:
+                    placed = ring.write(data)
+                    if placed is not None:
+                        data = self.codec.dumpb({"shm": placed})
+                writer.write(data + b"\n")
+                await writer.drain()
+
+        async def emit(request_id, chunk):
+            await send({"id": request_id, "chunk": chunk})
+
+        async def respond(request):
+            nonlocal ring
+            try:
+                response = await self.process_request(request, emit=emit)
+                spec = self._shared_memory_request(request, response)
+                if spec is not None:
+                    try:
+                        ring = ring or self._attach_shared_buffer(spec)
+                    except ValueError as e:
+                        response = {"error": f"Invalid params: {e}", "code": -32602, "id": response.get("id")}
+                    else:
+                        response = {**response, "result": {**response["result"], "shared_memory": ring is not None}}
+                await send(response)
+            except Exception as e:
+                logger.error(f"Failed to answer request on stream: {e}")
+            finally:
+                slots.release()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = self.codec.loads(line)
+                except ValueError:
+                    await send({"error": "Invalid JSON", "id": None})
+                    continue
+
+                await slots.acquire()
+                task = asyncio.create_task(respond(request))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+
+        except (ConnectionError, ValueError) as e:
+            # ValueError here means a message beyond max_message_size
+            logger.error(f"Stream error: {e}")
+        finally:
+            for task in in_flight:
+                task.cancel()
+            writer.close()
+            if ring is not None:
+                ring.close()
+
+    @staticmethod
+    def _shared_memory_request(request: Any, response: Any) -> Optional[Dict[str, Any]]:
+        """Return the ring buffer a client offered with a successful ``initialize``, if any."""
+        if not isinstance(request, dict) or request.get("method") != "initialize" or "result" not in response:
+            return None
+        return (request.get("params") or {}).get("shared_memory")
+
+    @staticmethod
+    def _attach_shared_buffer(spec: Any) -> Optional[SharedRingBuffer]:
+        """Map the ring buffer a client offered, or return ``None`` if it cannot be opened.
+
+        Raises ``ValueError`` for a malformed offer or a path that is not a
+        ring buffer file in the shared-memory directory, so a peer cannot make
+        the server map a file of its choosing.
+        """
+        try:
+            path, size = spec["path"], int(spec["size"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"malformed shared_memory offer {spec!r}")
+        if not isinstance(path, str) or not is_ring_buffer_path(path):
+            raise ValueError(f"shared_memory path must be a ring buffer file in {default_shm_dir()}")
+
+        try:
+            return SharedRingBuffer(os.path.realpath(path), size)
+        except (ValueError, OSError) as e:
+            logger.warning(f"Could not attach shared buffer {spec}: {e}")
+            return None
+
+    @staticmethod
+    def _negotiated_encoding(request: Any, response: Any) -> Optional[str]:
+        """Return the binary encoding agreed by a successful ``initialize``, if any."""
+        if not isinstance(request, dict) or request.get("method") != "initialize":
+            return None
+        encoding = response.get("result", {}).get("encoding") if isinstance(response, dict) else None
+        return encoding if encoding not in (None, "json") else None
+
+    async def process_request(
+        self,
+        request: Union[Dict[str, Any], List[Dict[str, Any]]],
+        emit: Optional[Callable[[Any, Any], Awaitable[None]]] = None,
+    ) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        """Process MCP requests.
+
+        A JSON-RPC batch (a list of requests) is processed concurrently and
+        answered with a list of responses in the same order.
+
+        ``emit(request_id, chunk)`` sends an incremental message on the
+        request's connection. When it is given, a ``call_tool`` with
+        ``"stream": true`` passes each chunk to it and its final result only
+        counts them. Batched calls are never streamed.
+        """
+        if isinstance(request, list):
+            if not request:
+                return {"error": "Invalid request: empty batch", "id": None}
+            return list(await asyncio.gather(*(self._process_single(item) for item in request)))
+        return await self._process_single(request, emit)
+
+    async def _process_single(
+        self, request: Dict[str, Any], emit: Optional[Callable[[Any, Any], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        if not isinstance(request, dict):
+            return {"error": "Invalid request", "id": None}
 
-    async def process_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
-        """Process MCP requests."""
         method = request.get("method")
         params = request.get("params", {})
         request_id = request.get("id")
 
+        # Unknown methods share one label so clients cannot grow the metrics without bound
+        label = method if method in self.METHODS else "unknown"
+        started = self.metrics.started("method", label)
+        response: Dict[str, Any] = {}
+        try:
+            response = await self._dispatch(method, params, request_id, emit)
+            return response
+        finally:
+            self.metrics.finished("method", label, started, error="result" not in response)
+
+    async def _dispatch(
+        self,
+        method: Any,
+        params: Dict[str, Any],
+        request_id: Any,
+        emit: Optional[Callable[[Any, Any], Awaitable[None]]],
+    ) -> Dict[str, Any]:
         try:
             if method == "initialize":
                 result = await self.handle_initialize(params)
             elif method == "list_tools":
                 result = await self.handle_list_tools()
             elif method == "call_tool":
-                result = await self.handle_call_tool(params)
+                stream = functools.partial(emit, request_id) if emit and params.get("stream") else None
+                if stream is None and self._joins_flight(params):
+                    result = await self.handle_call_tool(params)
+                else:
+                    async with self.admission.slot():
+                        result = await self.handle_call_tool(params, stream)
             else:
                 raise ValueError(f"Unknown method: {method}")
 
             return {"result": result, "id": request_id}
 
+        except ServerOverloaded as e:
+            data = {"retry_after": e.retry_after}
+            return {"error": str(e), "code": SERVER_OVERLOADED, "data": data, "id": request_id}
         except Exception as e:
             return {"error": str(e), "id": request_id}
 
     async def handle_initialize(self, params: Dict[str, Any]) -> Dict[str, Any]:
-        """Handle MCP initialization."""
-        return {
-            "protocol_version": "1.0",
-            "server_info": {"name": self.name, "version": "0.0.1"},
-            "capabilities": {"tools": True, "context": True},
-        }
+        """Handle MCP initialization.
+
+        A client that lists ``encodings`` in its preferred order gets back the
+        first one this server supports as ``encoding``, or ``"json"``.
+        """
+        if self._initialize_payload is None:
+            self._initialize_payload = PreEncoded(
+                {
+                    "protocol_version": "1.0",
+                    "server_info": {"name": self.name, "version": "0.0.1"},
+                    "capabilities": {"tools": True, "context": True, "encodings": ["json"] + self.encodings},
+                    "catalog_version": self.catalog_version,
+                },
+                self.codec,
+            )
+        if "encodings" not in params:
+            return self._initialize_payload
+        return {**self._initialize_payload, "encoding": negotiate_encoding(params["encodings"], self.encodings)}
 
     async def handle_list_tools(self) -> Dict[str, Any]:
-        """Handle tool listing."""
-        tools = []
-        for tool in self.tools.values():
-            tools.append({"name": tool.name, "description": tool.description, "parameters": tool.parameters})
-
-        return {"tools": tools}
-
-    async def handle_call_tool(self, params: Dict[str, Any]) -> Dict[str, Any]:
-        """Handle tool execution."""
+        """Handle tool listing from the precomputed catalog."""
+        return self._tools_listing()
+
+    @staticmethod
+    def _tool_entry(tool: MCPTool) -> Dict[str, Any]:
+        """Build the public listing entry for a tool."""
+        entry = {"name": tool.name, "description": tool.description, "parameters": tool.parameters}
+        if tool.cache_ttl:
+            entry["cache_ttl"] = tool.cache_ttl
+        if inspect.isasyncgenfunction(tool.handler):
+            entry["streaming"] = True
+        if tool.page_key:
+            entry["paginated"] = True
+        return entry
+
+    async def handle_call_tool(
+        self, params: Dict[str, Any], emit: Optional[Callable[[Any], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """Handle tool execution.
+
+        With ``emit``, the result is streamed: each chunk an async generator
+        handler yields is passed to ``emit`` as it is produced, and any other
+        handler's whole result is passed as a single chunk.
+
+        ``fields`` (dotted paths) projects the result down to what the caller
+        needs, and ``cursor`` and ``limit`` page through tools registered with
+        a ``page_key``. Both are applied before the result is encoded, so the
+        rest never goes over the wire.
+        """
         tool_name = params.get("name")
         tool_args = params.get("arguments", {})
+        fields = params.get("fields")
+        cursor, limit = params.get("cursor"), params.get("limit")
 
         if tool_name not in self.tools:
             raise ValueError(f"Tool {tool_name} not found")
 
         tool = self.tools[tool_name]
-        if tool.handler:
-            result = await tool.handler(**tool_args)
+        started = self.metrics.started("tool", tool_name)
+        failed = True
+        try:
+            result = await self._call_tool(tool, tool_args, fields, cursor, limit, emit)
+            failed = False
+            return result
+        finally:
+            self.metrics.finished("tool", tool_name, started, error=failed)
+
+    async def _call_tool(
+        self,
+        tool: MCPTool,
+        tool_args: Dict[str, Any],
+        fields: Optional[List[str]],
+        cursor: Optional[str],
+        limit: Optional[int],
+        emit: Optional[Callable[[Any], Awaitable[None]]],
+    ) -> Dict[str, Any]:
+        tool_name = tool.name
+        if emit is not None and (cursor is not None or limit is not None):
+            raise ValueError("Streamed results cannot be paginated")
+        if emit is not None and inspect.isasyncgenfunction(tool.handler):
+            chunks = 0
+            async for chunk in tool.handler(**tool_args):
+                await emit(project(chunk, fields) if fields is not None else chunk)
+                chunks += 1
+            return {"content": None, "isError": False, "chunks": chunks}
+
+        if tool.handler and tool.coalesce:
+            key = ToolResultCache.make_key(tool_name, tool_args)
+            result = await self.coalescer.run(key, functools.partial(self._run_handler, tool, tool_args))
+        elif tool.handler:
+            result = await self._run_handler(tool, tool_args)
         else:
             result = f"Tool {tool_name} executed with args: {tool_args}"
+        result = shape_result(result, fields, cursor, limit, tool.page_key)
 
+        if emit is not None:
+            await emit(result)
+            return {"content": None, "isError": False, "chunks": 1}
         return {"content": result, "isError": False}
 
+    def render_metrics(self) -> str:
+        """Render request metrics, admission control and connection gauges in the Prometheus text format."""
+        admission = self.admission.get_stats()
+        coalesced = self.coalescer.coalesced
+        return self.metrics.render_prometheus(
+            [
+                ("mcp_admission_active", "gauge", "Tool calls holding an admission slot.", admission["active"]),
+                ("mcp_admission_queued", "gauge", "Tool calls waiting for an admission slot.", admission["queued"]),
+                ("mcp_admission_rejected_total", "counter", "Tool calls turned away.", admission["rejected"]),
+                ("mcp_coalesced_calls_total", "counter", "Tool calls that joined one in flight.", coalesced),
+                ("mcp_websocket_connections", "gauge", "Open WebSocket connections.", len(self.active_connections)),
+            ]
+        )
+
+    def _joins_flight(self, params: Dict[str, Any]) -> bool:
+        """Whether a ``call_tool`` would wait on an identical call already running."""
+        tool = self.tools.get(params.get("name"))
+        if tool is None or not tool.coalesce:
+            return False
+        return self.coalescer.in_flight(ToolResultCache.make_key(tool.name, params.get("arguments", {})))
+
+    async def _run_handler(self, tool: MCPTool, tool_args: Dict[str, Any]) -> Any:
+        """Run a tool handler on the event loop or in its executor."""
+        if inspect.isasyncgenfunction(tool.handler):
+            chunks = [chunk async for chunk in tool.handler(**tool_args)]
+            return "".join(chunks) if all(isinstance(chunk, str) for chunk in chunks) else chunks
+        if inspect.iscoroutinefunction(tool.handler):
+            return await tool.handler(**tool_args)
+
+        call = functools.partial(tool.handler, **tool_args)
+        result = await asyncio.get_running_loop().run_in_executor(self._executor_for(tool), call)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    def _executor_for(self, tool: MCPTool) -> Executor:
+        if tool.executor == "process":
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=self.max_process_workers)
+            return self._process_pool
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=self.max_thread_workers, thread_name_prefix="mcp-tool")
+        return self._thread_pool
+
+    def shutdown(self):
+        """Release the tool worker pools."""
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False)
+            self._thread_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False)
+            self._process_pool = None
+
     def start(self):
         """Start the MCP server."""
         logger.info(f"Starting MCP server on port {self.port}")
-        uvicorn.run(self.app, host="0.0.0.0", port=self.port)
+        try:
+            if self.unix_socket:
+                asyncio.run(self._serve_with_unix_socket())
+            else:
+                uvicorn.run(self.app, host="0.0.0.0", port=self.port)
+        finally:
+            self.shutdown()
+
+    async def _serve_with_unix_socket(self):
+        logger.info(f"Listening on Unix socket {self.unix_socket}")
+        unix_server = await self.start_unix_server()
+        try:
+            async with unix_server:
+                await uvicorn.Server(uvicorn.Config(self.app, host="0.0.0.0", port=self.port)).serve()
+        finally:
+            if os.path.exists(self.unix_socket):
+                os.unlink(self.unix_socket)
 
 
 class GitHubMCPServer(PythonMCPServer):
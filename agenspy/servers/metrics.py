@@ -0,0 +1,183 @@
+"""Request metrics for MCP servers, exposed in the Prometheus text format."""
+
+import bisect
+import math
+import re
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Latency histogram bucket bounds, in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_SAMPLE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)$")
+_LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+class _Series:
+    """Counters, in-flight gauge and latency histogram of one method or tool."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.bucket_counts = [0] * len(buckets)
+        self.duration_sum = 0.0
+
+
+class ServerMetrics:
+    """Per-method and per-tool request metrics.
+
+    :meth:`started` and :meth:`finished` bracket each request (family
+    ``"method"``) and each tool call (family ``"tool"``). All updates happen on
+    the server's event loop, so no locking is needed.
+    """
+
+    FAMILIES = {
+        "method": ("mcp_requests", "MCP requests handled"),
+        "tool": ("mcp_tool_calls", "MCP tool calls handled"),
+    }
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[str, Dict[str, _Series]] = {family: {} for family in self.FAMILIES}
+
+    def started(self, family: str, name: str) -> float:
+        """Count a request as in flight and return its start time."""
+        self._get(family, name).in_flight += 1
+        return time.perf_counter()
+
+    def finished(self, family: str, name: str, started: float, error: bool = False) -> None:
+        """Record a request's outcome and latency."""
+        series = self._get(family, name)
+        elapsed = time.perf_counter() - started
+        series.in_flight -= 1
+        series.calls += 1
+        series.errors += int(error)
+        series.duration_sum += elapsed
+        index = bisect.bisect_left(self.buckets, elapsed)
+        if index < len(self.buckets):
+            series.bucket_counts[index] += 1
+
+    def get_stats(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Get call and error counts, in-flight requests and mean latency by family and name."""
+        return {
+            family: {
+                name: {
+                    "calls": series.calls,
+                    "errors": series.errors,
+                    "in_flight": series.in_flight,
+                    "mean_seconds": series.duration_sum / series.calls if series.calls else 0.0,
+                }
+                for name, series in names.items()
+            }
+            for family, names in self._series.items()
+        }
+
+    def render_prometheus(self, gauges: Iterable[Tuple[str, str, str, float]] = ()) -> str:
+        """Render all series, plus extra ``(name, type, help, value)`` samples, as Prometheus text."""
+        lines: List[str] = []
+
+        def header(name: str, kind: str, text: str):
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for family, (prefix, description) in self.FAMILIES.items():
+            names = sorted(self._series[family].items())
+            label = family
+            header(f"{prefix}_total", "counter", f"{description}, by {label}.")
+            lines.extend(f"{prefix}_total{{{label}={_quote(n)}}} {s.calls}" for n, s in names)
+            header(f"{prefix}_errors_total", "counter", f"{description} that failed, by {label}.")
+            lines.extend(f"{prefix}_errors_total{{{label}={_quote(n)}}} {s.errors}" for n, s in names)
+            header(f"{prefix}_in_flight", "gauge", f"{description} still running, by {label}.")
+            lines.extend(f"{prefix}_in_flight{{{label}={_quote(n)}}} {s.in_flight}" for n, s in names)
+
+            histogram = f"{prefix}_duration_seconds"
+            header(histogram, "histogram", f"Latency of {description[0].lower()}{description[1:]}, by {label}.")
+            for name, series in names:
+                labels = f"{label}={_quote(name)}"
+                cumulative = 0
+                for bound, count in zip(self.buckets, series.bucket_counts):
+                    cumulative += count
+                    lines.append(f'{histogram}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{histogram}_bucket{{{labels},le="+Inf"}} {series.calls}')
+                lines.append(f"{histogram}_sum{{{labels}}} {series.duration_sum}")
+                lines.append(f"{histogram}_count{{{labels}}} {series.calls}")
+
+        for name, kind, text, value in gauges:
+            header(name, kind, text)
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def _get(self, family: str, name: str) -> _Series:
+        series = self._series[family].get(name)
+        if series is None:
+            series = self._series[family][name] = _Series(self.buckets)
+        return series
+
+
+def parse_prometheus(text: str) -> List[Tuple[str, Dict[str, str], float]]:
+    """Parse Prometheus text into ``(name, labels, value)`` samples, skipping comments."""
+    samples = []
+    for line in text.splitlines():
+        match = _SAMPLE.match(line.strip())
+        if not match:
+            continue
+        name, labels, value = match.groups()
+        parsed = {key: _unquote(raw) for key, raw in _LABEL.findall(labels or "")}
+        samples.append((name, parsed, float(value)))
+    return samples
+
+
+def summarize_metrics(text: str) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Condense a ``/metrics`` page into per-method and per-tool figures.
+
+    Each entry has ``calls``, ``errors``, ``in_flight``, ``mean_seconds`` and
+    ``p95_seconds``, the upper bound of the bucket holding the 95th
+    percentile (``inf`` past the last bucket).
+    """
+    summary: Dict[str, Dict[str, Dict[str, float]]] = {}
+    buckets: Dict[Tuple[str, str], List[Tuple[float, float]]] = defaultdict(list)
+    suffixes = {
+        "_total": "calls",
+        "_errors_total": "errors",
+        "_in_flight": "in_flight",
+        "_duration_seconds_sum": "sum",
+    }
+
+    for family, (prefix, _) in ServerMetrics.FAMILIES.items():
+        entries = summary.setdefault(family, {})
+        for name, labels, value in parse_prometheus(text):
+            if family not in labels or not name.startswith(prefix):
+                continue
+            key = labels[family]
+            entry = entries.setdefault(key, {"calls": 0, "errors": 0, "in_flight": 0, "sum": 0.0})
+            suffix = name[len(prefix) :]
+            if suffix in suffixes:
+                entry[suffixes[suffix]] = value
+            elif suffix == "_duration_seconds_bucket":
+                buckets[(family, key)].append((float(labels["le"]), value))
+
+        for key, entry in entries.items():
+            calls = entry["calls"]
+            entry["mean_seconds"] = entry.pop("sum") / calls if calls else 0.0
+            entry["p95_seconds"] = _quantile_bound(sorted(buckets[(family, key)]), 0.95, calls)
+    return summary
+
+
+def _quantile_bound(buckets: List[Tuple[float, float]], quantile: float, total: float) -> Optional[float]:
+    if not total:
+        return None
+    for bound, cumulative in buckets:
+        if cumulative >= quantile * total:
+            return bound
+    return math.inf
+
+
+def _quote(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def _unquote(value: str) -> str:
+    return re.sub(r"\\(.)", lambda m: "\n" if m.group(1) == "n" else m.group(1), value)
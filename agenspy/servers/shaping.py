@@ -0,0 +1,86 @@
+"""Field projection and pagination of tool results, applied before they are encoded."""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def project(value: Any, fields: List[str]) -> Any:
+    """Keep only the dotted ``fields`` of ``value``.
+
+    Lists are projected item by item, at any depth, so ``"user.login"`` picks
+    the login out of every issue in a list of issues. Fields a value lacks are
+    left out rather than reported, and values that are not dicts or lists are
+    returned unchanged.
+    """
+    if not isinstance(fields, list) or not all(isinstance(field, str) and field for field in fields):
+        raise ValueError("fields must be a list of dotted paths")
+    return _project(value, _field_tree(fields))
+
+
+def paginate(items: List[Any], cursor: Optional[str], limit: Optional[int]) -> Tuple[List[Any], Optional[str]]:
+    """Return the page of ``items`` starting at ``cursor`` and the cursor of the next page, if any."""
+    try:
+        start = int(cursor) if cursor is not None else 0
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    if start < 0:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    if limit is not None and (not isinstance(limit, int) or isinstance(limit, bool) or limit < 1):
+        raise ValueError(f"limit must be a positive integer, got {limit!r}")
+
+    end = len(items) if limit is None else start + limit
+    return items[start:end], str(end) if end < len(items) else None
+
+
+def shape_result(
+    result: Any,
+    fields: Optional[List[str]] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    page_key: Optional[str] = None,
+) -> Any:
+    """Apply a ``call_tool`` request's projection and pagination to a tool result.
+
+    For a tool whose result keeps its items in the list ``page_key``, only
+    that list is paged and projected; other keys such as ``total_count`` are
+    kept, and ``next_cursor`` is added when more items remain. Other results
+    are projected as a whole and cannot be paged.
+    """
+    if page_key is not None and isinstance(result, dict) and isinstance(result.get(page_key), list):
+        items, next_cursor = paginate(result[page_key], cursor, limit)
+        shaped = {**result, page_key: project(items, fields) if fields is not None else items}
+        if next_cursor is not None:
+            shaped["next_cursor"] = next_cursor
+        return shaped
+
+    if cursor is not None or limit is not None:
+        raise ValueError("This tool's results cannot be paginated")
+    return project(result, fields) if fields is not None else result
+
+
+def _field_tree(fields: List[str]) -> Dict[str, Any]:
+    """Turn dotted paths into nested dicts; ``None`` marks a field kept whole."""
+    tree: Dict[str, Any] = {}
+    for field in fields:
+        node = tree
+        *parents, leaf = field.split(".")
+        for part in parents:
+            child = node.setdefault(part, {})
+            if child is None:
+                # A shorter path already keeps this field whole
+                break
+            node = child
+        else:
+            node[leaf] = None
+    return tree
+
+
+def _project(value: Any, tree: Dict[str, Any]) -> Any:
+    if isinstance(value, list):
+        return [_project(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {
+        key: value[key] if subtree is None else _project(value[key], subtree)
+        for key, subtree in tree.items()
+        if key in value
+    }
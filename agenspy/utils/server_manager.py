@@ -2,9 +2,10 @@
 
 import subprocess
 import threading
-import time
 from typing import Dict, List, Optional
 
+from ..protocols.mcp.session import BackgroundMCPServer
+
 
 class ServerManager:
     """Manages background server processes."""
@@ -12,37 +13,46 @@ class ServerManager:
     def __init__(self):
         self.servers: Dict[str, subprocess.Popen] = {}
         self.server_threads: Dict[str, threading.Thread] = {}
-
-    def start_server(self, server_id: str, command: List[str], wait_time: int = 3) -> bool:
-        """Start a server process in the background."""
-        try:
-            print(f"🚀 Starting server {server_id}: {' '.join(command)}")
-
-            process = subprocess.Popen(
-                command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=0
-            )
-
-            # Wait for server to start
-            time.sleep(wait_time)
-
-            if process.poll() is None:
-                self.servers[server_id] = process
-                print(f"✅ Server {server_id} started successfully")
-                return True
-            else:
-                print(f"❌ Server {server_id} failed to start")
-                return False
-
-        except Exception as e:
-            print(f"❌ Failed to start server {server_id}: {e}")
+        self.sessions: Dict[str, BackgroundMCPServer] = {}
+
+    def start_server(
+        self,
+        server_id: str,
+        command: List[str],
+        wait_time: float = 3,
+        ready_marker: Optional[str] = None,
+        handshake: bool = False,
+    ) -> bool:
+        """Start a server process in the background.
+
+        ``wait_time`` is the startup deadline. The call returns as soon as the
+        server prints ``ready_marker`` or, with ``handshake``, answers an MCP
+        ``initialize`` request over stdio, and fails as soon as the process
+        exits. Without either, a process still running at the deadline is
+        considered started.
+        """
+        print(f"🚀 Starting server {server_id}: {' '.join(command)}")
+
+        server = BackgroundMCPServer(command, startup_timeout=wait_time, ready_marker=ready_marker, handshake=handshake)
+        if not server.start_server():
+            print(f"❌ Server {server_id} failed to start")
             return False
 
+        self.servers[server_id] = server.process
+        self.sessions[server_id] = server
+        print(f"✅ Server {server_id} started successfully")
+        return True
+
     def stop_server(self, server_id: str) -> bool:
         """Stop a server process."""
         if server_id not in self.servers:
             print(f"⚠️ Server {server_id} not found")
             return False
 
+        session = self.sessions.pop(server_id, None)
+        if session and session.transport:
+            session.transport.close()
+
         try:
             process = self.servers[server_id]
             process.terminate()
@@ -114,6 +114,20 @@ class RepositoryAnalysisAgent(dspy.Module):
             mcp_capabilities=repo_info.capabilities
         )
 
+def analyze_repository_structure(repo_url: str):
+    """Analyze repository structure.
+
+    Defined at module level and kept synchronous so the server can run it in
+    its process pool: real structure analysis is CPU-bound and would
+    otherwise freeze the event loop for every other client.
+    """
+    return {
+        "structure": "well-organized",
+        "directories": ["src", "tests", "docs"],
+        "main_files": ["README.md", "setup.py"],
+        "architecture": "modular"
+    }
+
 def setup_python_mcp_server():
     """Setup and start Python MCP server."""
     print("🐍 Setting up Python MCP Server...")
@@ -121,15 +135,6 @@ def setup_python_mcp_server():
     server = GitHubMCPServer(port=8082)
 
     # Add custom analysis tools
-    async def analyze_repository_structure(repo_url: str):
-        """Analyze repository structure."""
-        return {
-            "structure": "well-organized",
-            "directories": ["src", "tests", "docs"],
-            "main_files": ["README.md", "setup.py"],
-            "architecture": "modular"
-        }
-
     async def get_file_tree(repo: str, depth: int = 2):
         """Get repository file tree."""
         return {
@@ -151,7 +156,8 @@ def setup_python_mcp_server():
         "analyze_repository_structure",
         "Analyze repository structure and architecture",
         {"repo_url": "string"},
-        analyze_repository_structure
+        analyze_repository_structure,
+        executor="process"
     )
 
     server.register_tool(
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Compare MCP tool call latency across in-process, Unix socket and WebSocket transports."""
+
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from agenspy import MCPClient, PythonMCPServer
+
+PORT = 8083
+CALLS = 2000
+
+
+def make_server(**kwargs):
+    server = PythonMCPServer("bench-server", PORT, **kwargs)
+    server.register_tool("echo", "Echo the input", {"text": "string"}, lambda text: text)
+    return server
+
+
+def bench(label, client):
+    if not client.connect():
+        print(f"❌ {label}: could not connect")
+        return
+    try:
+        client.call_tool("echo", {"text": "warmup"})
+        timings = []
+        for _ in range(CALLS):
+            start = time.perf_counter()
+            client.call_tool("echo", {"text": "hello"})
+            timings.append(time.perf_counter() - start)
+        print(
+            f"📊 {label:<12} median {statistics.median(timings) * 1e6:8.1f} µs   "
+            f"p99 {sorted(timings)[int(CALLS * 0.99)] * 1e6:8.1f} µs"
+        )
+    finally:
+        client.disconnect()
+
+
+def main():
+    print("⏱️  MCP transport benchmark")
+    print("=" * 30)
+
+    bench("in-process", MCPClient("inproc://bench", server=make_server()))
+
+    socket_path = os.path.join(tempfile.mkdtemp(), "bench.sock")
+    threading.Thread(target=make_server(unix_socket=socket_path).start, daemon=True).start()
+    while not os.path.exists(socket_path):
+        time.sleep(0.05)
+    time.sleep(1)  # let uvicorn bind the TCP port too
+
+    bench("unix socket", MCPClient(f"unix://{socket_path}", mock_fallback=False))
+    bench("websocket", MCPClient(f"mcp://127.0.0.1:{PORT}", mock_fallback=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,7 @@ install_requires = [
     "pydantic>=2.0",
     "fastapi>=0.100.0",
     "uvicorn>=0.20.0",
-    "websockets>=11.0",
+    "websockets>=13.0",
     "asyncio",
     "typing-extensions",
     "click>=8.0",
@@ -1,11 +1,14 @@
 """Tests for GitHub agent implementation."""
 
+import threading
+import time
+
 import dspy
 import pytest
 from unittest.mock import MagicMock, patch, PropertyMock
 from enum import Enum
 
-from agenspy.agents.github_agent import GitHubPRReviewAgent
+from agenspy.agents.github_agent import GitHubPRReviewAgent, split_diff
 from agenspy.agents.multi_protocol_agent import MultiProtocolAgent
 from agenspy.protocols.mcp.client import MCPClient
 from agenspy.protocols.base import ProtocolType
@@ -64,6 +67,158 @@ class TestGitHubPRReviewAgent:
             agent.cleanup()
             agent.cleanup.assert_called_once()
 
+    def test_context_fetches_run_concurrently(self):
+        """Test context fetches overlap and a slow or failing fetch is reported, not awaited."""
+        agent = GitHubPRReviewAgent("mcp://test-server:8080", fetch_timeout=0.5)
+        agent.context_fetches.append(("commits", "Get commits for {pr_url}", "commit_log"))
+        agent.mcp_client = SlowProtocol({"github_search": 0.3, "file_reader": 0.3, "commit_log": 5})
+
+        start = time.monotonic()
+        contexts, errors = agent.fetch_context("https://github.com/o/r/pull/1")
+        assert time.monotonic() - start < 0.9
+        assert contexts["file_changes"].context_data == "file_reader: Get file changes for https://github.com/o/r/pull/1"
+        assert set(contexts) == {"pr_details", "file_changes"}
+        assert "timed out" in errors["commits"]
+
+        agent.mcp_client = SlowProtocol({"file_reader": -1})
+        contexts, errors = agent.fetch_context("https://github.com/o/r/pull/1")
+        assert set(contexts) == {"pr_details", "commits"}
+        assert errors == {"file_changes": "fetch failed"}
+
+        agent.mcp_client = SlowProtocol({})
+        agent.mcp_client.is_connected = False
+        agent.mcp_client.connect = MagicMock(return_value=False)
+        contexts, errors = agent.fetch_context("https://github.com/o/r/pull/1")
+        agent.mcp_client.connect.assert_called_once()
+        assert agent.mcp_client.peak == 0  # nothing was sent
+        assert contexts == {}
+        assert errors == {name: "MCP connection failed" for name in ("pr_details", "file_changes", "commits")}
+
+    def test_review_many(self):
+        """Test bulk reviews run in parallel up to the limit and report failures per PR."""
+        agent = GitHubPRReviewAgent("mcp://test-server:8080")
+        agent.mcp_client = SlowProtocol({"github_search": 0.2, "file_reader": 0.2})
+        agent.analyze_pr = lambda pr_context, file_changes: fake_analysis(pr_context)
+        agent.generate_review = lambda analysis, suggestions: dspy.Prediction(
+            review_comment=analysis, approval_status="Approved"
+        )
+        urls = [f"https://github.com/o/r/pull/{i}" for i in range(6)] + ["https://github.com/o/r/pull/bad"]
+
+        start = time.monotonic()
+        results = list(agent.review_many(urls, max_concurrency=3))
+        assert time.monotonic() - start < 1.2
+        assert agent.mcp_client.peak == 6  # three reviews, each fetching two contexts at once
+
+        by_url = {result.pr_url: result for result in results}
+        assert set(by_url) == set(urls)
+        assert by_url["https://github.com/o/r/pull/bad"].error == "analysis failed"
+        assert by_url["https://github.com/o/r/pull/2"].approval_status == "Approved"
+
+        agent.mcp_client = SlowProtocol({})
+        agent.mcp_client.is_connected = False
+        agent.mcp_client.connect = MagicMock(return_value=False)
+        results = list(agent.review_many(urls, max_concurrency=3))
+        agent.mcp_client.connect.assert_called_once()
+        assert [(result.pr_url, result.error) for result in results] == [(url, "MCP connection failed") for url in urls]
+
+    def test_large_diff_is_analyzed_in_parallel_chunks(self):
+        """Test a large diff is split by file and hunk, analyzed concurrently and merged in order."""
+        diff = make_diff("a.py", hunks=1) + make_diff("b.py", hunks=4) + make_diff("c.py", hunks=1)
+        chunks = split_diff(diff, max_tokens=300)
+        assert "".join(split_diff(diff, max_tokens=10**6)) == diff
+        assert [chunk.splitlines()[0] for chunk in chunks] == ["diff --git a/a.py b/a.py"] + [
+            "diff --git a/b.py b/b.py"
+        ] * 4 + ["diff --git a/c.py b/c.py"]
+        assert all(len(chunk) <= 1200 for chunk in chunks)
+
+        agent = GitHubPRReviewAgent("mcp://test-server:8080", chunk_tokens=300)
+
+        def analyze(pr_context, file_changes):
+            time.sleep(0.2)
+            first_hunk = next(line for line in file_changes.splitlines() if line.startswith("@@"))
+            return dspy.Prediction(analysis=first_hunk, suggestions=["Add tests", file_changes.split()[2]])
+
+        agent.analyze_pr = analyze
+        start = time.monotonic()
+        analysis = agent.analyze_changes("PR context", diff)
+        assert time.monotonic() - start < 0.6
+        assert analysis.analysis.startswith("Part 1 of 6:\n@@ -0,3 +0,3 @@")
+        assert analysis.analysis.index("Part 3 of 6:\n@@ -1,3") < analysis.analysis.index("Part 6 of 6")
+        assert analysis.suggestions == ["Add tests", "a/a.py", "a/b.py", "a/c.py"]
+
+    def test_incremental_review_reuses_unchanged_files(self):
+        """Test a review at a new head SHA re-analyzes only the files whose diff changed."""
+        agent = GitHubPRReviewAgent("mcp://test-server:8080")
+        analyzed = []
+
+        def analyze(pr_context, file_changes):
+            analyzed.append(file_changes.splitlines()[0])
+            return dspy.Prediction(analysis=f"{len(file_changes)} chars", suggestions=[])
+
+        agent.analyze_pr = analyze
+        pr_url = "https://github.com/o/r/pull/1"
+        first = make_diff("a.py", hunks=1) + make_diff("b.py", hunks=1)
+        analysis = agent.analyze_changes("PR context", first, pr_url, head_sha="sha1")
+        assert analyzed == ["diff --git a/a.py b/a.py", "diff --git a/b.py b/b.py"]
+        assert analysis.analysis.startswith("a.py:\n")
+
+        analyzed.clear()
+        second = make_diff("a.py", hunks=1) + make_diff("b.py", hunks=2) + make_diff("c.py", hunks=1)
+        analysis = agent.analyze_changes("PR context", second, pr_url, head_sha="sha2")
+        assert analyzed == ["diff --git a/b.py b/b.py", "diff --git a/c.py b/c.py"]
+        assert [line for line in analysis.analysis.splitlines() if line.endswith(".py:")] == ["a.py:", "b.py:", "c.py:"]
+        assert agent.review_cache.latest(pr_url)[0] == "sha2"
+        assert (agent.review_cache.reused, agent.review_cache.analyzed) == (1, 4)
+
+        analyzed.clear()
+        agent.analyze_changes("PR context", second, pr_url, head_sha="sha2")
+        agent.analyze_changes("PR context", second, "https://github.com/o/r/pull/2", head_sha="sha2")
+        assert len(analyzed) == 3
+
+        analyzed.clear()
+        both = make_diff("a.py", hunks=1) + make_diff("a.py", hunks=1, lines=3)
+        analysis = agent.analyze_changes("PR context", "Summary\n" + both, "https://github.com/o/r/pull/3", "sha1")
+        assert analyzed == ["Summary", "diff --git a/a.py b/a.py"]
+        assert analysis.analysis == f"Other changes:\n8 chars\n\na.py:\n{len(both)} chars"
+
+
+def make_diff(name, hunks, lines=20):
+    diff = f"diff --git a/{name} b/{name}\n--- a/{name}\n+++ b/{name}\n"
+    for i in range(hunks):
+        diff += f"@@ -{i},3 +{i},3 @@\n" + "".join(f"+line {j} {'x' * 40}\n" for j in range(lines))
+    return diff
+
+
+def fake_analysis(pr_context):
+    if "bad" in pr_context:
+        raise RuntimeError("analysis failed")
+    return dspy.Prediction(analysis=pr_context, suggestions=[])
+
+
+class SlowProtocol:
+    """Stands in for an MCP client whose requests take a while; a negative delay fails."""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.is_connected = True
+        self.active = self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, context_request, tool_name):
+        delay = self.delays.get(tool_name, 0)
+        if delay < 0:
+            raise RuntimeError("fetch failed")
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(delay)
+        with self.lock:
+            self.active -= 1
+        return dspy.Prediction(context_data=f"{tool_name}: {context_request}", protocol_info="stub")
+
+    def get_capabilities(self):
+        return {"protocol": "stub"}
+
 
 class TestMultiProtocolAgent:
     """Test cases for multi-protocol agent."""
@@ -95,6 +250,45 @@ class TestMultiProtocolAgent:
         assert len(agent.protocols) == 1
         assert agent.protocols[ProtocolType.MCP] == mock_protocol
 
+    def test_use_all_protocols_queries_concurrently_with_deadline(self):
+        """Test all protocols are queried at once and late or failing ones are left out."""
+        agent = MultiProtocolAgent("test-agent", protocol_timeout=0.5)
+        agent.synthesize_responses = lambda responses, protocols_used: dspy.Prediction(
+            final_answer=" | ".join(responses), confidence=1.0
+        )
+        for protocol_type, delay in [(ProtocolType.MCP, 0.3), (ProtocolType.AGENT2AGENT, 5), (ProtocolType.CUSTOM, 0.3)]:
+            agent.add_protocol(DelayedProtocol(protocol_type, delay))
+
+        start = time.monotonic()
+        result = agent("What changed?", use_all_protocols=True)
+        assert time.monotonic() - start < 0.9
+        assert result.protocols_used == ["mcp", "custom"]
+        assert result.final_answer == "mcp: What changed? | custom: What changed?"
+        assert result.protocol_errors == {"agent2agent": "timed out after 0.5s"}
+
+        agent.quorum = 1
+        agent.protocols[ProtocolType.CUSTOM].delay = 0.05
+        agent.protocols[ProtocolType.MCP].delay = -1
+        start = time.monotonic()
+        result = agent("What changed?", use_all_protocols=True)
+        assert time.monotonic() - start < 0.25
+        assert result.protocols_used == ["custom"]
+        assert result.protocol_errors == {"mcp": "query failed", "agent2agent": "dropped after quorum"}
+
+
+class DelayedProtocol:
+    """Stands in for a protocol that answers after ``delay`` seconds; a negative delay fails."""
+
+    def __init__(self, protocol_type, delay):
+        self.protocol_type = protocol_type
+        self.delay = delay
+
+    def __call__(self, context_request):
+        if self.delay < 0:
+            raise RuntimeError("query failed")
+        time.sleep(self.delay)
+        return dspy.Prediction(context_data=f"{self.protocol_type.value}: {context_request}")
+
 
 if __name__ == "__main__":
     pytest.main([__file__])
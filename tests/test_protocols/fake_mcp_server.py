@@ -0,0 +1,58 @@
+"""Minimal stdio MCP server used by the transport tests.
+
+Each request is answered from its own thread, so slow tool calls finish out
+of order the way a real concurrent server would answer them.
+"""
+
+import json
+import sys
+import threading
+import time
+
+write_lock = threading.Lock()
+
+TOOLS = [
+    {"name": "echo", "description": "Echo the message", "inputSchema": {"type": "object"}},
+    {"name": "sleep", "description": "Sleep then echo", "inputSchema": {"type": "object"}},
+]
+
+
+def send(message):
+    with write_lock:
+        sys.stdout.write(json.dumps(message) + "\n")
+        sys.stdout.flush()
+
+
+def respond(request):
+    method = request.get("method")
+    params = request.get("params") or {}
+    if method == "initialize":
+        result = {"protocolVersion": "2024-11-05", "serverInfo": {"name": "fake", "version": "1.0"}, "capabilities": {}}
+    elif method == "tools/list":
+        result = {"tools": TOOLS}
+    elif method == "tools/call":
+        args = params.get("arguments", {})
+        if params.get("name") == "sleep":
+            time.sleep(args.get("seconds", 0))
+        result = {"content": [{"type": "text", "text": f"{params.get('name')}: {args.get('message', '')}"}]}
+    else:
+        return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32601, "message": f"Unknown {method}"}}
+    return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+
+def handle(request):
+    if isinstance(request, list):
+        send([respond(item) for item in request])
+    else:
+        send(respond(request))
+
+
+def main():
+    for line in sys.stdin:
+        request = json.loads(line)
+        if isinstance(request, list) or "id" in request:
+            threading.Thread(target=handle, args=(request,), daemon=True).start()
+
+
+if __name__ == "__main__":
+    main()
@@ -77,6 +77,21 @@ class TestBaseProtocol:
         assert protocol._connected
         assert result.result == "test_result"
 
+    @pytest.mark.asyncio
+    async def test_aforward_auto_connect(self):
+        """Test the async call path connects and delegates to the sync handler."""
+        protocol = MockProtocol()
+
+        result = await protocol.acall(test_param="value")
+        assert protocol._connected
+        assert result.result == "test_result"
+
+    @pytest.mark.asyncio
+    async def test_tool_calls_are_not_part_of_the_base_api(self):
+        """Test tool calls are left to protocols that expose tools."""
+        assert not hasattr(MockProtocol(), "call_tool")
+        assert not hasattr(MockProtocol(), "acall_tool")
+
     def test_protocol_info(self):
         """Test protocol metadata."""
         protocol = MockProtocol()
@@ -1,9 +1,134 @@
 """Tests for MCP protocol implementation."""
 
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from unittest.mock import patch
+
 import pytest
+import uvicorn
 
+from agenspy.protocols.mcp.catalog_cache import ToolCatalogCache
 from agenspy.protocols.mcp.client import MCPClient, RealMCPClient
-from agenspy.protocols.mcp.session import MockMCPSession
+from agenspy.protocols.mcp.codec import JSONCodec, get_codec, negotiate_encoding
+from agenspy.protocols.mcp.inprocess import InProcessMCPSession
+from agenspy.protocols.mcp.result_cache import ToolResultCache
+from agenspy.protocols.mcp.session import BackgroundMCPServer, MockMCPSession
+from agenspy.protocols.mcp.shm import SharedRingBuffer
+from agenspy.protocols.mcp.transport import SERVER_OVERLOADED, MCPError, StreamTransport
+from agenspy.protocols.mcp.unix import UnixMCPSession, unix_socket_path
+from agenspy.protocols.mcp.websocket import WebSocketMCPSession, websocket_url
+from agenspy.servers.mcp_python_server import PythonMCPServer
+
+FAKE_SERVER = [sys.executable, os.path.join(os.path.dirname(__file__), "fake_mcp_server.py")]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def serve(server: PythonMCPServer, port: int):
+    """Run a PythonMCPServer's app on a background thread for the duration of the block."""
+    uvicorn_server = uvicorn.Server(uvicorn.Config(server.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=uvicorn_server.run, daemon=True)
+    thread.start()
+    while not uvicorn_server.started:
+        time.sleep(0.01)
+    try:
+        yield
+    finally:
+        uvicorn_server.should_exit = True
+        thread.join(timeout=5)
+
+
+@contextmanager
+def serve_unix(server: PythonMCPServer, path: str):
+    """Serve a PythonMCPServer's Unix socket from a background event loop for the duration of the block."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    unix_server = asyncio.run_coroutine_threadsafe(server.start_unix_server(path), loop).result(timeout=5)
+
+    async def stop():
+        unix_server.close()
+        handlers = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in handlers:
+            task.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+
+    try:
+        yield
+    finally:
+        asyncio.run_coroutine_threadsafe(stop(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+
+
+def tool_server() -> PythonMCPServer:
+    server = PythonMCPServer("ws-test")
+
+    async def slow(delay: float):
+        await asyncio.sleep(delay)
+        return {"slept": delay}
+
+    def fail():
+        raise RuntimeError("boom")
+
+    server.register_tool("slow", "Sleep then answer", {"delay": "number"}, slow)
+    server.register_tool("fail", "Always fails", {}, fail)
+    server.register_tool("echo", "Echo text", {"text": "string"}, lambda text: text, cache_ttl=60)
+    return server
+
+
+def streaming_server() -> PythonMCPServer:
+    server = tool_server()
+
+    async def words(count: int, pause: float = 0.0, fail_after: int = -1):
+        for i in range(count):
+            if i == fail_after:
+                raise RuntimeError("stream broke")
+            yield f"w{i} "
+            await asyncio.sleep(pause)
+
+    server.register_tool("words", "Yield words one at a time", {"count": "integer"}, words)
+    return server
+
+
+@contextmanager
+def streaming_client(transport: str, tmp_path):
+    """Connect an MCPClient to a streaming server over the given transport."""
+    if transport == "inproc":
+        client = MCPClient("inproc://tools", server=streaming_server())
+        assert client.connect()
+        try:
+            yield client
+        finally:
+            client.disconnect()
+        return
+
+    if transport == "unix":
+        path = str(tmp_path / "tools.sock")
+        context, url = serve_unix(streaming_server(), path), f"unix://{path}"
+    else:
+        port = free_port()
+        context, url = serve(streaming_server(), port), f"mcp://127.0.0.1:{port}"
+    with context:
+        client = MCPClient(url, mock_fallback=False)
+        assert client.connect()
+        try:
+            yield client
+        finally:
+            client.disconnect()
 
 
 class TestMCPClient:
@@ -58,6 +183,28 @@ class TestMCPClient:
         assert hasattr(result, "tool_result")
         assert hasattr(result, "capabilities")
 
+    @pytest.mark.asyncio
+    async def test_mcp_async_request_handling(self):
+        """Test the async request path."""
+        client = MCPClient("mcp://test-server:8080")
+
+        result = await client.acall(context_request="Get PR details for test", tool_name="github_search")
+        assert client._connected
+        assert "PR #123" in result.context_data
+        assert "Found 3 related PRs" in result.tool_result
+
+        assert "OAuth2" in await client.acall_tool("file_reader", {"path": "a.py"})
+
+    def test_mcp_execute_tools(self):
+        """Test batched execution keeps order and reports per-item errors."""
+        client = MCPClient("mcp://test-server:8080")
+
+        results = client.execute_tools([("github_search", {"query": "x"}), ("nope", {}), ("file_reader", {})])
+
+        assert "Found 3 related PRs" in results[0]["result"]
+        assert results[1] == {"tool": "nope", "error": "Tool nope not available"}
+        assert "OAuth2" in results[2]["result"]
+
     def test_mcp_disconnect(self):
         """Test MCP disconnection."""
         client = MCPClient("mcp://test-server:8080")
@@ -139,5 +286,724 @@ class TestMockMCPSession:
         assert "Code quality: Good" in result
 
 
+class TestBackgroundMCPServer:
+    """Test cases for the stdio JSON-RPC background server."""
+
+    @pytest.fixture
+    def server(self):
+        server = BackgroundMCPServer(FAKE_SERVER)
+        assert server.start_server()
+        assert server.connect_client()
+        yield server
+        server.stop_server()
+
+    def test_tool_discovery(self, server):
+        """Test tools are discovered from the server."""
+        assert set(server.tools) == {"echo", "sleep"}
+        assert server.server_info["name"] == "fake"
+
+    def test_tool_execution(self, server):
+        """Test tool calls round-trip through the subprocess."""
+        assert server.execute_tool("echo", {"message": "hi"}) == "echo: hi"
+        assert "not available" in server.execute_tool("missing", {})
+
+    def test_stream_yields_whole_result(self, server):
+        """Test standard MCP tools stream their whole result as one chunk."""
+        assert list(server.stream_tool("echo", {"message": "hi"})) == ["echo: hi"]
+
+    def test_concurrent_calls_are_pipelined(self, server):
+        """Test calls from many threads are in flight at the same time."""
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(
+                pool.map(
+                    lambda i: server.execute_tool("sleep", {"seconds": 0.5, "message": str(i)}),
+                    range(8),
+                )
+            )
+
+        assert results == [f"sleep: {i}" for i in range(8)]
+        assert time.monotonic() - start < 2.0
+
+    def test_execute_tools_pipelined(self, server):
+        """Test a batch returns per-call results and errors in order."""
+        start = time.monotonic()
+        results = server.execute_tools(
+            [("sleep", {"seconds": 0.5, "message": "a"}), ("missing", {}), ("sleep", {"seconds": 0.5, "message": "b"})]
+        )
+
+        assert results[0] == {"tool": "sleep", "result": "sleep: a"}
+        assert "not available" in results[1]["error"]
+        assert results[2] == {"tool": "sleep", "result": "sleep: b"}
+        assert time.monotonic() - start < 1.0
+
+    @pytest.mark.asyncio
+    async def test_execute_tools_as_jsonrpc_batch(self, server):
+        """Test calls can be framed as a single JSON-RPC batch."""
+        server.batch_requests = True
+        results = await server.aexecute_tools([("echo", {"message": str(i)}) for i in range(5)])
+
+        assert [r["result"] for r in results] == [f"echo: {i}" for i in range(5)]
+
+    @pytest.mark.asyncio
+    async def test_async_calls_overlap(self, server):
+        """Test awaited calls overlap on one event loop."""
+        start = time.monotonic()
+        results = await asyncio.gather(
+            *(server.aexecute_tool("sleep", {"seconds": 0.5, "message": str(i)}) for i in range(8))
+        )
+
+        assert results == [f"sleep: {i}" for i in range(8)]
+        assert time.monotonic() - start < 2.0
+
+
+class TestMCPError:
+    """Test cases for transport error decoding."""
+
+    def test_jsonrpc_error_object(self):
+        """Test standard JSON-RPC error objects."""
+        error = MCPError.from_response({"id": 1, "error": {"code": -32601, "message": "Method not found"}})
+        assert str(error) == "Method not found"
+        assert error.code == -32601
+        assert error.retry_after is None
+
+    def test_overloaded_error(self):
+        """Test overload errors keep the server's retry hint."""
+        response = {"id": 1, "error": "Server overloaded", "code": SERVER_OVERLOADED, "data": {"retry_after": 2.0}}
+        error = MCPError.from_response(response)
+        assert error.code == -32000
+        assert error.retry_after == 2.0
+
+
+class TestCodec:
+    """Test cases for the pluggable JSON codec."""
+
+    @pytest.mark.parametrize("name", ["json", "orjson"])
+    def test_round_trip(self, name):
+        """Test every codec decodes what it encodes, from str or bytes."""
+        codec = get_codec(name)
+        message = {"jsonrpc": "2.0", "id": 7, "result": {"content": [{"type": "text", "text": "héllo"}]}}
+        assert codec.loads(codec.dumps(message)) == message
+        assert codec.loads(codec.dumpb(message)) == message
+
+    def test_orjson_falls_back_on_unsupported_values(self):
+        """Test values orjson rejects are still encoded."""
+        pytest.importorskip("orjson")
+        codec = get_codec("orjson")
+        assert codec.name == "orjson"
+        assert codec.loads(codec.dumpb({"big": 2**70})) == {"big": 2**70}
+
+    def test_environment_selects_codec(self):
+        """Test AGENSPY_JSON_CODEC picks the default codec."""
+        with patch.dict(os.environ, {"AGENSPY_JSON_CODEC": "json"}):
+            assert type(get_codec()) is JSONCodec
+
+    @pytest.mark.parametrize("name", ["msgpack", "cbor"])
+    def test_binary_round_trip(self, name):
+        """Test binary codecs round-trip nested tool results."""
+        pytest.importorskip("cbor2" if name == "cbor" else name)
+        codec = get_codec(name)
+        message = {"id": "1", "result": {"content": [{"sha": "abc", "files": [1, 2]}], "isError": False}}
+        assert codec.binary
+        assert codec.loads(codec.dumpb(message)) == message
+
+    def test_negotiate_encoding(self):
+        """Test the first mutually supported encoding wins, else JSON."""
+        assert negotiate_encoding(["cbor", "msgpack"], ["msgpack", "cbor"]) == "cbor"
+        assert negotiate_encoding(["cbor"], ["msgpack"]) == "json"
+        assert negotiate_encoding(None, ["msgpack"]) == "json"
+
+    def test_unknown_codec(self):
+        """Test unknown codec names are rejected."""
+        with pytest.raises(ValueError):
+            get_codec("yaml")
+
+
+class TestToolCatalogCache:
+    """Test cases for the on-disk tool catalog cache."""
+
+    def test_roundtrip_and_version_check(self, tmp_path):
+        """Test catalogs are only returned for the version they were stored at."""
+        cache = ToolCatalogCache(str(tmp_path))
+        cache.put("mcp://server", "1.0", {"echo": {"description": "Echo"}})
+
+        assert cache.get("mcp://server", "1.0") == {"echo": {"description": "Echo"}}
+        assert cache.get("mcp://server", "2.0") is None
+        assert cache.get("mcp://other", "1.0") is None
+
+        cache.invalidate("mcp://server")
+        assert cache.get("mcp://server", "1.0") is None
+
+    def test_mcp_client_skips_discovery_on_hit(self, tmp_path):
+        """Test a second client loads its catalog from disk."""
+        cache = ToolCatalogCache(str(tmp_path))
+        MCPClient("mcp://test-server:8080", catalog_cache=cache).connect()
+
+        client = MCPClient("mcp://test-server:8080", catalog_cache=cache)
+        with patch.object(MockMCPSession, "list_tools", side_effect=AssertionError("rediscovered")):
+            assert client.connect()
+        assert "github_search" in client.available_tools
+
+    def test_failed_write_leaves_no_temp_file(self, tmp_path):
+        """Test a catalog that cannot be serialized is not cached and its temp file is removed."""
+        cache = ToolCatalogCache(str(tmp_path))
+        cache.put("server", "1.0", {"bad": object()})
+        assert cache.get("server", "1.0") is None
+        assert os.listdir(tmp_path) == []
+
+    def test_list_changed_refreshes_catalog(self, tmp_path):
+        """Test a cached catalog is used until the server reports a change."""
+        cache = ToolCatalogCache(str(tmp_path))
+        server = BackgroundMCPServer(FAKE_SERVER, catalog_cache=cache)
+        cache.put(server.server_key, "1.0", {"echo": {"description": "cached"}})
+        try:
+            assert server.start_server()
+            assert server.connect_client()
+            assert set(server.tools) == {"echo"}
+
+            server.transport._handle_notification({"method": "notifications/tools/list_changed"})
+            assert server.execute_tool("sleep", {"message": "x"}) == "sleep: x"
+            assert set(server.tools) == {"echo", "sleep"}
+            assert set(cache.get(server.server_key, "1.0")) == {"echo", "sleep"}
+        finally:
+            server.stop_server()
+
+    def test_batch_reports_send_failures_and_timeouts_per_call(self):
+        """Test a dead server or a late call fails its own items and leaves nothing pending."""
+        client = RealMCPClient(FAKE_SERVER)
+        try:
+            assert client.connect()
+            transport = client.mcp_server.transport
+            client.mcp_server.request_timeout = 0.3
+            results = client.execute_tools([("sleep", {"seconds": 2}), ("echo", {"message": "x"})])
+            assert results == [{"tool": "sleep", "error": "Timed out after 0.3s"}, {"tool": "echo", "result": "echo: x"}]
+            assert transport._pending == {}
+
+            client.mcp_server.process.kill()
+            client.mcp_server.process.wait()
+            transport._reader_thread.join(timeout=5)
+            results = client.execute_tools([("echo", {"message": "x"}), ("sleep", {})])
+            assert [result["tool"] for result in results] == ["echo", "sleep"]
+            assert all("closed" in result["error"] for result in results)
+        finally:
+            client.disconnect()
+
+    def test_client_sees_refreshed_catalog(self, tmp_path):
+        """Test a client's tools follow its session's catalog once the server reports a change."""
+        cache = ToolCatalogCache(str(tmp_path))
+        client = RealMCPClient(FAKE_SERVER, catalog_cache=cache)
+        cache.put(" ".join(FAKE_SERVER), "1.0", {"echo": {"description": "cached"}})
+        try:
+            assert client.connect()
+            assert set(client.available_tools) == {"echo"}
+            assert client(context_request="x", tool_name="sleep").tool_result == ""
+
+            client.mcp_server.transport._handle_notification({"method": "notifications/tools/list_changed"})
+            assert client.call_tool("echo", {"message": "x"}) == "echo: x"
+            assert set(client.available_tools) == {"echo", "sleep"}
+            assert set(client.get_capabilities()["tools"]) == {"echo", "sleep"}
+            assert client(context_request="x", tool_name="sleep", tool_args={"message": "y"}).tool_result == "sleep: y"
+        finally:
+            client.disconnect()
+
+
+class TestToolResultCache:
+    """Test cases for the tool result cache."""
+
+    def test_policies(self):
+        """Test explicit policies override tool declarations and the default."""
+        cache = ToolResultCache(policies={"get_file_contents": 60, "list_issues": None}, default_ttl=5)
+
+        assert cache.ttl_for("get_file_contents") == 60
+        assert cache.ttl_for("list_issues", {"cache_ttl": 30}) is None
+        assert cache.ttl_for("get_repository", {"cache_ttl": 30}) == 30
+        assert cache.ttl_for("search_repositories") == 5
+        assert ToolResultCache().ttl_for("search_repositories") is None
+
+    def test_canonical_arguments_and_ttl(self):
+        """Test argument order does not matter and entries expire."""
+        now = [0.0]
+        cache = ToolResultCache(clock=lambda: now[0])
+        cache.put("get_repository", {"owner": "a", "repo": "b"}, "repo info", ttl=10)
+
+        assert cache.get("get_repository", {"repo": "b", "owner": "a"}) == "repo info"
+        now[0] = 11
+        assert cache.get("get_repository", {"owner": "a", "repo": "b"}) is None
+        assert len(cache) == 0
+
+    def test_lru_eviction_by_entries_and_bytes(self):
+        """Test both bounds evict the least recently used entries."""
+        cache = ToolResultCache(max_entries=2, max_bytes=10)
+        cache.put("t", {"i": 1}, "aaaa", ttl=60)
+        cache.put("t", {"i": 2}, "bbbb", ttl=60)
+        cache.get("t", {"i": 1})
+        cache.put("t", {"i": 3}, "cccc", ttl=60)
+
+        assert cache.get("t", {"i": 2}) is None
+        assert cache.get("t", {"i": 1}) == "aaaa"
+
+        cache.put("t", {"i": 4}, "dddddddd", ttl=60)
+        assert len(cache) == 1
+        assert cache.size_bytes == 8
+
+    def test_mcp_client_serves_repeat_calls_from_cache(self):
+        """Test identical calls to a cacheable tool reach the session once."""
+        client = MCPClient("mcp://test-server:8080", result_cache=ToolResultCache(policies={"file_reader": 60}))
+        client.connect()
+
+        with patch.object(client.session, "execute_tool", wraps=client.session.execute_tool) as execute:
+            first = client.call_tool("file_reader", {"repo": "r", "file_path": "a.py"})
+            second = client.call_tool("file_reader", {"file_path": "a.py", "repo": "r"})
+            client.call_tool("github_search", {"query": "x"})
+            client.call_tool("github_search", {"query": "x"})
+
+        assert first == second
+        assert execute.call_count == 3
+
+
+class TestServerStartup:
+    """Test cases for server readiness detection."""
+
+    def test_transport_handlers_see_lines_written_before_start(self):
+        """Test lines a peer writes right away reach handlers registered before the reader starts."""
+        read_fd, write_fd = os.pipe()
+        with os.fdopen(write_fd, "wb") as peer:
+            peer.write(b"ready\n" + json.dumps({"jsonrpc": "2.0", "method": "notifications/ping"}).encode() + b"\n")
+        transport = StreamTransport(os.fdopen(read_fd, "rb"), open(os.devnull, "wb"), name="pipe")
+        text, notifications = [], []
+        transport.on_text(text.append)
+        transport.on_notification("notifications/ping", notifications.append)
+        transport.start()
+        transport._reader_thread.join(timeout=5)
+        assert text == ["ready"]
+        assert len(notifications) == 1
+        transport.close()
+
+    def test_send_failure_racing_close_does_not_raise(self):
+        """Test a write that fails while the transport is failing its pending calls returns a failed future."""
+
+        class ClosingWriter:
+            def write(self, data):
+                # The reader thread fails every pending call as the write breaks
+                transport._fail_pending(MCPError("Connection to pipe closed"))
+                raise OSError("broken pipe")
+
+        transport = StreamTransport(open(os.devnull, "rb"), ClosingWriter(), name="pipe")
+        future = transport.send_request("tools/list")
+        with pytest.raises(MCPError, match="closed"):
+            future.result(timeout=1)
+
+    def test_handshake_finishes_startup_early(self):
+        """Test startup returns once initialize is answered."""
+        server = BackgroundMCPServer(FAKE_SERVER, startup_timeout=10)
+        start = time.monotonic()
+        try:
+            assert server.start_server()
+            assert time.monotonic() - start < 3
+        finally:
+            server.stop_server()
+
+    def test_early_exit_fails_fast(self):
+        """Test a process that exits is reported without waiting for the deadline."""
+        server = BackgroundMCPServer([sys.executable, "-c", "import sys; sys.exit(1)"], startup_timeout=10)
+        start = time.monotonic()
+        assert not server.start_server()
+        assert time.monotonic() - start < 3
+
+    def test_ready_marker(self):
+        """Test a readiness marker on stdout finishes startup."""
+        command = [sys.executable, "-c", "import time; print('server READY', flush=True); time.sleep(30)"]
+        server = BackgroundMCPServer(command, startup_timeout=10, ready_marker="READY", handshake=False)
+        start = time.monotonic()
+        try:
+            assert server.start_server()
+            assert time.monotonic() - start < 3
+        finally:
+            server.stop_server()
+
+    def test_ready_marker_printed_before_handlers_register(self):
+        """Test a marker printed at once is caught even when handler registration is slow."""
+
+        class SlowRegistration(StreamTransport):
+            def on_text(self, handler):
+                time.sleep(0.3)
+                super().on_text(handler)
+
+        command = [sys.executable, "-c", "import time; print('READY', flush=True); time.sleep(30)"]
+        server = BackgroundMCPServer(command, startup_timeout=5, ready_marker="READY", handshake=False)
+        with patch("agenspy.protocols.mcp.session.StreamTransport", SlowRegistration):
+            try:
+                assert server.start_server()
+                assert server._ready.is_set()
+            finally:
+                server.stop_server()
+
+    def test_deadline(self):
+        """Test a server that never becomes ready fails at the deadline."""
+        command = [sys.executable, "-c", "import time; time.sleep(30)"]
+        server = BackgroundMCPServer(command, startup_timeout=0.5, ready_marker="READY", handshake=False)
+        assert not server.start_server()
+        assert server.process.poll() is not None
+
+
+class TestWebSocketSession:
+    """Test cases for MCPClient over a real PythonMCPServer WebSocket."""
+
+    def test_websocket_url(self):
+        """Test MCP URLs map onto the server's WebSocket endpoint."""
+        assert websocket_url("mcp://localhost:8080") == "ws://localhost:8080/mcp"
+        assert websocket_url("mcps://tools.example.com") == "wss://tools.example.com/mcp"
+        assert websocket_url("ws://localhost:8080/custom") == "ws://localhost:8080/custom"
+        with pytest.raises(ValueError):
+            websocket_url("http://localhost:8080")
+
+    def test_client_talks_to_python_server(self):
+        """Test MCPClient discovers and calls tools on a running server."""
+        port = free_port()
+        with serve(tool_server(), port):
+            client = MCPClient(f"mcp://127.0.0.1:{port}", result_cache=ToolResultCache())
+            assert client.connect()
+            try:
+                assert isinstance(client.session, WebSocketMCPSession)
+                assert set(client.available_tools) == {"slow", "echo", "fail"}
+                assert client.call_tool("echo", {"text": "hi"}) == "hi"
+                assert '"slept"' in client.call_tool("slow", {"delay": 0})
+
+                assert "boom" in client.call_tool("fail", {})
+                assert len(client.result_cache) == 1
+
+                results = client.execute_tools([("echo", {"text": "a"}), ("fail", {}), ("echo", {"text": "b"})])
+                assert results[0]["result"] == "a"
+                assert "boom" in results[1]["error"]
+                assert results[2]["result"] == "b"
+            finally:
+                client.disconnect()
+
+    def test_requests_are_pipelined(self):
+        """Test concurrent calls share one connection without waiting on each other."""
+        port = free_port()
+        with serve(tool_server(), port):
+            session = WebSocketMCPSession(f"mcp://127.0.0.1:{port}")
+            session.connect()
+            try:
+                start = time.monotonic()
+                with ThreadPoolExecutor(max_workers=5) as pool:
+                    results = list(pool.map(lambda _: session.call_tool("slow", {"delay": 0.3}), range(5)))
+                assert len(results) == 5
+                assert time.monotonic() - start < 1.0
+            finally:
+                session.close()
+
+    @pytest.mark.asyncio
+    async def test_async_calls(self):
+        """Test the async path awaits responses without blocking the loop."""
+        port = free_port()
+        with serve(tool_server(), port):
+            session = WebSocketMCPSession(f"mcp://127.0.0.1:{port}")
+            await asyncio.to_thread(session.connect)
+            try:
+                results = await asyncio.gather(*(session.acall_tool("echo", {"text": str(i)}) for i in range(3)))
+                assert results == ["0", "1", "2"]
+            finally:
+                session.close()
+
+    def test_binary_encoding(self):
+        """Test a negotiated binary encoding is used for calls."""
+        pytest.importorskip("msgpack")
+        port = free_port()
+        with serve(tool_server(), port):
+            session = WebSocketMCPSession(f"mcp://127.0.0.1:{port}", encodings=["msgpack"])
+            session.connect()
+            try:
+                assert session.transport.encoding == "msgpack"
+                assert session.call_tool("echo", {"text": "packed"}) == "packed"
+            finally:
+                session.close()
+
+    def test_reconnects_after_server_restart(self):
+        """Test the session reconnects and keeps working after the connection drops."""
+        port = free_port()
+        with serve(tool_server(), port):
+            session = WebSocketMCPSession(f"mcp://127.0.0.1:{port}", request_timeout=10)
+            session.connect()
+        try:
+            with serve(tool_server(), port):
+                assert session.call_tool("echo", {"text": "again"}) == "again"
+                assert session.transport.reconnects == 1
+        finally:
+            session.close()
+
+    def test_unreachable_server(self):
+        """Test an unreachable server falls back to the mock session only when allowed."""
+        url = f"mcp://127.0.0.1:{free_port()}"
+
+        client = MCPClient(url)
+        assert client.connect()
+        assert isinstance(client.session, MockMCPSession)
+
+        assert not MCPClient(url, mock_fallback=False).connect()
+
+    def test_failed_handshake_releases_connection(self, tmp_path):
+        """Test a server that never answers initialize leaves no socket or reader thread behind."""
+        path = str(tmp_path / "silent.sock")
+        with socket.socket(socket.AF_UNIX) as listener:
+            listener.bind(path)
+            listener.listen()
+            session = UnixMCPSession(f"unix://{path}", request_timeout=0.3)
+            with pytest.raises(TimeoutError):
+                session.connect()
+            assert session.transport.closed
+            session.transport._reader_thread.join(timeout=5)
+            assert not session.transport._reader_thread.is_alive()
+
+
+
+class TestUnixSocketSession:
+    """Test cases for MCPClient over a PythonMCPServer Unix socket."""
+
+    def test_unix_socket_path(self):
+        """Test unix:// URLs map to socket paths."""
+        assert unix_socket_path("unix:///tmp/tools.sock") == "/tmp/tools.sock"
+        with pytest.raises(ValueError):
+            unix_socket_path("mcp://localhost:8080")
+
+    def test_client_over_unix_socket(self, tmp_path):
+        """Test discovery, pipelined calls, errors and batches over the socket."""
+        path = str(tmp_path / "tools.sock")
+        with serve_unix(tool_server(), path):
+            client = MCPClient(f"unix://{path}", mock_fallback=False)
+            assert client.connect()
+            try:
+                assert isinstance(client.session, UnixMCPSession)
+                assert set(client.available_tools) == {"slow", "echo", "fail"}
+                assert client.call_tool("echo", {"text": "local"}) == "local"
+                assert "boom" in client.call_tool("fail", {})
+
+                start = time.monotonic()
+                with ThreadPoolExecutor(max_workers=4) as pool:
+                    list(pool.map(lambda _: client.call_tool("slow", {"delay": 0.3}), range(4)))
+                assert time.monotonic() - start < 1.0
+
+                results = client.execute_tools([("echo", {"text": "a"}), ("fail", {})])
+                assert results[0]["result"] == "a"
+                assert "boom" in results[1]["error"]
+            finally:
+                client.disconnect()
+
+    def test_large_payload(self, tmp_path):
+        """Test messages bigger than asyncio's default line limit get through."""
+        path = str(tmp_path / "tools.sock")
+        with serve_unix(tool_server(), path):
+            session = UnixMCPSession(f"unix://{path}")
+            session.connect()
+            try:
+                text = "x" * (1024 * 1024)
+                assert session.call_tool("echo", {"text": text}) == text
+            finally:
+                session.close()
+
+    def test_missing_socket(self, tmp_path):
+        """Test a missing socket fails the connection when fallback is off."""
+        assert not MCPClient(f"unix://{tmp_path / 'missing.sock'}", mock_fallback=False).connect()
+
+
+class TestInProcessSession:
+    """Test cases for MCPClient bound to a PythonMCPServer in the same process."""
+
+    def test_client_bound_to_server(self):
+        """Test tools are called directly with the same results and errors as over a socket."""
+        client = MCPClient("inproc://tools", server=tool_server())
+        assert client.connect()
+        try:
+            assert isinstance(client.session, InProcessMCPSession)
+            assert set(client.available_tools) == {"slow", "echo", "fail"}
+            assert client.call_tool("echo", {"text": "direct"}) == "direct"
+            assert "boom" in client.call_tool("fail", {})
+
+            results = client.execute_tools([("echo", {"text": "a"}), ("fail", {})])
+            assert results[0]["result"] == "a"
+            assert "boom" in results[1]["error"]
+        finally:
+            client.disconnect()
+
+    def test_projection_and_pagination(self):
+        """Test fields, cursor and limit reach the server and page results apart in the cache."""
+        server = PythonMCPServer("inproc")
+        rows = [{"id": i, "body": "x" * 100} for i in range(5)]
+        server.register_tool("rows", "Rows", {}, lambda: {"rows": rows}, cache_ttl=60, page_key="rows")
+        client = MCPClient("inproc://rows", server=server, result_cache=ToolResultCache())
+        assert client.connect()
+        try:
+            first = json.loads(client.call_tool("rows", {}, fields=["id"], limit=2))
+            assert first == {"rows": [{"id": 0}, {"id": 1}], "next_cursor": "2"}
+            second = json.loads(client.call_tool("rows", {}, fields=["id"], cursor="2", limit=2))
+            assert second["rows"] == [{"id": 2}, {"id": 3}]
+            assert len(json.loads(client.call_tool("rows", {}))["rows"]) == 5
+            assert "Invalid cursor" in client.call_tool("rows", {}, cursor="bad")
+        finally:
+            client.disconnect()
+
+    def test_results_are_not_copied(self):
+        """Test the handler's return value reaches the caller as the same object."""
+        server = PythonMCPServer("inproc")
+        payload = {"files": ["a.py"] * 1000}
+        server.register_tool("big", "Big result", {}, lambda: payload)
+        session = InProcessMCPSession(server)
+        session.connect()
+        try:
+            assert session.transport.request("call_tool", {"name": "big", "arguments": {}})["content"] is payload
+        finally:
+            session.close()
+
+    @pytest.mark.asyncio
+    async def test_overload_errors_keep_protocol_semantics(self):
+        """Test admission control rejects excess calls with retry hints, as it does remotely."""
+        server = tool_server()
+        server.admission.max_concurrent = 1
+        server.admission.max_queued = 0
+        session = InProcessMCPSession(server)
+        await asyncio.to_thread(session.connect)
+        try:
+            outcomes = await asyncio.gather(
+                session.acall_tool("slow", {"delay": 0.2}),
+                session.acall_tool("slow", {"delay": 0.2}),
+                return_exceptions=True,
+            )
+            errors = [outcome for outcome in outcomes if isinstance(outcome, MCPError)]
+            assert len(errors) == 1
+            assert errors[0].code == SERVER_OVERLOADED
+            assert errors[0].retry_after is not None
+        finally:
+            session.close()
+
+
+class TestSharedMemory:
+    """Test cases for the shared-memory ring buffer."""
+
+    def test_ring_buffer_round_trip_and_wrap(self, tmp_path):
+        """Test payloads cross between two mappings, wrap to the start and report when full."""
+        consumer = SharedRingBuffer.create(100, directory=str(tmp_path))
+        producer = SharedRingBuffer(consumer.path, 100)
+        try:
+            first = producer.write(b"a" * 60)
+            assert first == (0, 60)
+            assert producer.write(b"b" * 60) is None  # only 40 bytes free
+
+            assert consumer.consume(*first, bytes) == b"a" * 60
+            second = producer.write(b"b" * 60)
+            assert second == (100, 60)  # skipped the 40-byte tail and wrapped
+            assert consumer.consume(*second, bytes) == b"b" * 60
+            assert producer.write(b"c" * 101) is None
+        finally:
+            producer.close()
+            consumer.close()
+            consumer.unlink()
+
+    def test_large_results_use_shared_memory(self, tmp_path):
+        """Test large responses arrive through the ring buffer and small ones inline."""
+        path = str(tmp_path / "tools.sock")
+        with serve_unix(tool_server(), path):
+            session = UnixMCPSession(f"unix://{path}", shared_memory_size=4 * 1024 * 1024)
+            session.connect()
+            try:
+                assert session.shared_buffer is not None
+                assert not os.path.exists(session.shared_buffer.path)
+
+                assert session.call_tool("echo", {"text": "small"}) == "small"
+                assert session.shared_buffer._tail() == 0
+
+                for _ in range(5):  # enough to wrap the 4 MB buffer
+                    text = "x" * (1024 * 1024)
+                    assert session.call_tool("echo", {"text": text}) == text
+                assert session.shared_buffer._tail() > 4 * 1024 * 1024
+            finally:
+                session.close()
+
+    def test_server_only_maps_ring_buffer_files(self, tmp_path):
+        """Test the server refuses to map a path outside the shared-memory directory or not named like a buffer."""
+        outside = tmp_path / "agenspy-outside.ring"
+        outside.write_bytes(b"\0" * 1024)
+        ring = SharedRingBuffer.create(1024)
+        link = os.path.join(os.path.dirname(ring.path), f"agenspy-link-{os.getpid()}.ring")
+        os.symlink(outside, link)
+
+        path = str(tmp_path / "tools.sock")
+        try:
+            with serve_unix(tool_server(), path), socket.socket(socket.AF_UNIX) as sock:
+                sock.connect(path)
+                lines = sock.makefile("rwb")
+                for offered in [str(outside), link, "/etc/passwd", ring.path]:
+                    offer = {"path": offered, "size": 1024}
+                    lines.write(json.dumps({"method": "initialize", "params": {"shared_memory": offer}, "id": 1}).encode())
+                    lines.write(b"\n")
+                    lines.flush()
+                    response = json.loads(lines.readline())
+                    if offered == ring.path:
+                        assert response["result"]["shared_memory"] is True
+                    else:
+                        assert response["code"] == -32602
+                        assert "ring buffer file" in response["error"]
+        finally:
+            os.unlink(link)
+            ring.close()
+            ring.unlink()
+
+
+class TestToolStreaming:
+    """Test cases for streaming tool results."""
+
+    @pytest.mark.parametrize("transport", ["inproc", "unix", "websocket"])
+    def test_chunks_arrive_as_produced(self, transport, tmp_path):
+        """Test chunks reach the caller before the handler finishes, on every transport."""
+        with streaming_client(transport, tmp_path) as client:
+            start = time.monotonic()
+            stream = client.stream_tool("words", {"count": 3, "pause": 0.3})
+            assert next(stream) == "w0 "
+            assert time.monotonic() - start < 0.25
+            assert list(stream) == ["w1 ", "w2 "]
+            assert stream.result["chunks"] == 3
+
+            # Whole results for callers that do not stream, and one chunk for plain tools
+            assert client.call_tool("words", {"count": 3}) == "w0 w1 w2 "
+            assert list(client.stream_tool("echo", {"text": "whole"})) == ["whole"]
+
+    @pytest.mark.parametrize("transport", ["inproc", "websocket"])
+    @pytest.mark.asyncio
+    async def test_async_iteration_and_errors(self, transport, tmp_path):
+        """Test async iteration, and that a failing handler raises after its earlier chunks."""
+        with streaming_client(transport, tmp_path) as client:
+            chunks = [chunk async for chunk in client.stream_tool("words", {"count": 2})]
+            assert chunks == ["w0 ", "w1 "]
+
+            received = []
+            with pytest.raises(MCPError, match="stream broke"):
+                async for chunk in client.stream_tool("words", {"count": 3, "fail_after": 1}):
+                    received.append(chunk)
+            assert received == ["w0 "]
+
+            with pytest.raises(MCPError, match="not available"):
+                client.stream_tool("missing", {})
+
+    def test_chunk_timeout(self):
+        """Test the request timeout bounds the wait for each chunk."""
+        client = MCPClient("inproc://tools", server=streaming_server(), timeout=0.1)
+        assert client.connect()
+        try:
+            stream = client.stream_tool("words", {"count": 2, "pause": 1})
+            assert next(stream) == "w0 "
+            with pytest.raises(TimeoutError):
+                next(stream)
+            stream.close()
+        finally:
+            client.disconnect()
+
+    def test_mock_yields_whole_result(self):
+        """Test the mock session yields its result as one chunk."""
+        client = MCPClient("mcp://test-server:8080")
+        assert list(client.stream_tool("github_search", {})) == [
+            "Found 3 related PRs with similar authentication patterns"
+        ]
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -1,9 +1,22 @@
 """Tests for MCP server implementations."""
 
+import asyncio
+import json
+import time
 
 import pytest
+from fastapi.testclient import TestClient
 
+from agenspy.protocols.mcp.transport import SERVER_OVERLOADED
+from agenspy.servers import github_mcp_server
 from agenspy.servers.mcp_python_server import GitHubMCPServer, PythonMCPServer
+from agenspy.servers.metrics import ServerMetrics, parse_prometheus, summarize_metrics
+from agenspy.servers.shaping import paginate, project
+
+
+def cpu_tool(n: int):
+    """Module-level handler so it can be pickled into a process pool."""
+    return sum(i * i for i in range(n))
 
 
 class TestPythonMCPServer:
@@ -42,6 +55,19 @@ class TestPythonMCPServer:
         assert response["result"]["protocol_version"] == "1.0"
         assert response["id"] == "1"
 
+    def test_catalog_version_tracks_registry(self):
+        """Test the advertised catalog version changes when tools are registered."""
+        server = PythonMCPServer("test-server", 8080)
+
+        async def test_tool():
+            return "test"
+
+        server.register_tool("a", "Tool A", {}, test_tool)
+        first = server.catalog_version
+        server.register_tool("b", "Tool B", {}, test_tool)
+
+        assert first and server.catalog_version != first
+
     @pytest.mark.asyncio
     async def test_list_tools_request(self):
         """Test list tools request."""
@@ -59,6 +85,502 @@ class TestPythonMCPServer:
         assert "tools" in response["result"]
         assert len(response["result"]["tools"]) == 1
         assert response["result"]["tools"][0]["name"] == "test_tool"
+        assert "cache_ttl" not in response["result"]["tools"][0]
+
+    @pytest.mark.asyncio
+    async def test_list_tools_payload_is_precomputed(self):
+        """Test the listing is built once and rebuilt only after registration."""
+        server = PythonMCPServer("test-server", 8080)
+
+        async def test_tool():
+            return "test"
+
+        server.register_tool("a", "Tool A", {}, test_tool)
+        request = {"method": "list_tools", "params": {}, "id": "1"}
+        first = (await server.process_request(request))["result"]
+        assert (await server.process_request(request))["result"] is first
+
+        server.register_tool("b", "Tool B", {}, test_tool)
+        second = (await server.process_request(request))["result"]
+        assert second is not first
+        assert [t["name"] for t in second["tools"]] == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_encode_response_splices_precomputed_payloads(self):
+        """Test spliced encodings decode to the same response as a full dump."""
+        server = PythonMCPServer("test-server", 8080)
+        server.register_tool("a", "Tool A", {"x": "string"}, lambda x: x)
+
+        batch = [
+            {"method": "initialize", "params": {}, "id": "1"},
+            {"method": "list_tools", "params": {}, "id": 2},
+            {"method": "call_tool", "params": {"name": "a", "arguments": {"x": "y"}}, "id": "3"},
+        ]
+        responses = await server.process_request(batch)
+
+        assert json.loads(server.encode_response(responses)) == json.loads(json.dumps(responses))
+
+    @pytest.mark.asyncio
+    async def test_list_tools_advertises_cache_ttl(self):
+        """Test cacheable tools advertise their TTL."""
+        server = PythonMCPServer("test-server", 8080)
+
+        async def test_tool():
+            return "test"
+
+        server.register_tool("test_tool", "Test tool", {}, test_tool, cache_ttl=30)
+
+        response = await server.process_request({"method": "list_tools", "params": {}, "id": "3"})
+        assert response["result"]["tools"][0]["cache_ttl"] == 30
+
+    @pytest.mark.asyncio
+    async def test_async_generator_handler_streams(self):
+        """Test async generator chunks go to emit when a stream is requested, and are joined otherwise."""
+        server = PythonMCPServer("test-server", 8080)
+
+        async def count(n: int):
+            for i in range(n):
+                yield str(i)
+
+        server.register_tool("count", "Count up", {"n": "integer"}, count)
+        listing = await server.process_request({"method": "list_tools", "params": {}, "id": "1"})
+        assert listing["result"]["tools"][0]["streaming"] is True
+
+        emitted = []
+
+        async def emit(request_id, chunk):
+            emitted.append((request_id, chunk))
+
+        request = {"method": "call_tool", "params": {"name": "count", "arguments": {"n": 3}, "stream": True}, "id": 7}
+        response = await server.process_request(request, emit=emit)
+        assert emitted == [(7, "0"), (7, "1"), (7, "2")]
+        assert response["result"]["chunks"] == 3
+
+        request["params"]["stream"] = False
+        assert (await server.process_request(request, emit=emit))["result"]["content"] == "012"
+        assert len(emitted) == 3
+
+        with pytest.raises(ValueError):
+            server.register_tool("bad", "Bad", {}, count, executor="thread")
+
+    @pytest.mark.asyncio
+    async def test_batch_request_runs_concurrently(self):
+        """Test a JSON-RPC batch is answered in order with items processed concurrently."""
+        server = PythonMCPServer("test-server", 8080)
+
+        async def slow_tool(delay: float):
+            await asyncio.sleep(delay)
+            return delay
+
+        server.register_tool("slow", "Slow tool", {"delay": "number"}, slow_tool)
+
+        batch = [
+            {"method": "call_tool", "params": {"name": "slow", "arguments": {"delay": 0.3}}, "id": "1"},
+            {"method": "call_tool", "params": {"name": "missing"}, "id": "2"},
+            {"method": "call_tool", "params": {"name": "slow", "arguments": {"delay": 0.3}}, "id": "3"},
+        ]
+        start = time.monotonic()
+        responses = await server.process_request(batch)
+
+        assert [r["id"] for r in responses] == ["1", "2", "3"]
+        assert responses[0]["result"]["content"] == 0.3
+        assert "not found" in responses[1]["error"]
+        assert time.monotonic() - start < 0.5
+
+    def test_websocket_answers_out_of_order(self):
+        """Test a slow request does not block later requests on the same connection."""
+        server = PythonMCPServer("test-server", 8080)
+
+        async def slow_tool(delay: float):
+            await asyncio.sleep(delay)
+            return delay
+
+        server.register_tool("slow", "Slow tool", {"delay": "number"}, slow_tool)
+
+        with TestClient(server.app).websocket_connect("/mcp") as ws:
+            ws.send_text(json.dumps({"method": "call_tool", "params": {"name": "slow", "arguments": {"delay": 0.5}}, "id": "slow"}))
+            ws.send_text(json.dumps({"method": "call_tool", "params": {"name": "slow", "arguments": {"delay": 0}}, "id": "fast"}))
+
+            assert json.loads(ws.receive_text())["id"] == "fast"
+            assert json.loads(ws.receive_text())["id"] == "slow"
+
+    def test_websocket_in_flight_limit(self):
+        """Test the per-connection limit holds back requests beyond it."""
+        server = PythonMCPServer("test-server", 8080, max_in_flight_per_connection=1)
+
+        async def slow_tool(delay: float):
+            await asyncio.sleep(delay)
+            return delay
+
+        server.register_tool("slow", "Slow tool", {"delay": "number"}, slow_tool)
+
+        with TestClient(server.app).websocket_connect("/mcp") as ws:
+            ws.send_text(json.dumps({"method": "call_tool", "params": {"name": "slow", "arguments": {"delay": 0.3}}, "id": "slow"}))
+            ws.send_text(json.dumps({"method": "call_tool", "params": {"name": "slow", "arguments": {"delay": 0}}, "id": "fast"}))
+
+            assert json.loads(ws.receive_text())["id"] == "slow"
+            assert json.loads(ws.receive_text())["id"] == "fast"
+
+    @pytest.mark.asyncio
+    async def test_initialize_negotiates_encoding(self):
+        """Test the server picks the client's first supported encoding, defaulting to JSON."""
+        server = PythonMCPServer("test-server", 8080, encodings=["cbor"])
+
+        offered = await server.handle_initialize({"encodings": ["msgpack", "cbor"]})
+        assert offered["encoding"] == "cbor"
+        assert offered["capabilities"]["encodings"] == ["json", "cbor"]
+        assert (await server.handle_initialize({"encodings": ["msgpack"]}))["encoding"] == "json"
+        assert "encoding" not in await server.handle_initialize({})
+
+    def test_websocket_binary_frames(self):
+        """Test binary frames are accepted only after negotiation and answered in kind."""
+        msgpack = pytest.importorskip("msgpack")
+        server = PythonMCPServer("test-server", 8080, encodings=["msgpack"])
+        server.register_tool("issues", "List issues", {}, lambda: [{"number": i, "labels": ["bug"]} for i in range(3)])
+        call = {"method": "call_tool", "params": {"name": "issues", "arguments": {}}, "id": "2"}
+
+        with TestClient(server.app).websocket_connect("/mcp") as ws:
+            ws.send_bytes(msgpack.packb(call))
+            assert "negotiated" in json.loads(ws.receive_text())["error"]
+
+            ws.send_text(json.dumps({"method": "initialize", "params": {"encodings": ["msgpack"]}, "id": "1"}))
+            assert json.loads(ws.receive_text())["result"]["encoding"] == "msgpack"
+
+            ws.send_bytes(msgpack.packb(call))
+            response = msgpack.unpackb(ws.receive_bytes())
+            assert response["id"] == "2"
+            assert response["result"]["content"][2] == {"number": 2, "labels": ["bug"]}
+
+            # JSON text frames keep working on the same connection
+            ws.send_text(json.dumps({"method": "list_tools", "params": {}, "id": "3"}))
+            assert json.loads(ws.receive_text())["id"] == "3"
+
+    @pytest.mark.asyncio
+    async def test_unix_socket_listener(self, tmp_path):
+        """Test newline-delimited requests on the Unix socket, including bad lines and batches."""
+        path = str(tmp_path / "mcp.sock")
+        server = PythonMCPServer("test-server", 8080)
+        server.register_tool("add", "Add numbers", {"a": "number", "b": "number"}, lambda a, b: a + b)
+        (tmp_path / "mcp.sock").touch()  # a leftover regular file is not a socket and is kept
+        with pytest.raises(OSError):
+            await server.start_unix_server(path)
+        (tmp_path / "mcp.sock").unlink()
+
+        unix_server = await server.start_unix_server(path)
+        async with unix_server:
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.write(b"not json\n")
+            batch = [
+                {"method": "call_tool", "params": {"name": "add", "arguments": {"a": 1, "b": 2}}, "id": 1},
+                {"method": "list_tools", "params": {}, "id": 2},
+            ]
+            writer.write(json.dumps(batch).encode() + b"\n")
+            await writer.drain()
+
+            assert json.loads(await reader.readline())["error"] == "Invalid JSON"
+            responses = json.loads(await reader.readline())
+            assert responses[0] == {"result": {"content": 3, "isError": False}, "id": 1}
+            assert responses[1]["result"]["tools"][0]["name"] == "add"
+            writer.close()
+
+    @pytest.mark.asyncio
+    async def test_sync_handlers_run_in_thread_pool(self):
+        """Test blocking sync handlers work and do not stall each other."""
+        server = PythonMCPServer("test-server", 8080, max_thread_workers=4)
+        server.register_tool("block", "Blocking tool", {"delay": "number"}, lambda delay: time.sleep(delay) or delay)
+
+        request = {"method": "call_tool", "params": {"name": "block", "arguments": {"delay": 0.3}}}
+        start = time.monotonic()
+        responses = await asyncio.gather(*(server.process_request(dict(request, id=str(i))) for i in range(4)))
+        server.shutdown()
+
+        assert all(r["result"]["content"] == 0.3 for r in responses)
+        assert time.monotonic() - start < 0.9
+
+    @pytest.mark.asyncio
+    async def test_process_pool_handler(self):
+        """Test CPU-bound handlers can run in a process pool."""
+        server = PythonMCPServer("test-server", 8080, max_process_workers=1)
+        server.register_tool("cpu", "CPU tool", {"n": "integer"}, cpu_tool, executor="process")
+
+        response = await server.process_request(
+            {"method": "call_tool", "params": {"name": "cpu", "arguments": {"n": 10}}, "id": "1"}
+        )
+        server.shutdown()
+
+        assert response["result"]["content"] == 285
+
+    def test_executor_validation(self):
+        """Test invalid executor registrations are rejected."""
+        server = PythonMCPServer("test-server", 8080)
+
+        async def async_tool():
+            return "test"
+
+        with pytest.raises(ValueError):
+            server.register_tool("a", "A", {}, async_tool, executor="thread")
+        with pytest.raises(ValueError):
+            server.register_tool("b", "B", {}, lambda: 1, executor="process")
+        with pytest.raises(ValueError):
+            server.register_tool("c", "C", {}, cpu_tool, executor="gpu")
+
+
+class TestAdmissionControl:
+    """Test cases for server admission control."""
+
+    @staticmethod
+    def _server(**kwargs):
+        server = PythonMCPServer("test-server", 8080, **kwargs)
+
+        async def slow_tool(delay: float):
+            await asyncio.sleep(delay)
+            return delay
+
+        server.register_tool("slow", "Slow tool", {"delay": "number"}, slow_tool)
+        return server
+
+    @staticmethod
+    def _call(server, request_id, delay=0.2):
+        return server.process_request(
+            {"method": "call_tool", "params": {"name": "slow", "arguments": {"delay": delay}}, "id": request_id}
+        )
+
+    @pytest.mark.asyncio
+    async def test_rejects_beyond_queue(self):
+        """Test requests past the running limit and queue are rejected with retry_after."""
+        server = self._server(max_concurrent_requests=1, max_queued_requests=1)
+
+        responses = await asyncio.gather(*(self._call(server, str(i)) for i in range(3)))
+
+        assert [r.get("code") for r in responses] == [None, None, SERVER_OVERLOADED]
+        assert responses[2]["data"]["retry_after"] > 0
+        assert server.admission.get_stats()["active"] == 0
+
+    @pytest.mark.asyncio
+    async def test_queue_timeout(self):
+        """Test queued requests give up after the queue timeout."""
+        server = self._server(max_concurrent_requests=1, queue_timeout=0.05)
+
+        first, second = await asyncio.gather(self._call(server, "1", delay=0.3), self._call(server, "2"))
+
+        assert first["result"]["content"] == 0.3
+        assert second["code"] == SERVER_OVERLOADED
+        assert server.admission.get_stats() == {
+            "active": 0,
+            "queued": 0,
+            "rejected": 1,
+            "max_concurrent": 1,
+            "max_queued": 100,
+        }
+
+    @pytest.mark.asyncio
+    async def test_list_tools_not_throttled(self):
+        """Test cheap metadata requests bypass admission control."""
+        server = self._server(max_concurrent_requests=1, max_queued_requests=0)
+
+        _, listing = await asyncio.gather(
+            self._call(server, "1"), server.process_request({"method": "list_tools", "params": {}, "id": "2"})
+        )
+        assert "tools" in listing["result"]
+
+
+class TestCoalescing:
+    """Test cases for coalescing identical concurrent tool calls."""
+
+    @staticmethod
+    def _server(**kwargs):
+        server = PythonMCPServer("test-server", 8080, **kwargs)
+        runs = []
+
+        async def fetch(key: str, delay: float = 0.2):
+            runs.append(key)
+            await asyncio.sleep(delay)
+            if key == "bad":
+                raise RuntimeError("fetch failed")
+            return {"key": key}
+
+        server.register_tool("fetch", "Coalesced fetch", {"key": "string"}, fetch, coalesce=True)
+        server.register_tool("plain", "Uncoalesced fetch", {"key": "string"}, fetch)
+        return server, runs
+
+    @staticmethod
+    def _call(server, tool, key, request_id=1):
+        params = {"name": tool, "arguments": {"key": key}}
+        return server.process_request({"method": "call_tool", "params": params, "id": request_id})
+
+    @pytest.mark.asyncio
+    async def test_identical_calls_share_one_run(self):
+        """Test overlapping identical calls run once, and other arguments, tools and later calls do not."""
+        server, runs = self._server()
+
+        responses = await asyncio.gather(
+            *(self._call(server, "fetch", "a", i) for i in range(5)),
+            self._call(server, "fetch", "b"),
+            *(self._call(server, "plain", "a") for _ in range(2)),
+        )
+        assert [r["id"] for r in responses[:5]] == [0, 1, 2, 3, 4]
+        assert all(r["result"]["content"] == {"key": "a"} for r in responses[:5])
+        assert sorted(runs) == ["a", "a", "a", "b"]
+        assert server.coalescer.coalesced == 4
+        assert len(server.coalescer) == 0
+
+        await self._call(server, "fetch", "a")
+        assert runs.count("a") == 4
+
+    @pytest.mark.asyncio
+    async def test_errors_are_shared(self):
+        """Test every waiter gets the failure of the shared run."""
+        server, runs = self._server()
+
+        responses = await asyncio.gather(*(self._call(server, "fetch", "bad", i) for i in range(3)))
+        assert all("fetch failed" in r["error"] for r in responses)
+        assert runs == ["bad"]
+
+    @pytest.mark.asyncio
+    async def test_waiters_skip_admission(self):
+        """Test calls joining a running call are not turned away by admission control."""
+        server, runs = self._server(max_concurrent_requests=1, max_queued_requests=0)
+
+        first = asyncio.ensure_future(self._call(server, "fetch", "a", 1))
+        await asyncio.sleep(0.05)
+        second, third = await asyncio.gather(self._call(server, "fetch", "a", 2), self._call(server, "fetch", "b", 3))
+        assert (await first)["result"]["content"] == second["result"]["content"] == {"key": "a"}
+        assert third["code"] == SERVER_OVERLOADED
+
+    @pytest.mark.asyncio
+    async def test_run_cancelled_with_last_waiter(self):
+        """Test the shared run stops once nobody is waiting for it."""
+        server, runs = self._server()
+
+        waiters = [asyncio.ensure_future(self._call(server, "fetch", "a", i)) for i in range(2)]
+        await asyncio.sleep(0.05)
+        waiters[0].cancel()
+        assert (await waiters[1])["result"]["content"] == {"key": "a"}
+
+        waiter = asyncio.ensure_future(self._call(server, "fetch", "a"))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert len(server.coalescer) == 0
+
+
+class TestMetrics:
+    """Test cases for request metrics and the /metrics route."""
+
+    @pytest.mark.asyncio
+    async def test_counts_errors_and_latency(self):
+        """Test per-method and per-tool counters, errors and histograms after a few calls."""
+        server = PythonMCPServer("test-server", 8080)
+
+        async def slow(delay: float):
+            await asyncio.sleep(delay)
+            return delay
+
+        def fail():
+            raise RuntimeError("boom")
+
+        server.register_tool("slow", "Slow tool", {"delay": "number"}, slow)
+        server.register_tool("fail", "Failing tool", {}, fail)
+
+        def call(name, **args):
+            return {"method": "call_tool", "params": {"name": name, "arguments": args}, "id": name}
+
+        await server.process_request([call("slow", delay=0.06), call("slow", delay=0), call("fail"), call("missing")])
+        await server.process_request({"method": "bogus", "params": {}, "id": 1})
+
+        stats = server.metrics.get_stats()
+        assert stats["method"]["call_tool"]["calls"] == 4
+        assert stats["method"]["call_tool"]["errors"] == 2
+        assert stats["method"]["unknown"]["errors"] == 1
+        assert stats["tool"]["slow"]["calls"] == 2
+        assert stats["tool"]["slow"]["mean_seconds"] == pytest.approx(0.03, abs=0.02)
+        assert stats["tool"]["fail"]["errors"] == 1
+        assert "missing" not in stats["tool"]
+
+        summary = summarize_metrics(server.render_metrics())
+        assert summary["tool"]["slow"]["calls"] == 2
+        assert summary["tool"]["slow"]["p95_seconds"] == 0.1
+        assert summary["method"]["call_tool"]["errors"] == 2
+
+    def test_metrics_route(self):
+        """Test /metrics serves Prometheus text including admission and connection gauges."""
+        server = PythonMCPServer("test-server", 8080)
+        server.register_tool("echo", "Echo", {"text": "string"}, lambda text: text)
+        client = TestClient(server.app)
+        with client.websocket_connect("/mcp") as ws:
+            params = {"name": "echo", "arguments": {"text": "x"}}
+            ws.send_text(json.dumps({"method": "call_tool", "params": params, "id": 1}))
+            ws.receive_text()
+            response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        samples = {(name, tuple(labels.items())): value for name, labels, value in parse_prometheus(response.text)}
+        assert samples[("mcp_tool_calls_total", (("tool", "echo"),))] == 1
+        assert samples[("mcp_tool_calls_duration_seconds_bucket", (("tool", "echo"), ("le", "+Inf")))] == 1
+        assert samples[("mcp_websocket_connections", ())] == 1
+        assert ("mcp_admission_rejected_total", ()) in samples
+
+    def test_label_escaping(self):
+        """Test label values with quotes and newlines survive a render and parse."""
+        metrics = ServerMetrics()
+        name = 'odd "tool"\nname\\'
+        metrics.finished("tool", name, metrics.started("tool", name))
+        samples = parse_prometheus(metrics.render_prometheus())
+        [(_, labels, value)] = [sample for sample in samples if sample[0] == "mcp_tool_calls_total"]
+        assert labels == {"tool": name}
+        assert value == 1
+
+
+class TestResultShaping:
+    """Test cases for field projection and pagination of tool results."""
+
+    def test_project_dotted_fields(self):
+        """Test dotted paths pick nested fields, through lists, skipping missing ones."""
+        issue = {"number": 1, "title": "t", "user": {"login": "a", "id": 9}, "labels": [{"name": "bug", "id": 3}]}
+        assert project(issue, ["number", "user.login", "labels.name", "missing"]) == {
+            "number": 1,
+            "user": {"login": "a"},
+            "labels": [{"name": "bug"}],
+        }
+        assert project([issue], ["user", "user.login"]) == [{"user": {"login": "a", "id": 9}}]
+        assert project("text", ["x"]) == "text"
+        with pytest.raises(ValueError):
+            project(issue, "number")
+
+    def test_paginate(self):
+        """Test pages chain through cursors and bad cursors are rejected."""
+        items = list(range(5))
+        page, cursor = paginate(items, None, 2)
+        assert (page, cursor) == ([0, 1], "2")
+        assert paginate(items, cursor, 2) == ([2, 3], "4")
+        assert paginate(items, "4", 2) == ([4], None)
+        with pytest.raises(ValueError):
+            paginate(items, "abc", 2)
+        with pytest.raises(ValueError):
+            paginate(items, None, 0)
+
+    @pytest.mark.asyncio
+    async def test_github_listing_tools(self):
+        """Test GitHub listing tools are projected and paged on the server."""
+        server = github_mcp_server.GitHubMCPServer()
+
+        async def call(**shaping):
+            params = {"name": "list_issues", "arguments": {"owner": "o", "repo": "r"}, **shaping}
+            return await server.process_request({"method": "call_tool", "params": params, "id": 1})
+
+        first = (await call(fields=["number", "user.login"], limit=2))["result"]["content"]
+        assert first["issues"] == [{"number": 1, "user": {"login": "user1"}}, {"number": 2, "user": {"login": "user2"}}]
+        assert first["total_count"] == 10
+        last = (await call(fields=["number"], cursor=first["next_cursor"], limit=10))["result"]["content"]
+        assert [issue["number"] for issue in last["issues"]] == [3, 4, 5]
+        assert "next_cursor" not in last
+
+        for tool in ("list_issues", "list_pull_requests", "get_commit_history"):
+            assert server._tool_entry(server.tools[tool]).get("paginated")
+        params = {"name": "get_repository", "arguments": {"owner": "o", "repo": "r"}, "limit": 1}
+        response = await server.process_request({"method": "call_tool", "params": params, "id": 2})
+        assert "cannot be paginated" in response["error"]
 
 
 class TestGitHubMCPServer: